@@ -0,0 +1,89 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the JSON decoders on large collections of members.
+
+Usage::
+
+    $ python benchmarks/decode_entries.py --entries 50000 --repeat 5
+
+The payload mimics the ``members`` collection returned by Core.  Decoders
+which are not installed are skipped.
+"""
+
+import argparse
+import json
+import time
+
+from mailmanclient.restbase.codec import DECODERS, get_decoder
+
+
+def make_payload(entries):
+    members = []
+    for i in range(entries):
+        address = 'member{}@example.com'.format(i)
+        members.append({
+            'address': 'http://localhost:9001/3.1/addresses/' + address,
+            'bounce_score': 0,
+            'delivery_mode': 'regular',
+            'display_name': 'Member {}'.format(i),
+            'email': address,
+            'http_etag': '"{:040x}"'.format(i),
+            'list_id': 'ant.example.com',
+            'member_id': '{:032x}'.format(i),
+            'role': 'member',
+            'self_link': 'http://localhost:9001/3.1/members/{:032x}'.format(
+                i),
+            'subscription_mode': 'as_address',
+            'total_warnings_sent': 0,
+            'user': 'http://localhost:9001/3.1/users/{:032x}'.format(i),
+            })
+    return json.dumps({
+        'entries': members,
+        'http_etag': '"{:040x}"'.format(entries),
+        'start': 0,
+        'total_size': entries,
+        }).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    payload = make_payload(args.entries)
+    print('{} entries, {:.1f} MB'.format(args.entries, len(payload) / 1e6))
+    timings = {}
+    for name in DECODERS:
+        try:
+            decode = get_decoder(name)
+        except ImportError:
+            print('{:>8}: not installed'.format(name))
+            continue
+        best = float('inf')
+        for i in range(args.repeat):
+            start = time.perf_counter()
+            decode(payload)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    # The standard library is what requests' Response.json() uses.
+    for name, best in timings.items():
+        print('{:>8}: {:8.1f} ms  (x{:.2f} vs json)'.format(
+            name, best * 1000, timings['json'] / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -71,6 +71,9 @@ setup(
         'lint': [
             'flake8>3.0',
             'flake8-bugbear',
-           ]
+           ],
+        'speedups': [
+            'orjson',
+           ],
         },
     )
@@ -20,7 +20,28 @@
 
 from mailmanclient.client import Client
 from mailmanclient.constants import __version__
-from mailmanclient.restbase.connection import MailmanConnectionError
+from mailmanclient.restbase.breaker import CircuitBreaker
+from mailmanclient.restbase.connection import (
+    CircuitOpenError, DeadlineExceeded, MailmanConnectionError)
+from mailmanclient.restbase.cache import ResponseCache
+from mailmanclient.restbase.endpoints import EndpointSet
+from mailmanclient.restbase.hedging import HedgingPolicy
+from mailmanclient.restbase.limiter import (
+    AdaptiveLimiter, Limit, RateLimiter)
+from mailmanclient.restbase.metrics import (
+    Metrics, PrometheusExporter, StatsdExporter)
+from mailmanclient.restbase.middleware import CallContext, Middleware
+from mailmanclient.restbase.recorder import CallRecorder, NPlusOneWarning
+from mailmanclient.restbase.retry import RetryPolicy
+from mailmanclient.restbase.scheduler import PriorityScheduler
+from mailmanclient.restbase.session import SessionPool, UnixSocketTransport
+from mailmanclient.restbase.singleflight import SingleFlight
+from mailmanclient.restbase.slowlog import SlowCallLog
+from mailmanclient.restbase.tracing import (
+    InMemoryExporter, JSONLinesExporter, OpenTelemetryExporter, Span,
+    SpanExporter, Tracer)
+from mailmanclient.restbase.transport import (
+    ASGITransport, Transport, WSGITransport)
 from mailmanclient.restobjects.address import Address, Addresses
 from mailmanclient.restobjects.ban import Bans, BannedAddress
 from mailmanclient.restobjects.configuration import Configuration
@@ -38,25 +59,56 @@ from mailmanclient.restobjects.user import User
 
 __metaclass__ = type
 __all__ = [
+    'ASGITransport',
+    'AdaptiveLimiter',
     'Address',
     'Addresses',
     'Bans',
     'BannedAddress',
+    'CallContext',
+    'CallRecorder',
+    'CircuitBreaker',
+    'CircuitOpenError',
     'Client',
     'Configuration',
-    'Domain'
+    'DeadlineExceeded',
+    'Domain',
+    'EndpointSet',
     'HeaderMatch',
     'HeaderMatches',
+    'HedgingPolicy',
     'HeldMessage',
+    'InMemoryExporter',
+    'JSONLinesExporter',
+    'Limit',
     'ListArchivers',
     'MailingList',
     'MailmanConnectionError',
     'Member',
+    'Metrics',
+    'Middleware',
+    'NPlusOneWarning',
+    'OpenTelemetryExporter',
     'Preferences',
     'PreferencesMixin',
+    'PriorityScheduler',
+    'PrometheusExporter',
     'Queue',
+    'RateLimiter',
+    'ResponseCache',
+    'RetryPolicy',
+    'SessionPool',
     'Settings',
+    'SingleFlight',
+    'SlowCallLog',
+    'Span',
+    'SpanExporter',
+    'StatsdExporter',
+    'Tracer',
+    'Transport',
+    'UnixSocketTransport',
     'User',
+    'WSGITransport',
     '__version__',
 ]
 
@@ -47,10 +47,28 @@ __all__ = [
     'AsyncClient',
 ]
 
-from typing import List, Mapping, Any
+from typing import (
+    Any, AsyncIterator, Callable, List, Mapping, Optional, Union)
+from mailmanclient.constants import DEFAULT_PAGE_ITEM_COUNT, MISSING
 from mailmanclient.restobjects.utils import list_of_objects
 from mailmanclient.restobjects.types import HTTPClientProto
 from mailmanclient.restbase.async_connection import Connection
+from mailmanclient.restbase.async_page import (
+    AsyncPage, fetch_all, iter_entries)
+from mailmanclient.restbase.breaker import CircuitBreaker
+from mailmanclient.restbase.cache import ResponseCache
+from mailmanclient.restbase.deadline import deadline
+from mailmanclient.restbase.endpoints import EndpointSet
+from mailmanclient.restbase.hedging import HedgingPolicy
+from mailmanclient.restbase.limiter import RateLimiter
+from mailmanclient.restbase.middleware import Middleware
+from mailmanclient.restbase.recorder import CallRecorder
+from mailmanclient.restbase.retry import RetryPolicy
+from mailmanclient.restbase.scheduler import PriorityScheduler, priority
+from mailmanclient.restbase.singleflight import AsyncSingleFlight
+from mailmanclient.restbase.tracing import (
+    Tracer, no_trace, trace_methods)
+from mailmanclient.restbase.transport import Transport
 from mailmanclient.asyncobjects.domain import Domain
 from mailmanclient.asyncobjects.mailinglist import MailingList
 from mailmanclient.asyncobjects.user import User
@@ -61,6 +79,7 @@ from mailmanclient.asyncobjects.member import Member
 JSON_CONTENT_TYPE = 'application/json'
 
 
+@trace_methods
 class AsyncClient:
     """Provide an Idiomatic API for Mailman Core.
 
@@ -74,21 +93,111 @@ class AsyncClient:
     The parameters are based off on httpx python library.
 
     :param client: Http client object with an async request method.
-    :param base_url: Base URL to Core's API.
+    :param base_url: Base URL to Core's API, or a list of the base URLs of
+        several frontends.  See :class:`mailmanclient.Client`.
     :param user: Core admin username.
     :param password: Core admin password.
+    :param timeout: Upper bound, in seconds, of each call to Core.  A
+        ``(connect, read)`` tuple is accepted for symmetry with
+        :class:`mailmanclient.Client`.
+    :param retry: Policy to retry failed idempotent requests.  See
+        :class:`mailmanclient.RetryPolicy`.
+    :param cache: Cache of the ``GET`` responses.  See
+        :class:`mailmanclient.ResponseCache`.
+    :param single_flight: Where the identical ``GET`` requests made at the
+        same time by several tasks are coalesced.  Defaults to a new
+        :class:`AsyncSingleFlight`, ``None`` disables the coalescing.
+    :param json_decoder: Decoder of the JSON responses.  See
+        :class:`mailmanclient.Client`.
+    :param transport: Transport sending the requests instead of `client`,
+        which can then be None.  See :class:`mailmanclient.Transport`.
+    :param hedging: Policy sending a second copy of the slow ``GET``
+        requests.  See :class:`mailmanclient.HedgingPolicy`.
+    :param circuit_breaker: Circuit breaker making the calls fail fast while
+        Core keeps failing.  See :class:`mailmanclient.CircuitBreaker`.
+    :param scheduler: Scheduler dispatching the interactive calls ahead of
+        the bulk ones.  See :class:`mailmanclient.PriorityScheduler`.
+    :param limiter: Rate and concurrency limits of the requests, which can
+        be shared with other clients.  See
+        :class:`mailmanclient.RateLimiter`.
+    :param middleware: Middleware wrapping each call to Core, the first one
+        being the outermost.  See :class:`mailmanclient.Middleware`.
+    :param tracer: Tracer opening a span for each operation of the client and
+        for each call to Core.  See :class:`mailmanclient.Tracer`.
 
     """
 
     def __init__(
         self,
         client: HTTPClientProto,
-        base_url: str,
+        base_url: Union[str, List[str], EndpointSet],
         user: str,
         password: str,
+        timeout: Any = MISSING,
+        retry: Optional[RetryPolicy] = None,
+        cache: Optional[ResponseCache] = None,
+        single_flight: Optional[AsyncSingleFlight] = MISSING,
+        json_decoder: Union[str, Callable[[bytes], Any], None] = None,
+        transport: Optional[Transport] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        limiter: Optional[RateLimiter] = None,
+        scheduler: Optional[PriorityScheduler] = None,
+        middleware: Optional[List[Middleware]] = None,
+        tracer: Optional[Tracer] = None,
     ) -> None:
         self.client = client
-        self.connection = Connection(self.client, base_url, user, password)
+        self.connection = Connection(
+            self.client, base_url, user, password, timeout=timeout,
+            retry=retry, cache=cache, single_flight=single_flight,
+            json_decoder=json_decoder, transport=transport, hedging=hedging,
+            circuit_breaker=circuit_breaker, limiter=limiter,
+            scheduler=scheduler, middleware=middleware, tracer=tracer)
+
+    @no_trace
+    def deadline(self, timeout: float):
+        """Share a single time budget between all the calls of a block.
+
+        The budget follows the current task, and the tasks it creates.
+        See :meth:`mailmanclient.Client.deadline`.
+
+        :param timeout: The time budget, in seconds.
+        """
+        return deadline(timeout)
+
+    @no_trace
+    def priority(self, lane: str):
+        """Send all the calls of a block in a priority lane.
+
+        The lane follows the current task, and the tasks it creates.
+        See :meth:`mailmanclient.Client.priority`.
+
+        :param lane: ``'interactive'`` or ``'bulk'``.
+        """
+        return priority(lane)
+
+    @no_trace
+    def record_calls(self, threshold: int = 3,
+                     warn: bool = True) -> CallRecorder:
+        """Record the calls to Core made inside a block.
+
+        See :meth:`mailmanclient.Client.record_calls`.
+
+        :param threshold: The number of calls to a route reported as a
+            repeat.
+        :param warn: Whether to warn about the repeated routes.
+        """
+        return CallRecorder(self.connection, threshold, warn)
+
+    @no_trace
+    def add_middleware(self, middleware: Middleware) -> None:
+        """Add a middleware wrapping the calls to Core's API.
+
+        See :meth:`mailmanclient.Client.add_middleware`.
+
+        :param middleware: The middleware to add.
+        """
+        self.connection.add_middleware(middleware)
 
     async def domains(self) -> List[Domain]:
         """Get all domains.
@@ -106,38 +215,240 @@ class AsyncClient:
         response, content = await self.connection.call('system')
         return content
 
-    async def lists(self) -> List[MailingList]:
+    async def lists(
+            self, parallel: Optional[int] = None,
+            count: int = DEFAULT_PAGE_ITEM_COUNT) -> List[MailingList]:
         """Get a list of MailingLists
 
         ``/<api>/lists``
+
+        :param parallel: Fetch the lists page by page, this number of pages
+            at a time, instead of in a single request.
+        :param count: Number of entries per page when `parallel` is given.
         """
+        if parallel:
+            return await fetch_all(
+                self.connection, 'lists', MailingList, count, parallel)
         response, content = await self.connection.call('lists')
         return list_of_objects(MailingList, content, self.connection)
 
-    async def members(self) -> List[Member]:
+    async def get_list_page(
+            self, count: int = DEFAULT_PAGE_ITEM_COUNT,
+            page: int = 1) -> AsyncPage[MailingList]:
+        """Get a page of the lists.
+
+        ``/<api>/lists?count=<count>&page=<page>``
+
+        :param count: Number of entries per page.
+        :param page: The page number, starting at 1.
+        """
+        return await AsyncPage.fetch(
+            self.connection, 'lists', MailingList, count, page)
+
+    async def iter_lists(
+            self, count: int = DEFAULT_PAGE_ITEM_COUNT,
+            prefetch: int = 1) -> AsyncIterator[MailingList]:
+        """Iterate over the lists, page by page.
+
+        The next pages are fetched by other tasks while a page is processed,
+        see :func:`~mailmanclient.restbase.async_page.iter_pages`.
+
+        :param count: Number of entries per page.
+        :param prefetch: Number of pages fetched ahead.
+        """
+        async for entry in iter_entries(
+                self.connection, 'lists', MailingList, count, prefetch):
+            yield entry
+
+    async def count_lists(self, advertised: Optional[bool] = None,
+                          mail_host: Optional[str] = None,
+                          max_age: Optional[float] = None) -> int:
+        """Return the number of lists, without fetching them.
+
+        ``/<api>/lists?count=1``
+
+        :param advertised: Whether to count only the advertised lists.
+        :param mail_host: Domain to filter results by.
+        :param max_age: If given, a count made less than this number of
+            seconds ago may be returned, see
+            :meth:`mailmanclient.restbase.connection.Connection.count`.
+        """
+        if mail_host:
+            url = 'domains/{0}/lists'.format(mail_host)
+        else:
+            url = 'lists'
+        if advertised:
+            url += '?advertised=true'
+        return await self.connection.count(url, max_age)
+
+    async def members(
+            self, parallel: Optional[int] = None,
+            count: int = DEFAULT_PAGE_ITEM_COUNT) -> List[Member]:
         """All the Members
 
         ``/<api>/members``
+
+        :param parallel: Fetch the members page by page, this number of pages
+            at a time, instead of in a single request.
+        :param count: Number of entries per page when `parallel` is given.
         """
+        if parallel:
+            return await fetch_all(
+                self.connection, 'members', Member, count, parallel)
         response, content = await self.connection.call('members')
         return list_of_objects(Member, content, self.connection)
 
-    async def users(self) -> List[User]:
+    async def get_member_page(
+            self, count: int = DEFAULT_PAGE_ITEM_COUNT,
+            page: int = 1) -> AsyncPage[Member]:
+        """Get a page of the members.
+
+        ``/<api>/members?count=<count>&page=<page>``
+
+        :param count: Number of entries per page.
+        :param page: The page number, starting at 1.
+        """
+        return await AsyncPage.fetch(
+            self.connection, 'members', Member, count, page)
+
+    async def iter_members(
+            self, count: int = DEFAULT_PAGE_ITEM_COUNT,
+            prefetch: int = 1) -> AsyncIterator[Member]:
+        """Iterate over the members, page by page.
+
+        The next pages are fetched by other tasks while a page is processed,
+        see :func:`~mailmanclient.restbase.async_page.iter_pages`.
+
+        :param count: Number of entries per page.
+        :param prefetch: Number of pages fetched ahead.
+        """
+        async for entry in iter_entries(
+                self.connection, 'members', Member, count, prefetch):
+            yield entry
+
+    async def count_members(self, max_age: Optional[float] = None) -> int:
+        """Return the number of members, without fetching them.
+
+        ``/<api>/members?count=1``
+
+        :param max_age: If given, a count made less than this number of
+            seconds ago may be returned, see
+            :meth:`mailmanclient.restbase.connection.Connection.count`.
+        """
+        return await self.connection.count('members', max_age)
+
+    async def users(
+            self, parallel: Optional[int] = None,
+            count: int = DEFAULT_PAGE_ITEM_COUNT) -> List[User]:
         """All the users in Mailman Core
 
         ``/<api>/users``
+
+        :param parallel: Fetch the users page by page, this number of pages
+            at a time, instead of in a single request.
+        :param count: Number of entries per page when `parallel` is given.
         """
+        if parallel:
+            return await fetch_all(
+                self.connection, 'users', User, count, parallel)
         response, content = await self.connection.call('users')
         return list_of_objects(User, content, self.connection)
 
-    async def addresses(self) -> List[Address]:
+    async def get_user_page(
+            self, count: int = DEFAULT_PAGE_ITEM_COUNT,
+            page: int = 1) -> AsyncPage[User]:
+        """Get a page of the users.
+
+        ``/<api>/users?count=<count>&page=<page>``
+
+        :param count: Number of entries per page.
+        :param page: The page number, starting at 1.
+        """
+        return await AsyncPage.fetch(
+            self.connection, 'users', User, count, page)
+
+    async def iter_users(
+            self, count: int = DEFAULT_PAGE_ITEM_COUNT,
+            prefetch: int = 1) -> AsyncIterator[User]:
+        """Iterate over the users, page by page.
+
+        The next pages are fetched by other tasks while a page is processed,
+        see :func:`~mailmanclient.restbase.async_page.iter_pages`.
+
+        :param count: Number of entries per page.
+        :param prefetch: Number of pages fetched ahead.
+        """
+        async for entry in iter_entries(
+                self.connection, 'users', User, count, prefetch):
+            yield entry
+
+    async def count_users(self, max_age: Optional[float] = None) -> int:
+        """Return the number of users, without fetching them.
+
+        ``/<api>/users?count=1``
+
+        :param max_age: If given, a count made less than this number of
+            seconds ago may be returned, see
+            :meth:`mailmanclient.restbase.connection.Connection.count`.
+        """
+        return await self.connection.count('users', max_age)
+
+    async def addresses(
+            self, parallel: Optional[int] = None,
+            count: int = DEFAULT_PAGE_ITEM_COUNT) -> List[Address]:
         """All the addresses in Mailman
 
         ``/<api>/address``
+
+        :param parallel: Fetch the addresses page by page, this number of
+            pages at a time, instead of in a single request.
+        :param count: Number of entries per page when `parallel` is given.
         """
+        if parallel:
+            return await fetch_all(
+                self.connection, 'addresses', Address, count, parallel)
         response, content = await self.connection.call('addresses')
         return list_of_objects(Address, content, self.connection)
 
+    async def get_address_page(
+            self, count: int = DEFAULT_PAGE_ITEM_COUNT,
+            page: int = 1) -> AsyncPage[Address]:
+        """Get a page of the addresses.
+
+        ``/<api>/addresses?count=<count>&page=<page>``
+
+        :param count: Number of entries per page.
+        :param page: The page number, starting at 1.
+        """
+        return await AsyncPage.fetch(
+            self.connection, 'addresses', Address, count, page)
+
+    async def iter_addresses(
+            self, count: int = DEFAULT_PAGE_ITEM_COUNT,
+            prefetch: int = 1) -> AsyncIterator[Address]:
+        """Iterate over the addresses, page by page.
+
+        The next pages are fetched by other tasks while a page is processed,
+        see :func:`~mailmanclient.restbase.async_page.iter_pages`.
+
+        :param count: Number of entries per page.
+        :param prefetch: Number of pages fetched ahead.
+        """
+        async for entry in iter_entries(
+                self.connection, 'addresses', Address, count, prefetch):
+            yield entry
+
+    async def count_addresses(self, max_age: Optional[float] = None) -> int:
+        """Return the number of addresses, without fetching them.
+
+        ``/<api>/addresses?count=1``
+
+        :param max_age: If given, a count made less than this number of
+            seconds ago may be returned, see
+            :meth:`mailmanclient.restbase.connection.Connection.count`.
+        """
+        return await self.connection.count('addresses', max_age)
+
     async def find_members(
             self, list_id: str = None, subscriber: str = None,
             role: str = None, moderation_action: str = None,
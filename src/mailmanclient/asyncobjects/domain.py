@@ -20,6 +20,8 @@ __all__ = [
     'Domain'
 ]
 
+from typing import Optional
+
 from mailmanclient.restbase.async_base import RESTObject
 
 
@@ -29,3 +31,19 @@ class Domain(RESTObject):
 
     def __repr__(self) -> str:
         return '<Domain {}>'.format(self.mail_host)
+
+    async def count_lists(self, advertised: Optional[bool] = None,
+                          max_age: Optional[float] = None) -> int:
+        """Return the number of lists of the domain, without fetching them.
+
+        ``/<api>/domains/<mail_host>/lists?count=1``
+
+        :param advertised: Whether to count only the advertised lists.
+        :param max_age: If given, a count made less than this number of
+            seconds ago may be returned, see
+            :meth:`mailmanclient.restbase.connection.Connection.count`.
+        """
+        url = 'domains/{0}/lists'.format(self.mail_host)
+        if advertised:
+            url += '?advertised=true'
+        return await self._connection.count(url, max_age)
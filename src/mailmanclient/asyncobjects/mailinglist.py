@@ -21,8 +21,10 @@ __all__ = [
 ]
 
 from enum import Enum
-from typing import List
+from typing import AsyncIterator, List, Optional, Union
+from mailmanclient.constants import DEFAULT_PAGE_ITEM_COUNT
 from mailmanclient.restbase.async_base import RESTObject
+from mailmanclient.restbase.async_page import AsyncPage, iter_entries
 from mailmanclient.asyncobjects.member import Member
 from mailmanclient.restobjects.utils import list_of_objects
 from mailmanclient.restobjects.types import ConnectionProto, ContentType
@@ -54,15 +56,67 @@ class MailingList(RESTObject):
         _, content = await self._connection.call(path)
         return Config(self, self._connection, content)
 
+    def _get_roster_path(self, role: Union[MemberRole, str]) -> str:
+        return 'lists/{}/roster/{}'.format(
+            self.fqdn_listname, MemberRole(role).value)
+
     async def get_roster(self, role) -> List[Member]:
         """Get MailingList roster.
 
         /<api>/lists/<listid>/roster/<role>
         """
-        path = 'lists/{}/roster/{}'.format(self.fqdn_listname, role)
-        _, content = await self._connection.call(path)
+        _, content = await self._connection.call(self._get_roster_path(role))
         return list_of_objects(Member, content, self._connection)
 
+    async def get_roster_page(
+            self, role: Union[MemberRole, str],
+            count: int = DEFAULT_PAGE_ITEM_COUNT,
+            page: int = 1) -> AsyncPage[Member]:
+        """Get a page of a MailingList roster.
+
+        /<api>/lists/<listid>/roster/<role>?count=<count>&page=<page>
+
+        :param role: The role of the members.
+        :param count: Number of members per page.
+        :param page: The page number, starting at 1.
+        """
+        return await AsyncPage.fetch(
+            self._connection, self._get_roster_path(role), Member, count,
+            page)
+
+    async def iter_roster(
+            self, role: Union[MemberRole, str],
+            count: int = DEFAULT_PAGE_ITEM_COUNT,
+            prefetch: int = 1) -> AsyncIterator[Member]:
+        """Iterate over a MailingList roster, page by page.
+
+        The next pages are fetched by other tasks while a page is processed,
+        so that huge rosters can be processed without loading them in
+        memory.
+
+        :param role: The role of the members.
+        :param count: Number of members per page.
+        :param prefetch: Number of pages fetched ahead.
+        """
+        async for member in iter_entries(
+                self._connection, self._get_roster_path(role), Member, count,
+                prefetch):
+            yield member
+
+    async def count_roster(self, role: Union[MemberRole, str],
+                           max_age: Optional[float] = None) -> int:
+        """Return the number of members of a roster, without fetching them.
+
+        /<api>/lists/<listid>/roster/<role>?count=1
+
+        :param role: The role of the members.
+        :param max_age: If given, a count made less than this number of
+            seconds ago may be returned, see
+            :meth:`mailmanclient.restbase.connection.Connection.count`.
+        """
+        return await self._connection.count(
+            self._get_roster_path(role), max_age)
+
     async def members(self) -> List[Member]:
         """Get Mailinglist members (subscribers.)
 
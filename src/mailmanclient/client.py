@@ -33,7 +33,11 @@ from mailmanclient.restobjects.styles import Styles
 from mailmanclient.restobjects.user import User
 from mailmanclient.restobjects.templates import Template, TemplateList
 from mailmanclient.restbase.connection import Connection
-from mailmanclient.restbase.page import Page
+from mailmanclient.restbase.deadline import deadline
+from mailmanclient.restbase.page import Page, Paginator, iter_entries
+from mailmanclient.restbase.recorder import CallRecorder
+from mailmanclient.restbase.scheduler import priority
+from mailmanclient.restbase.tracing import no_trace, trace_methods
 
 __metaclass__ = type
 __all__ = [
@@ -45,11 +49,16 @@ __all__ = [
 # --- The following classes are part of the API
 #
 
+@trace_methods
 class Client:
     """Access the Mailman REST API root.
 
-    :param baseurl: The base url to access the Mailman 3 REST API.
-    :type baseurl: str
+    :param baseurl: The base url to access the Mailman 3 REST API.  To use
+        several REST frontends of the same Core, give the list of their base
+        urls, the preferred one first, or an :class:`EndpointSet`.  ``GET``
+        requests are then spread over the healthy frontends, and the other
+        ones go to the preferred healthy frontend.
+    :type baseurl: str or List[str]
     :param name: The Basic Auth user name.  If given, the `password` must
         also be given.
     :type name: str
@@ -59,16 +68,157 @@ class Client:
     :param request_hooks: Callable hooks to process request parameters before
         being sent to Core's API.
     :type request_hooks: List[callables]
+    :param session_pool: The pool of keep-alive HTTP connections to use,
+        which can be shared between clients.  By default, each client keeps
+        its own pool.
+    :type session_pool: :class:`SessionPool`
+    :param timeout: Timeout of each HTTP request to Core, either a number of
+        seconds or a ``(connect, read)`` tuple.  ``None`` disables it.
+    :type timeout: float or Tuple[float, float]
+    :param retry: Policy to retry idempotent requests which failed with a
+        connection error or a 502, 503 or 504 status, like the ones returned
+        while Core restarts.  Requests are not retried by default.
+    :type retry: :class:`RetryPolicy`
+    :param cache: Cache of the ``GET`` responses from Core.  The write
+        requests made through this client invalidate the entries they make
+        stale.  Responses are not cached by default.
+    :type cache: :class:`ResponseCache`
+    :param single_flight: Where the identical ``GET`` requests made at the
+        same time by several threads are coalesced into a single one.  Its
+        ``coalesced`` attribute counts the requests which were spared.
+        ``None`` disables the coalescing.
+    :type single_flight: :class:`SingleFlight`
+    :param json_decoder: Decoder of the JSON responses: ``'orjson'``,
+        ``'msgspec'``, ``'json'`` or a function taking the body as bytes.
+        Defaults to the fastest installed library.
+    :type json_decoder: str or Callable[[bytes], Any]
+    :param transport: Transport sending the requests to Core instead of the
+        TCP ``session_pool``: a :class:`UnixSocketTransport`, or a
+        :class:`WSGITransport` calling Core's REST application in the same
+        process.
+    :type transport: :class:`Transport`
+    :param hedging: Policy sending a second copy of the ``GET`` requests
+        which take longer than most, to cut the tail latency.  With several
+        base URLs, the copy goes to another frontend.  Requests are not
+        hedged by default.
+    :type hedging: :class:`HedgingPolicy`
+    :param circuit_breaker: Circuit breaker making the calls fail fast with
+        :class:`CircuitOpenError` while Core keeps failing, instead of
+        waiting for the connection timeouts.  All the requests are sent by
+        default.
+    :type circuit_breaker: :class:`CircuitBreaker`
+    :param limiter: Rate and concurrency limits of the requests, per class
+        of routes (reads and writes) and per domain, to keep bulk scripts
+        from overloading Core.  The calls over the limits wait for their
+        turn.  Unlimited by default.
+    :type limiter: :class:`RateLimiter`
+    :param scheduler: Scheduler dispatching the interactive calls ahead of
+        the bulk ones, see :meth:`priority`.  By default, the calls are sent
+        as they come.
+    :type scheduler: :class:`PriorityScheduler`
+    :param middleware: Middleware wrapping each call to Core, the first one
+        being the outermost.  See :class:`Middleware`.
+    :type middleware: List[:class:`Middleware`]
+    :param tracer: Tracer opening a span for each operation of the client and
+        of the objects it returns, and for each call to Core.  See
+        :class:`Tracer`.
+    :type tracer: :class:`Tracer`
     """
 
-    def __init__(self, baseurl, name=None, password=None, request_hooks=None):
+    def __init__(self, baseurl, name=None, password=None, request_hooks=None,
+                 session_pool=None, timeout=MISSING, retry=None, cache=None,
+                 single_flight=MISSING, json_decoder=None, transport=None,
+                 hedging=None, circuit_breaker=None, limiter=None,
+                 scheduler=None, middleware=None, tracer=None):
         """Initialize client access to the REST API."""
-        self._connection = Connection(baseurl, name, password, request_hooks)
+        self._connection = Connection(baseurl, name, password, request_hooks,
+                                      session_pool=session_pool,
+                                      timeout=timeout, retry=retry,
+                                      cache=cache,
+                                      single_flight=single_flight,
+                                      json_decoder=json_decoder,
+                                      transport=transport,
+                                      hedging=hedging,
+                                      circuit_breaker=circuit_breaker,
+                                      limiter=limiter,
+                                      scheduler=scheduler,
+                                      middleware=middleware,
+                                      tracer=tracer)
 
     def __repr__(self):
         return '<Client ({0.name}:{0.password}) {0.baseurl}>'.format(
             self._connection)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @no_trace
+    def close(self):
+        """Close the kept alive HTTP connections to Core.
+
+        A ``session_pool`` or ``transport`` given to the constructor is not
+        closed, since it may be shared with other clients.
+        """
+        self._connection.close()
+
+    @no_trace
+    def deadline(self, timeout):
+        """Share a single time budget between all the calls of a block.
+        ::
+
+            with client.deadline(0.5):
+                mlist = client.get_list('ant@example.com')
+                owners = mlist.owners
+
+        Every REST call made inside the block, including the lazy fetches of
+        objects data, is given the time left, and
+        :class:`DeadlineExceeded` is raised as soon as it runs out.
+
+        :param float timeout: The time budget, in seconds.
+        """
+        return deadline(timeout)
+
+    @no_trace
+    def priority(self, lane):
+        """Send all the calls of a block in a priority lane.
+        ::
+
+            with client.priority('bulk'):
+                for member in mlist.members:
+                    ...
+
+        With a ``scheduler``, the calls waiting for their turn in the
+        ``'interactive'`` lane, the default one, are sent ahead of the ones
+        in the ``'bulk'`` lane.  The lane follows the current thread.
+
+        :param str lane: ``'interactive'`` or ``'bulk'``.
+        """
+        return priority(lane)
+
+    @no_trace
+    def record_calls(self, threshold=3, warn=True):
+        """Record the calls to Core made inside a block.
+        ::
+
+            with client.record_calls() as calls:
+                for domain in client.domains:
+                    print(domain.mail_host)
+            calls.assert_max_calls(1)
+
+        A :class:`NPlusOneWarning` is issued at the end of the block for each
+        route called `threshold` times or more.  See :class:`CallRecorder`.
+
+        :param int threshold: The number of calls to a route reported as a
+            repeat.
+        :param bool warn: Whether to warn about the repeated routes.
+        :returns: The :class:`CallRecorder`.
+        """
+        return CallRecorder(self._connection, threshold, warn)
+
+    @no_trace
     def add_hooks(self, request_hooks):
         """Add a hook to process connections to Mailman's API.
 
@@ -94,6 +244,29 @@ class Client:
         """
         self._connection.add_hooks(request_hooks=request_hooks)
 
+    @no_trace
+    def add_middleware(self, middleware):
+        """Add a middleware wrapping the calls to Core's API.
+        ::
+
+            from mailmanclient import Middleware
+
+            class SlowCalls(Middleware):
+                def on_response(self, context):
+                    if context.elapsed > 1:
+                        print(f'{context.method} {context.url} is slow')
+
+            client.add_middleware(SlowCalls())
+
+        Unlike the request hooks, a middleware sees the response, the time
+        the call took and the exception it raised.  It is added inside the
+        middleware already there.
+
+        :param middleware: The middleware to add.
+        :type middleware: :class:`Middleware`
+        """
+        self._connection.add_middleware(middleware)
+
     @property
     def system(self):
         """Get the basic system information.
@@ -210,6 +383,71 @@ class Client:
             url += '?advertised=true'
         return Page(self._connection, url, MailingList, count, page)
 
+    @no_trace
+    def get_list_paginator(self, count=50, advertised=None, mail_host=None,
+                           max_pages=10, prefetch=True):
+        """Get a paginator caching the pages of MailingLists.
+
+        :param int count: Number of entries per-page (defaults to 50).
+        :param advertised: If marked True, returns all MailingLists including
+                           the ones that aren't advertised.
+        :param mail_host: Domain to filter results by.
+        :param int max_pages: Number of pages kept (defaults to 10).
+        :param bool prefetch: Whether to fetch the pages around the last one
+            in the background (defaults to True).
+        :rtype: :class:`Paginator` of :class:`MailingList`
+        """
+        if mail_host:
+            url = 'domains/{0}/lists'.format(mail_host)
+        else:
+            url = 'lists'
+        if advertised:
+            url += '?advertised=true'
+        return Paginator(self._connection, url, MailingList, count,
+                         max_pages, prefetch)
+
+    def iter_lists(self, count=50, advertised=None, mail_host=None,
+                   prefetch=1):
+        """Iterate over all the MailingLists, page by page.
+
+        The next pages are fetched in the background while a page is
+        processed, see :func:`~mailmanclient.restbase.page.iter_pages`.
+
+        :param int count: Number of entries per-page (defaults to 50).
+        :param advertised: If marked True, returns all MailingLists including
+                           the ones that aren't advertised.
+        :param mail_host: Domain to filter results by.
+        :param int prefetch: Number of pages fetched ahead (defaults to 1).
+        :returns: An iterator of :class:`MailingList`.
+        """
+        if mail_host:
+            url = 'domains/{0}/lists'.format(mail_host)
+        else:
+            url = 'lists'
+        if advertised:
+            url += '?advertised=true'
+        yield from iter_entries(self._connection, url, MailingList, count,
+                                prefetch)
+
+    def count_lists(self, advertised=None, mail_host=None, max_age=None):
+        """Return the number of MailingLists, without fetching them.
+
+        :param advertised: If marked True, counts all MailingLists including
+                           the ones that aren't advertised.
+        :param mail_host: Domain to filter results by.
+        :param float max_age: If given, a count made less than this number
+            of seconds ago may be returned, see
+            :meth:`~mailmanclient.restbase.connection.Connection.count`.
+        :rtype: int
+        """
+        if mail_host:
+            url = 'domains/{0}/lists'.format(mail_host)
+        else:
+            url = 'lists'
+        if advertised:
+            url += '?advertised=true'
+        return self._connection.count(url, max_age)
+
     @property
     def domains(self):
         """Get a list of all Domains.
@@ -220,7 +458,7 @@ class Client:
         response, content = self._connection.call('domains')
         if 'entries' not in content:
             return []
-        return [Domain(self._connection, entry['self_link'])
+        return [Domain(self._connection, entry['self_link'], entry)
                 for entry in sorted(content['entries'],
                                     key=itemgetter('mail_host'))]
 
@@ -237,6 +475,18 @@ class Client:
         return [Member(self._connection, entry['self_link'], entry)
                 for entry in content['entries']]
 
+    def stream_members(self):
+        """Iterate over all the Members while they are received.
+
+        The members are built one at a time as the response is parsed, so
+        that the memory used doesn't depend on their number.
+
+        :returns: An iterator of all the list members.
+        :rtype: Iterator[:class:`Member`]
+        """
+        for entry in self._connection.stream('members'):
+            yield Member(self._connection, entry['self_link'], entry)
+
     def get_member(self, fqdn_listname, subscriber_address):
         """Get the Member object for a given MailingList and Subsciber's Email
         Address.
@@ -269,6 +519,39 @@ class Client:
         """
         return Page(self._connection, 'members', Member, count, page)
 
+    @no_trace
+    def get_member_paginator(self, count=50, max_pages=10, prefetch=True):
+        """Get a paginator caching the pages of Members.
+
+        :param int count: Number of items per page.
+        :param int max_pages: Number of pages kept (defaults to 10).
+        :param bool prefetch: Whether to fetch the pages around the last one
+            in the background (defaults to True).
+        :rtype: :class:`Paginator` of :class:`Member`
+        """
+        return Paginator(self._connection, 'members', Member, count,
+                         max_pages, prefetch)
+
+    def iter_members(self, count=50, prefetch=1):
+        """Iterate over all the Members, page by page.
+
+        :param int count: Number of entries per-page (defaults to 50).
+        :param int prefetch: Number of pages fetched ahead (defaults to 1).
+        :returns: An iterator of :class:`Member`.
+        """
+        yield from iter_entries(self._connection, 'members', Member,
+                                count, prefetch)
+
+    def count_members(self, max_age=None):
+        """Return the number of Members, without fetching them.
+
+        :param float max_age: If given, a count made less than this number
+            of seconds ago may be returned, see
+            :meth:`~mailmanclient.restbase.connection.Connection.count`.
+        :rtype: int
+        """
+        return self._connection.count('members', max_age)
+
     @property
     def users(self):
         """Get all the users.
@@ -283,6 +566,18 @@ class Client:
                 for entry in sorted(content['entries'],
                                     key=itemgetter('self_link'))]
 
+    def stream_users(self):
+        """Iterate over all the users while they are received.
+
+        Unlike :attr:`users`, the users are built one at a time as the
+        response is parsed, and are returned in the order of Core.
+
+        :returns: An iterator of all the users in Mailman Core.
+        :rtype: Iterator[:class:`User`]
+        """
+        for entry in self._connection.stream('users'):
+            yield User(self._connection, entry['self_link'], entry)
+
     def get_user_page(self, count=50, page=1):
         """Get all the users with pagination.
 
@@ -293,6 +588,39 @@ class Client:
         """
         return Page(self._connection, 'users', User, count, page)
 
+    @no_trace
+    def get_user_paginator(self, count=50, max_pages=10, prefetch=True):
+        """Get a paginator caching the pages of users.
+
+        :param int count: Number of entries per-page (defaults to 50).
+        :param int max_pages: Number of pages kept (defaults to 10).
+        :param bool prefetch: Whether to fetch the pages around the last one
+            in the background (defaults to True).
+        :rtype: :class:`Paginator` of :class:`User`
+        """
+        return Paginator(self._connection, 'users', User, count,
+                         max_pages, prefetch)
+
+    def iter_users(self, count=50, prefetch=1):
+        """Iterate over all the users, page by page.
+
+        :param int count: Number of entries per-page (defaults to 50).
+        :param int prefetch: Number of pages fetched ahead (defaults to 1).
+        :returns: An iterator of :class:`User`.
+        """
+        yield from iter_entries(self._connection, 'users', User, count,
+                                prefetch)
+
+    def count_users(self, max_age=None):
+        """Return the number of users, without fetching them.
+
+        :param float max_age: If given, a count made less than this number
+            of seconds ago may be returned, see
+            :meth:`~mailmanclient.restbase.connection.Connection.count`.
+        :rtype: int
+        """
+        return self._connection.count('users', max_age)
+
     def create_domain(self, mail_host, base_url=MISSING,
                       description=None, owner=None, alias_domain=None):
         """Create a new Domain.
@@ -415,6 +743,26 @@ class Client:
         """
         return Page(self._connection, 'bans', BannedAddress, count, page)
 
+    def iter_bans(self, count=50, prefetch=1):
+        """Iterate over all the global bans, page by page.
+
+        :param int count: Number of entries per-page (defaults to 50).
+        :param int prefetch: Number of pages fetched ahead (defaults to 1).
+        :returns: An iterator of :class:`BannedAddress`.
+        """
+        yield from iter_entries(self._connection, 'bans', BannedAddress,
+                                count, prefetch)
+
+    def count_bans(self, max_age=None):
+        """Return the number of global bans, without fetching them.
+
+        :param float max_age: If given, a count made less than this number
+            of seconds ago may be returned, see
+            :meth:`~mailmanclient.restbase.connection.Connection.count`.
+        :rtype: int
+        """
+        return self._connection.count('bans', max_age)
+
     @property
     def templates(self):
         """Get all site-context templates.
@@ -499,3 +847,15 @@ class Client:
         """
         url = 'users/find?q={}'.format(quote(query))
         return Page(self._connection, url, User, count, page)
+
+    def iter_find_users(self, query, count=50, prefetch=1):
+        """Same as :py:meth:`find_users` but iterates over the results page
+        by page.
+
+        :param str query: The string to search for.
+        :param int count: Number of entries per-page (defaults to 50).
+        :param int prefetch: Number of pages fetched ahead (defaults to 1).
+        :returns: An iterator of :class:`User`.
+        """
+        url = 'users/find?q={}'.format(quote(query))
+        yield from iter_entries(self._connection, url, User, count, prefetch)
@@ -19,3 +19,12 @@ __version__ = '3.3.5'
 
 DEFAULT_PAGE_ITEM_COUNT = 50
 MISSING = object()
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_POOL_IDLE_TIMEOUT = 30
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
@@ -20,8 +20,41 @@ __all__ = [
     'Connection',
 ]
 
+import asyncio
+import functools
+import time
+from concurrent import futures
 from urllib.error import HTTPError
-from mailmanclient.restbase.connection import Connection as BaseConnection
+
+from mailmanclient.constants import DEFAULT_STREAM_CHUNK_SIZE
+from mailmanclient.restbase.connection import (
+    CircuitOpenError, Connection as BaseConnection, DeadlineExceeded,
+    MailmanConnectionError)
+from mailmanclient.restbase.deadline import current_deadline
+from mailmanclient.restbase.middleware import CallContext
+from mailmanclient.restbase.page import _page_url
+from mailmanclient.restbase.scheduler import current_priority
+from mailmanclient.restbase.singleflight import AsyncSingleFlight
+from mailmanclient.restbase.stream import aiter_entries
+
+
+async def _aiter(iterable):
+    for item in iterable:
+        yield item
+
+
+@functools.lru_cache(maxsize=None)
+def _get_connection_errors():
+    """Return the exceptions raised when no response was received.
+
+    Besides :exc:`OSError`, httpx raises its own exceptions, which don't
+    inherit from it.
+    """
+    try:
+        import httpx
+    except ImportError:
+        return (OSError,)
+    return (OSError, httpx.TransportError)
 
 
 class Connection(BaseConnection):
@@ -33,21 +66,369 @@ class Connection(BaseConnection):
     folks interested in others, it is easy to provide a wrapper which accept
     such parameters.
 
-    :param client: The http client object with ``request`` method.
+    The ``timeout`` is enforced on the whole call (the ``connect`` and
+    ``read`` parts of a tuple are added up), on top of the timeouts the http
+    client may have itself.
+
+    :param client: The http client object with ``request`` method.  It is
+        not used if a ``transport`` is given.
     """
 
+    _single_flight_class = AsyncSingleFlight
+
     def __init__(self, client, *args, **kw) -> None:
         self.client = client
+        # The event loop the client is used on, for the health probes.
+        self._loop = None
         super().__init__(*args, **kw)
 
-    async def call(self, path, data=None, method=None):
-        params = self._prepare_request(
-            path, data, method
-            )
-        response = await self.client.request(auth=self.auth, **params)
+    def _get_call_timeout(self):
+        """Return the number of seconds the whole call may take, or None."""
+        timeout = self.timeout
+        if isinstance(timeout, tuple):
+            timeout = sum(part for part in timeout if part is not None) or None
+        current = current_deadline()
+        if current is None:
+            return timeout
+        remaining = current.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(
+                'Deadline of {}s exceeded'.format(current.timeout))
+        return remaining if timeout is None else min(timeout, remaining)
+
+    async def _send(self, params, timeout):
+        """Send a request, hedging it if the hedging policy says so.
+
+        :returns: The response, whatever its status code.
+        :raises MailmanConnectionError: when no response is received in time.
+        """
+        if not self._is_hedged(params):
+            return await self._send_once(params, timeout)
+        delay = self.hedging.get_delay()
+        starts = {}
+
+        def submit():
+            task = asyncio.ensure_future(self._send_once(params, timeout))
+            starts[task] = time.monotonic()
+            return task
+
+        first = submit()
+        pending = [first]
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                pending = []
+                response = first.result()
+                self.hedging.record(time.monotonic() - starts[first])
+                return response
+            permit = await self._try_acquire_permit(params)
+            if permit is None:
+                # The copy would go past the limits of the client.
+                response = await first
+                self.hedging.record(time.monotonic() - starts[first],
+                                    skipped=True)
+                return response
+            second = submit()
+            second.add_done_callback(
+                lambda task: self._release_permit(permit))
+            pending.append(second)
+            error = None
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer the first copy when both answered.
+                for task in [task for task in pending if task in done]:
+                    pending.remove(task)
+                    try:
+                        response = task.result()
+                    except MailmanConnectionError as e:
+                        error = e
+                        continue
+                    self.hedging.record(time.monotonic() - starts[task],
+                                        fired=True, won=task is second)
+                    return response
+            self.hedging.record(None, fired=True)
+            raise error
+        finally:
+            # The slower copy, or both if the call itself was cancelled.
+            for task in pending:
+                task.cancel()
+
+    async def _send_once(self, params, timeout):
+        """Send a single HTTP request.
+
+        :returns: The response, whatever its status code.
+        :raises MailmanConnectionError: when no response is received in time.
+        """
+        endpoint, params = self._acquire_endpoint(params)
+        circuit = self._circuit_allow(endpoint)
+        if endpoint is not None:
+            self._loop = asyncio.get_running_loop()
+        response = error = None
+        cancelled = False
+        try:
+            if self._transport is not None:
+                request = self._transport.arequest(
+                    auth=self.auth, timeout=timeout, **params)
+            elif params.get('stream'):
+                request = self._send_streamed(params)
+            else:
+                request = self.client.request(auth=self.auth, **params)
+            response = await asyncio.wait_for(request, timeout)
+            return response
+        except asyncio.TimeoutError as e:
+            current = current_deadline()
+            if current is not None and current.expired:
+                # Cut short by the caller, not a failure of the endpoint.
+                cancelled = True
+                raise DeadlineExceeded(
+                    'Deadline of {}s exceeded'.format(current.timeout))
+            error = e
+            raise MailmanConnectionError(
+                'Could not connect to Mailman API: ',
+                'timed out after {}s'.format(timeout))
+        except _get_connection_errors() as e:
+            error = e
+            raise MailmanConnectionError(
+                'Could not connect to Mailman API: ', repr(e))
+        except asyncio.CancelledError:
+            # Neither a success nor a failure, e.g. the slower hedged copy.
+            cancelled = True
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._circuit_record(circuit, response, error)
+            if cancelled:
+                self._cancel_endpoint(endpoint)
+            else:
+                self._release_endpoint(endpoint, response, error)
+
+    def _probe(self, endpoint):
+        """Whether an endpoint answers to ``system/versions``.
+
+        The probe runs in the prober thread, while the http client belongs
+        to the event loop of the calls, so it is sent on that loop.  Until
+        a call ran, an endpoint is deemed unreachable.
+        """
+        if self._transport is not None:
+            return super()._probe(endpoint)
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return False
+        future = asyncio.run_coroutine_threadsafe(
+            self._aprobe(endpoint), loop)
+        try:
+            return future.result(self._get_call_timeout())
+        except futures.TimeoutError:
+            future.cancel()
+            return False
+
+    async def _aprobe(self, endpoint):
+        params = self._prepare_request('system/versions', None, 'GET')
+        params['url'] = self.rewrite_url(params['url'], endpoint)
+        try:
+            response = await asyncio.wait_for(
+                self.client.request(auth=self.auth, **params),
+                self._get_call_timeout())
+        except (asyncio.TimeoutError, *_get_connection_errors()):
+            return False
+        return response.status_code // 100 == 2
+
+    def _send_streamed(self, params):
+        """Send a request whose body is read later, with an httpx client."""
+        params = dict(params)
+        del params['stream']
+        request = self.client.build_request(**params)
+        return self.client.send(request, auth=self.auth, stream=True)
+
+    def _handle_response(self, params, response):
         if response.status_code // 100 != 2:
             raise HTTPError(params.get('url'), response.status_code,
                             response.content, None, None)
         if len(response.content) == 0:
             return response, None
-        return response, response.json()
+        return response, self.json_decoder(response.content)
+
+    async def _send_with_retries(self, params, context=None):
+        attempt = 0
+        while True:
+            try:
+                response = await self._send(params, self._get_call_timeout())
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except MailmanConnectionError as error:
+                delay = self._get_retry_delay(
+                    params['method'], attempt, error=error)
+                if delay is None:
+                    raise
+            else:
+                delay = self._get_retry_delay(
+                    params['method'], attempt, response=response)
+                if delay is None:
+                    return response
+            attempt += 1
+            if context is not None:
+                context.retries += 1
+            await asyncio.sleep(delay)
+
+    async def _acquire_permit(self, params):
+        lane = permit = None
+        if self.scheduler is not None:
+            lane = current_priority()
+            if not await self.scheduler.aacquire(
+                    lane, timeout=self._get_flight_timeout()):
+                raise self._deadline_exceeded()
+        try:
+            if self.limiter is not None:
+                permit = await self.limiter.aacquire(
+                    params['method'], self._cache_key(params),
+                    params['data'], timeout=self._get_flight_timeout())
+                if permit is None:
+                    raise self._deadline_exceeded()
+        except BaseException:
+            self._release_permit((lane, None))
+            raise
+        return lane, permit
+
+    async def _try_acquire_permit(self, params):
+        lane = permit = None
+        if self.scheduler is not None:
+            lane = current_priority()
+            if not await self.scheduler.aacquire(lane, timeout=0):
+                return None
+        if self.limiter is not None:
+            permit = await self.limiter.aacquire(
+                params['method'], self._cache_key(params), params['data'],
+                timeout=0)
+            if permit is None:
+                self._release_permit((lane, None))
+                return None
+        return lane, permit
+
+    async def _fetch(self, params, etag=None, context=None):
+        generation = None if self.cache is None else self.cache.generation
+        start = time.monotonic()
+        permit = await self._acquire_permit(params)
+        sent = time.monotonic()
+        try:
+            response = await self._send_with_retries(params, context)
+        finally:
+            if context is not None:
+                context.queue_time = sent - start
+                context.network_time = time.monotonic() - sent
+            self._release_permit(permit)
+            self._cache_invalidate(params)
+        return self._cache_store(params, response, generation, etag)
+
+    async def count(self, path, max_age=None):
+        key = self._path_key(path)
+        if max_age is not None:
+            count = self.counts.get(key, max_age)
+            if count is not None:
+                return count
+        generation = self.counts.generation
+        response, content = await self.call(_page_url(path, 1, 1))
+        self.counts.set(key, content['total_size'], generation)
+        return content['total_size']
+
+    async def stream(self, path, meta=None,
+                     chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        """Yield the entries of a collection while it is received.
+
+        See :meth:`mailmanclient.restbase.connection.Connection.stream`.
+        With an httpx client, the body is read as it is received, a
+        ``transport`` may read it all first.
+
+        :param path: The url path to the collection.
+        :param meta: If given, a dictionary which is updated with the other
+            keys of the collection, such as ``total_size``.
+        :param chunk_size: The number of bytes read at a time.
+        :return: An async iterator of the entries, as dictionaries.
+        :raises HTTPError: when a non-2xx status code is returned.
+        :raises DeadlineExceeded: when the current deadline runs out.
+        """
+        params = self._prepare_request(path, None, 'GET')
+        if self.request_hooks:
+            params = self._process_request_hooks(params)
+        if self._transport is None:
+            # The transports read the body in another thread, all at once.
+            params['stream'] = True
+        permit = await self._acquire_permit(params)
+        try:
+            response = await self._send_with_retries(params)
+            try:
+                if response.status_code // 100 != 2:
+                    if hasattr(response, 'aread'):
+                        await response.aread()
+                    self._handle_response(params, response)
+                chunks = self._aiter_chunks(response, chunk_size)
+                async for entry in aiter_entries(
+                        chunks, response.encoding or 'utf-8', meta):
+                    yield entry
+            finally:
+                if hasattr(response, 'aclose'):
+                    await response.aclose()
+                else:
+                    response.close()
+        finally:
+            self._release_permit(permit)
+
+    async def _aiter_chunks(self, response, chunk_size):
+        if hasattr(response, 'aiter_bytes'):
+            chunks = response.aiter_bytes(chunk_size)
+        else:
+            chunks = _aiter(response.iter_content(chunk_size))
+        async for chunk in chunks:
+            # Stop reading when the deadline runs out.
+            self._get_call_timeout()
+            yield chunk
+
+    async def call(self, path, data=None, method=None):
+        params = self._prepare_request(
+            path, data, method
+            )
+        if self.request_hooks:
+            params = self._process_request_hooks(params)
+        context = CallContext(path, data, params,
+                              self._cache_key(params))
+        handler = self._call
+        for middleware in reversed(self.middleware):
+            handler = functools.partial(middleware.awrap, call_next=handler)
+        return await handler(context)
+
+    async def _call(self, context):
+        params = context.params
+        try:
+            while True:
+                response, etag = self._cache_lookup(params)
+                if response is not None:
+                    context.cached = True
+                    break
+                response = await self._get_response(params, etag, context)
+                if response is not None:
+                    break
+                # The entry was dropped while it was revalidated.
+            context.response = response
+            context.content = self._handle_response(params, response)[1]
+        finally:
+            context.finish()
+        return response, context.content
+
+    async def _get_response(self, params, etag, context=None):
+        key = self._flight_key(params)
+        if key is None:
+            return await self._fetch(params, etag, context)
+        try:
+            response, leader = await self.single_flight.do(
+                key, self._fetch_shared, params, etag, context,
+                timeout=self._get_flight_timeout())
+        except asyncio.TimeoutError:
+            raise self._deadline_exceeded()
+        if context is not None and leader is not context:
+            context.join(leader)
+        return response
+
+    async def _fetch_shared(self, params, etag, context):
+        return await self._fetch(params, etag, context), context
@@ -0,0 +1,225 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Paginated collections for the async client."""
+
+__all__ = [
+    'AsyncPage',
+    'fetch_all',
+    'iter_entries',
+    'iter_pages',
+]
+
+import asyncio
+from collections import deque
+from typing import (
+    AsyncIterator, Generic, Iterator, List, Optional, Type, TypeVar)
+
+from mailmanclient.constants import DEFAULT_PAGE_ITEM_COUNT
+from mailmanclient.restbase.async_base import RESTObject
+from mailmanclient.restbase.page import _page_count, _page_url, _unique
+from mailmanclient.restobjects.types import ConnectionProto, ContentType
+
+
+T = TypeVar('T', bound=RESTObject)
+
+
+class AsyncPage(Generic[T]):
+    """A page of a collection, for the async client.
+
+    The pages are created with :meth:`fetch`, since they can't be fetched
+    when they are instantiated like :class:`mailmanclient.restbase.page.Page`.
+
+    :param connection: The connection to fetch the pages with.
+    :param path: The path of the collection.
+    :param model: The class of the entries.
+    :param count: The number of entries per page.
+    :param page: The number of the page, starting at 1.
+    :param content: The content of the response for the page.
+    """
+
+    def __init__(self, connection: ConnectionProto, path: str,
+                 model: Type[T], count: int, page: int,
+                 content: ContentType) -> None:
+        self._connection = connection
+        self._path = path
+        self._model = model
+        self._count = count
+        self._page = page
+        self.total_size = content['total_size']
+        self._entries = [model(connection, entry)
+                         for entry in content.get('entries', [])]
+
+    @classmethod
+    async def fetch(cls, connection: ConnectionProto, path: str,
+                    model: Type[T], count: int = DEFAULT_PAGE_ITEM_COUNT,
+                    page: int = 1) -> 'AsyncPage[T]':
+        """Fetch a page of a collection.
+
+        See :class:`AsyncPage` for the parameters.
+        """
+        response, content = await connection.call(
+            _page_url(path, count, page))
+        return cls(connection, path, model, count, page, content)
+
+    def __getitem__(self, key):
+        return self._entries[key]
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return '<AsyncPage {0} ({1})>'.format(self._page, self._model)
+
+    @property
+    def nr(self) -> int:
+        return self._page
+
+    @property
+    def has_previous(self) -> bool:
+        return self._page > 1
+
+    @property
+    def has_next(self) -> bool:
+        return self._count * self._page < self.total_size
+
+    @property
+    def page_count(self) -> int:
+        """The number of pages of the collection, at least 1."""
+        return _page_count(self.total_size, self._count)
+
+    async def next(self) -> 'AsyncPage[T]':
+        """Fetch the next page."""
+        return await self.fetch(self._connection, self._path, self._model,
+                                self._count, self._page + 1)
+
+    async def previous(self) -> Optional['AsyncPage[T]']:
+        """Fetch the previous page, if there is one."""
+        if self.has_previous:
+            return await self.fetch(self._connection, self._path,
+                                    self._model, self._count, self._page - 1)
+        return None
+
+    async def fetch_all(self, parallel: int = 4) -> List[T]:
+        """Return the entries of all the pages of the collection.
+
+        The other pages are fetched at the same time by `parallel` tasks.
+        The entries are returned in order, and those which moved to another
+        page while the pages were fetched are returned only once.
+
+        :param parallel: The number of pages fetched at the same time.
+        """
+        semaphore = asyncio.Semaphore(max(1, parallel))
+
+        async def fetch(nr):
+            async with semaphore:
+                return await self.fetch(self._connection, self._path,
+                                        self._model, self._count, nr)
+
+        nrs = [nr for nr in range(1, self.page_count + 1)
+               if nr != self._page]
+        tasks = [asyncio.ensure_future(fetch(nr)) for nr in nrs]
+        try:
+            pages = dict(zip(nrs, await asyncio.gather(*tasks)))
+        finally:
+            # The other pages are not needed when one of them failed.
+            for task in tasks:
+                task.cancel()
+        pages[self._page] = self
+        return _unique([entry for nr in sorted(pages) for entry in pages[nr]],
+                       lambda entry: entry._data['self_link'])
+
+
+async def fetch_all(
+        connection: ConnectionProto, path: str, model: Type[T],
+        count: int = DEFAULT_PAGE_ITEM_COUNT, parallel: int = 4) -> List[T]:
+    """Fetch all the pages of a collection.
+
+    Once the first page tells the size of the collection, the other pages
+    are fetched at the same time, see :meth:`AsyncPage.fetch_all`.
+
+    :param connection: The connection to fetch the pages with.
+    :param path: The path of the collection.
+    :param model: The class of the entries.
+    :param count: The number of entries per page.
+    :param parallel: The number of pages fetched at the same time.
+    """
+    page = await AsyncPage.fetch(connection, path, model, count)
+    return await page.fetch_all(parallel)
+
+
+async def iter_pages(
+        connection: ConnectionProto, path: str, model: Type[T],
+        count: int = DEFAULT_PAGE_ITEM_COUNT,
+        prefetch: int = 1) -> AsyncIterator[AsyncPage[T]]:
+    """Iterate over all the pages of a collection.
+
+    While a page is processed, the `prefetch` next ones are fetched by other
+    tasks, and at most ``prefetch + 1`` pages are held at once.  The pages
+    being fetched are cancelled when the iteration is stopped, either
+    because the iterating task is cancelled or because the iterator is
+    closed.
+
+    :param connection: The connection to fetch the pages with.
+    :param path: The path of the collection.
+    :param model: The class of the entries.
+    :param count: The number of entries per page.
+    :param prefetch: The number of pages fetched ahead, 0 fetches the pages
+        only when they are needed.
+    """
+    page = await AsyncPage.fetch(connection, path, model, count)
+    last = page.page_count
+    next_nr = 2
+    pending = deque()
+    try:
+        while True:
+            while len(pending) < prefetch and next_nr <= last:
+                pending.append(asyncio.ensure_future(AsyncPage.fetch(
+                    connection, path, model, count, next_nr)))
+                next_nr += 1
+            yield page
+            if pending:
+                page = await pending.popleft()
+            elif next_nr <= last:
+                page = await AsyncPage.fetch(
+                    connection, path, model, count, next_nr)
+                next_nr += 1
+            else:
+                return
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def iter_entries(
+        connection: ConnectionProto, path: str, model: Type[T],
+        count: int = DEFAULT_PAGE_ITEM_COUNT,
+        prefetch: int = 1) -> AsyncIterator[T]:
+    """Iterate over the entries of all the pages of a collection.
+
+    See :func:`iter_pages` for the parameters.
+    """
+    pages = iter_pages(connection, path, model, count, prefetch)
+    try:
+        async for page in pages:
+            for entry in page:
+                yield entry
+    finally:
+        # Cancel the prefetched pages with this iterator.
+        await pages.aclose()
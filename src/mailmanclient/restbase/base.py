@@ -63,20 +63,51 @@ class RESTBase:
         self._url = url
         self._rest_data = data
         self._changed_rest_data = {}
+        self._etag = None
+        if isinstance(data, dict):
+            self._etag = data.get('http_etag')
 
     def __repr__(self):
         return '<{0} at {1}>'.format(self.__class__.__name__, self._url)
 
+    def _fetch(self):
+        """Get data from API.
+
+        :returns: The etag and the data, without the etag.
+        """
+        response, content = self._connection.call(self._url)
+        etag = None
+        if isinstance(content, dict):
+            etag = content.pop('http_etag', None)
+        return etag, self._parse(content)
+
+    def _parse(self, content):
+        return content
+
     @property
     def rest_data(self):
         """Get data from API and cache it (only once per instance)."""
         if self._rest_data is None:
-            response, content = self._connection.call(self._url)
-            if isinstance(content, dict) and 'http_etag' in content:
-                del content['http_etag']  # We don't care about etags.
-            self._rest_data = content
+            self._etag, self._rest_data = self._fetch()
         return self._rest_data
 
+    def refresh(self):
+        """Get data from API again.
+
+        The data already loaded is kept if its etag did not change, so that
+        it is not built again.  Changes which were not saved are kept too.
+
+        :returns: Whether the data changed.
+        :rtype: bool
+        """
+        etag, content = self._fetch()
+        changed = (self._rest_data is None or etag is None
+                   or etag != self._etag)
+        if changed:
+            self._rest_data = content
+        self._etag = etag
+        return changed
+
     def _get(self, key):
         if self._properties is not None:
             # Some REST key/values may not be returned by Mailman if the value
@@ -186,15 +217,10 @@ class RESTList(RESTBase, Sequence):
 
     _factory = lambda x: x  # noqa: E731
 
-    @property
-    def rest_data(self):
-        if self._rest_data is None:
-            response, content = self._connection.call(self._url)
-            if 'entries' not in content:
-                self._rest_data = []
-            else:
-                self._rest_data = content['entries']
-        return self._rest_data
+    def _parse(self, content):
+        if 'entries' not in content:
+            return []
+        return content['entries']
 
     def __repr__(self):
         return repr(self.rest_data)
@@ -213,6 +239,15 @@ class RESTList(RESTBase, Sequence):
         for entry in self.rest_data:
             yield self._factory(entry)
 
+    def stream(self):
+        """Iterate over the list while it is received from the API.
+
+        The entries are parsed and built one at a time, and are not kept in
+        :attr:`rest_data`.
+        """
+        for entry in self._connection.stream(self._url):
+            yield self._factory(entry)
+
     def clear(self):
         self._connection.call(self._url, method='DELETE')
         self._reset_cache()
@@ -0,0 +1,254 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Circuit breaker failing fast while Core is down."""
+
+import threading
+import time
+from collections import deque
+
+from mailmanclient.restbase.connection import CircuitOpenError
+
+__metaclass__ = type
+__all__ = [
+    'CLOSED',
+    'CircuitBreaker',
+    'HALF_OPEN',
+    'OPEN',
+]
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class _Circuit:
+    """The state of the circuit of one endpoint."""
+
+    def __init__(self, window):
+        self.state = CLOSED
+        # (failed, slow) for each of the recent requests.
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = None
+        self.probes = 0
+        self.successes = 0
+
+
+class CircuitBreaker:
+    """Stop sending requests to an endpoint which keeps failing.
+
+    The circuit of an endpoint is *closed* while it works.  It *opens* when,
+    among its `window` recent requests (and once there were at least
+    `min_calls` of them), the share of failures reaches `failure_rate`, or
+    the share of the requests slower than `slow_call_duration` reaches
+    `slow_call_rate`.  A failure is a request which got no response, or a
+    5xx status.
+
+    While the circuit is open, calls fail at once with
+    :class:`CircuitOpenError`, without waiting for connection timeouts.
+    After `reset_timeout` seconds, the circuit is *half-open*: up to
+    `half_open_calls` requests are let through as probes, the other ones
+    still fail fast.  If all the probes succeed the circuit closes,
+    otherwise it opens again.
+
+    The circuits are kept per endpoint, so a breaker can be shared between
+    several clients of the same Core.
+
+    :param failure_rate: The share of failed requests, between 0 and 1,
+        which opens the circuit.
+    :type failure_rate: float
+    :param window: The number of recent requests the rates are computed on.
+    :type window: int
+    :param min_calls: The number of requests needed before the circuit can
+        open.
+    :type min_calls: int
+    :param slow_call_duration: The duration, in seconds, above which a
+        request is slow.  By default, the latency is not taken into account.
+    :type slow_call_duration: float
+    :param slow_call_rate: The share of slow requests which opens the
+        circuit.
+    :type slow_call_rate: float
+    :param reset_timeout: How long the circuit stays open before probing
+        the endpoint, in seconds.
+    :type reset_timeout: float
+    :param half_open_calls: The number of probes sent while half-open.
+    :type half_open_calls: int
+    :param on_state_change: A function called with the endpoint base URL,
+        the old state and the new state, one of :data:`CLOSED`,
+        :data:`OPEN` and :data:`HALF_OPEN`, whenever a circuit changes state.
+    :type on_state_change: Callable[[str, str, str], None]
+    """
+
+    def __init__(self, failure_rate=0.5, window=20, min_calls=10,
+                 slow_call_duration=None, slow_call_rate=1.0,
+                 reset_timeout=30, half_open_calls=1, on_state_change=None):
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.on_state_change = on_state_change
+        #: The number of calls which failed fast.
+        self.rejected = 0
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<CircuitBreaker {0}>'.format(
+            {key: circuit.state for key, circuit in self._circuits.items()})
+
+    def _get_circuit(self, key):
+        # Must be called with the lock held.
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit(self.window)
+        return circuit
+
+    def _set_state(self, key, circuit, state, changes):
+        # Must be called with the lock held, the hook is called once it is
+        # released.
+        if circuit.state == state:
+            return
+        changes.append((key, circuit.state, state))
+        circuit.state = state
+        circuit.outcomes.clear()
+        circuit.probes = circuit.successes = 0
+        if state == OPEN:
+            circuit.opened_at = time.monotonic()
+
+    def _notify(self, changes):
+        if self.on_state_change is None:
+            return
+        for key, old, new in changes:
+            self.on_state_change(key, old, new)
+
+    def state(self, key):
+        """Return the state of the circuit of an endpoint.
+
+        :param key: The base URL of the endpoint.
+        """
+        changes = []
+        with self._lock:
+            circuit = self._get_circuit(key)
+            self._check_timeout(key, circuit, changes)
+            state = circuit.state
+        self._notify(changes)
+        return state
+
+    def is_open(self, key):
+        """Whether the requests to an endpoint currently fail fast."""
+        return self.state(key) == OPEN
+
+    def _check_timeout(self, key, circuit, changes):
+        if (circuit.state == OPEN and time.monotonic() - circuit.opened_at
+                >= self.reset_timeout):
+            self._set_state(key, circuit, HALF_OPEN, changes)
+
+    def allow(self, key):
+        """Check that a request can be sent to an endpoint.
+
+        :param key: The base URL of the endpoint.
+        :returns: Whether the request is a probe of a half-open circuit.
+            It must be given back to :meth:`record` or :meth:`release`.
+        :raises CircuitOpenError: when the request must fail fast.
+        """
+        changes = []
+        try:
+            with self._lock:
+                circuit = self._get_circuit(key)
+                self._check_timeout(key, circuit, changes)
+                if circuit.state == CLOSED:
+                    return False
+                if (circuit.state == HALF_OPEN
+                        and circuit.probes < self.half_open_calls):
+                    circuit.probes += 1
+                    return True
+                self.rejected += 1
+                if circuit.state == OPEN:
+                    retry_after = max(0, self.reset_timeout - (
+                        time.monotonic() - circuit.opened_at))
+                    raise CircuitOpenError(
+                        'Circuit open for {0}, retrying in {1:.1f}s'.format(
+                            key, retry_after))
+                raise CircuitOpenError(
+                    'Circuit half-open for {0}, probe in progress'.format(
+                        key))
+        finally:
+            self._notify(changes)
+
+    def record(self, key, probe, latency, failed):
+        """Record the outcome of a request let through by :meth:`allow`.
+
+        :param key: The base URL of the endpoint.
+        :param probe: The value returned by :meth:`allow`.
+        :param latency: How long the request took, in seconds.
+        :param failed: Whether the request failed.
+        """
+        slow = (self.slow_call_duration is not None
+                and latency >= self.slow_call_duration)
+        changes = []
+        with self._lock:
+            circuit = self._get_circuit(key)
+            if probe and circuit.state == HALF_OPEN:
+                if failed or slow:
+                    self._set_state(key, circuit, OPEN, changes)
+                else:
+                    circuit.successes += 1
+                    if circuit.successes >= self.half_open_calls:
+                        self._set_state(key, circuit, CLOSED, changes)
+            elif not probe and circuit.state == CLOSED:
+                # The requests sent before the circuit opened are ignored.
+                circuit.outcomes.append((failed, slow))
+                if self._should_open(circuit):
+                    self._set_state(key, circuit, OPEN, changes)
+        self._notify(changes)
+
+    def release(self, key, probe):
+        """Give back a request which was never completed, e.g. cancelled.
+
+        :param key: The base URL of the endpoint.
+        :param probe: The value returned by :meth:`allow`.
+        """
+        if not probe:
+            return
+        with self._lock:
+            circuit = self._get_circuit(key)
+            if circuit.state == HALF_OPEN and circuit.probes > 0:
+                circuit.probes -= 1
+
+    def _should_open(self, circuit):
+        count = len(circuit.outcomes)
+        if count < self.min_calls:
+            return False
+        failures = sum(1 for failed, slow in circuit.outcomes if failed)
+        if failures >= self.failure_rate * count:
+            return True
+        if self.slow_call_duration is None:
+            return False
+        slow_calls = sum(1 for failed, slow in circuit.outcomes if slow)
+        return slow_calls >= self.slow_call_rate * count
+
+    def reset(self, key=None):
+        """Close the circuit of an endpoint, or of all the endpoints."""
+        changes = []
+        with self._lock:
+            keys = list(self._circuits) if key is None else [key]
+            for key in keys:
+                self._set_state(key, self._get_circuit(key), CLOSED, changes)
+        self._notify(changes)
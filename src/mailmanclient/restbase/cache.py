@@ -0,0 +1,403 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Client-side cache of the REST API responses."""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+__metaclass__ = type
+__all__ = [
+    'CountCache',
+    'ResponseCache',
+]
+
+
+ETAG_RE = re.compile(rb'"http_etag"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+# A write to a collection can change the representation of resources from
+# other collections: subscribing an address changes the list's member_count
+# and creates a user, creating a list changes its domain's lists, etc.
+RELATED_COLLECTIONS = {
+    'addresses': ('members', 'users'),
+    'domains': ('lists',),
+    'lists': ('domains', 'members'),
+    'members': ('addresses', 'lists', 'users'),
+    'users': ('addresses', 'members'),
+}
+
+
+def related_collections(key):
+    """Return the collections a write to the given key may change."""
+    collection = key.split('?', 1)[0].split('/', 1)[0]
+    return (collection,) + RELATED_COLLECTIONS.get(collection, ())
+
+
+def is_write(method, key):
+    """Whether a request may change data on Core.
+
+    The ``find`` resources are queried with ``POST`` requests but they don't
+    change anything.
+    """
+    if method in ('GET', 'HEAD', 'OPTIONS'):
+        return False
+    return not key.split('?', 1)[0].endswith('/find')
+
+
+def normalize_path(url, base_path=''):
+    """Return the cache key of a URL.
+
+    The key is the path relative to the API root, without trailing slash,
+    followed by the sorted query string.  The scheme and host are ignored,
+    since the URLs are rewritten to the same Core anyway.
+
+    :param url: The URL to normalize.
+    :param base_path: The path of the API root, e.g. ``/3.1/``.
+    """
+    parts = urlsplit(url)
+    path = parts.path
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path):]
+    path = path.strip('/')
+    if parts.query:
+        query = urlencode(sorted(parse_qsl(parts.query,
+                                           keep_blank_values=True)))
+        path = '{}?{}'.format(path, query)
+    return path
+
+
+def get_etag(response):
+    """Return the etag of a response, or None.
+
+    Core doesn't send an ``ETag`` header, the etag of a resource or of a
+    collection is the ``http_etag`` key of the JSON body.  It is added last,
+    after the ones of the collection entries, so the body is searched
+    backwards instead of being decoded.
+    """
+    etag = response.headers.get('etag')
+    if etag:
+        return etag
+    content = response.content
+    index = content.rfind(b'"http_etag"')
+    if index == -1:
+        return None
+    match = ETAG_RE.match(content, index)
+    if match is None:
+        return None
+    return json.loads(match.group(1))
+
+
+class CacheEntry:
+    """A cached response."""
+
+    __slots__ = ('response', 'expires_at', 'size', 'etag')
+
+    def __init__(self, response, expires_at, size, etag=None):
+        self.response = response
+        self.expires_at = expires_at
+        self.size = size
+        self.etag = etag
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+
+class ResponseCache:
+    """A cache of the ``GET`` responses from Core, shared by a client.
+
+    Entries expire after a time-to-live which can be set per route, and the
+    least recently used entries are evicted when the cache holds too many
+    entries or bytes.  Every write request going through the client
+    (``POST``, ``PATCH``, ``PUT`` or ``DELETE``) invalidates the cached
+    responses of the collection it touches, and of the related ones.
+
+    Only the raw body of the responses is kept, each hit decodes it again so
+    that callers never share mutable data.
+
+    Expired entries with an etag are kept until they are evicted: the next
+    request for them is sent with an ``If-None-Match`` header, and the cached
+    body is reused if Core answers ``304 Not Modified`` or sends a body with
+    the same etag.
+
+    A cache should only be used for a single Core, keys don't include the
+    host name.
+
+    :param ttl: The default time-to-live of the entries, in seconds.
+    :type ttl: float
+    :param routes: Time-to-live per route, overriding the default one.  Keys
+        are shell-style patterns matched against the path relative to the API
+        root, e.g. ``'lists/*/config'``, the first matching pattern wins.  A
+        time-to-live of 0 or None disables the cache for the route.
+    :type routes: Mapping[str, float]
+    :param max_entries: The maximum number of cached responses.
+    :type max_entries: int
+    :param max_bytes: The maximum total size of the cached bodies.
+    :type max_bytes: int
+    """
+
+    def __init__(self, ttl=60, routes=None, max_entries=1024,
+                 max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.routes = dict(routes or {})
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<ResponseCache {0} entries, {1} bytes>'.format(
+            len(self._entries), self._size)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """The total size of the cached bodies, in bytes."""
+        return self._size
+
+    @property
+    def generation(self):
+        """A counter incremented by every invalidation.
+
+        A response is only stored if no invalidation happened since the
+        request was sent, which could otherwise have made it stale.
+        """
+        return self._generation
+
+    def stats(self):
+        """Return the statistics of the cache.
+
+        :returns: The number of ``hits`` and ``misses`` of the lookups, of
+            ``revalidations`` of expired entries and how many of them were
+            ``not_modified``, of ``evictions`` and ``invalidations``, and the
+            current number of ``entries`` and ``bytes``.
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(
+                hits=self.hits,
+                misses=self.misses,
+                revalidations=self.revalidations,
+                not_modified=self.not_modified,
+                evictions=self.evictions,
+                invalidations=self.invalidations,
+                entries=len(self._entries),
+                bytes=self._size,
+                )
+
+    def get_ttl(self, key):
+        """Return the time-to-live of a key, according to its route."""
+        path = key.split('?', 1)[0]
+        for pattern, ttl in self.routes.items():
+            if fnmatchcase(path, pattern):
+                return ttl
+        return self.ttl
+
+    def lookup(self, key):
+        """Look up the cached response for a key.
+
+        :returns: A ``(response, etag)`` tuple.  The response is None unless
+            a fresh entry was found, the etag is the one of the expired entry
+            to revalidate, if any.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            if entry.expired:
+                self.misses += 1
+                if entry.etag is None:
+                    self._remove(key)
+                    return None, None
+                return None, entry.etag
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.response, None
+
+    def get(self, key):
+        """Return the fresh cached response for a key, or None."""
+        return self.lookup(key)[0]
+
+    def set(self, key, response, generation=None):
+        """Store a response.
+
+        :param key: The normalized path of the request.
+        :param response: The HTTP response.
+        :param generation: The value of :attr:`generation` when the request
+            was sent.  The response is dropped if it changed since then.
+        """
+        ttl = self.get_ttl(key)
+        if not ttl:
+            return
+        size = len(key) + len(response.content)
+        if size > self.max_bytes:
+            return
+        etag = get_etag(response)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(
+                response, time.monotonic() + ttl, size, etag)
+            self._size += size
+            while (len(self._entries) > self.max_entries
+                   or self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def revalidate(self, key, response, etag, generation=None):
+        """Handle the response to a request sent with ``If-None-Match``.
+
+        :param key: The normalized path of the request.
+        :param response: The HTTP response.
+        :param etag: The etag of the expired entry, as returned by
+            :meth:`lookup`.
+        :param generation: The value of :attr:`generation` when the request
+            was sent.
+        :returns: The cached response if it is still valid, renewed for
+            another time-to-live, else `response`, which is stored if
+            successful.  None if Core answered ``304 Not Modified`` but the
+            entry was dropped in the meantime.
+        """
+        not_modified = response.status_code == 304 or (
+            response.status_code == 200 and get_etag(response) == etag)
+        with self._lock:
+            self.revalidations += 1
+            entry = self._entries.get(key)
+            if entry is not None and entry.etag != etag:
+                entry = None
+            if not_modified and entry is not None:
+                self.not_modified += 1
+                entry.expires_at = time.monotonic() + self.get_ttl(key)
+                self._entries.move_to_end(key)
+                return entry.response
+        if response.status_code == 304:
+            return None
+        if response.status_code // 100 == 2:
+            self.set(key, response, generation)
+        return response
+
+    def _remove(self, key):
+        # Must be called with the lock held.
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+
+    def invalidate(self, key):
+        """Drop the entries a write to the given key may have made stale.
+
+        :returns: The number of dropped entries.
+        """
+        prefixes = related_collections(key)
+        with self._lock:
+            self._generation += 1
+            stale = [cached for cached in self._entries
+                     if cached.split('/', 1)[0].split('?', 1)[0] in prefixes]
+            for cached in stale:
+                self._remove(cached)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """Drop all the entries."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._size = 0
+
+
+class CountCache:
+    """The sizes of the collections, as last counted by a client.
+
+    The counts are dropped like the responses of a :class:`ResponseCache`
+    when a write request through the client may have changed them.  They
+    don't expire, each lookup tells how old a count may be.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<CountCache {0} counts>'.format(len(self._counts))
+
+    def __len__(self):
+        return len(self._counts)
+
+    @property
+    def generation(self):
+        """A counter incremented by every invalidation, see
+        :attr:`ResponseCache.generation`."""
+        return self._generation
+
+    def get(self, key, max_age):
+        """Return the count of a collection, or None.
+
+        :param key: The normalized path of the collection.
+        :param max_age: The maximum age of the count, in seconds.
+        """
+        with self._lock:
+            counted = self._counts.get(key)
+        if counted is None or time.monotonic() - counted[0] > max_age:
+            return None
+        return counted[1]
+
+    def set(self, key, count, generation=None):
+        """Store the count of a collection.
+
+        :param key: The normalized path of the collection.
+        :param count: The number of entries of the collection.
+        :param generation: The value of :attr:`generation` when the count
+            was requested.  The count is dropped if it changed since then.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._counts[key] = (time.monotonic(), count)
+
+    def invalidate(self, key):
+        """Drop the counts a write to the given key may have changed."""
+        prefixes = related_collections(key)
+        with self._lock:
+            self._generation += 1
+            for counted in [counted for counted in self._counts
+                            if counted.split('/', 1)[0].split('?', 1)[0]
+                            in prefixes]:
+                del self._counts[counted]
+
+    def clear(self):
+        """Drop all the counts."""
+        with self._lock:
+            self._generation += 1
+            self._counts.clear()
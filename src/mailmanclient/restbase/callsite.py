@@ -0,0 +1,63 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Find the code which made a REST call."""
+
+import os
+import sys
+from collections import namedtuple
+
+__metaclass__ = type
+__all__ = [
+    'CallSite',
+    'get_call_site',
+]
+
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TESTS_DIR = os.path.join(_PACKAGE_DIR, 'tests')
+
+
+def _is_library(filename):
+    return (filename.startswith(_PACKAGE_DIR + os.sep)
+            and not filename.startswith(_TESTS_DIR + os.sep))
+
+
+class CallSite(namedtuple('CallSite', ['filename', 'lineno', 'function'])):
+    """A line of the code using the client."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return '{0.filename}:{0.lineno} in {0.function}'.format(self)
+
+
+def get_call_site():
+    """Return the innermost frame of the stack outside of mailmanclient.
+
+    It is the line which made a REST call, even when the call was made by a
+    lazy attribute of an object.
+
+    :returns: A :class:`CallSite`, or None if the whole stack is in
+        mailmanclient.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if not _is_library(code.co_filename):
+            return CallSite(code.co_filename, frame.f_lineno, code.co_name)
+        frame = frame.f_back
+    return None
@@ -0,0 +1,83 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Decoding of the JSON responses."""
+
+import json
+
+__metaclass__ = type
+__all__ = [
+    'DECODERS',
+    'get_decoder',
+]
+
+
+def _stdlib_decoder():
+    return json.loads
+
+
+def _orjson_decoder():
+    import orjson
+    return orjson.loads
+
+
+def _msgspec_decoder():
+    import msgspec
+    decoder = msgspec.json.Decoder()
+
+    def loads(content):
+        try:
+            return decoder.decode(content)
+        except msgspec.DecodeError as error:
+            # Raise the same exception as the other decoders.
+            raise ValueError(str(error)) from error
+    return loads
+
+
+# The available decoders, fastest first.  Each of them takes the raw body and
+# raises a ValueError when it isn't valid JSON.
+DECODERS = {
+    'orjson': _orjson_decoder,
+    'msgspec': _msgspec_decoder,
+    'json': _stdlib_decoder,
+}
+
+
+def get_decoder(decoder=None):
+    """Return a function decoding JSON documents.
+
+    :param decoder: The name of a decoder, one of the keys of
+        :data:`DECODERS`, or a function taking the body of a response as
+        bytes and returning the decoded document.  By default, the fastest
+        installed decoder is used: ``orjson``, then ``msgspec``, then the
+        standard library.
+    :returns: The decoding function.
+    :raises ValueError: when the name of the decoder is unknown.
+    :raises ImportError: when the library of the decoder isn't installed.
+    """
+    if callable(decoder):
+        return decoder
+    if decoder is not None:
+        try:
+            factory = DECODERS[decoder]
+        except KeyError:
+            raise ValueError('Unknown JSON decoder: {}'.format(decoder))
+        return factory()
+    for factory in DECODERS.values():
+        try:
+            return factory()
+        except ImportError:
+            pass
@@ -13,15 +13,35 @@
 #
 # You should have received a copy of the GNU Lesser General Public License
 # along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+import functools
+import threading
+import time
+import warnings
+import weakref
+from concurrent import futures
+from contextvars import copy_context
 from urllib.error import HTTPError
 from urllib.parse import urljoin, urlencode, urlparse, urlunparse
 
-from requests import request
-
-from mailmanclient.constants import __version__
+from mailmanclient.constants import (
+    DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_MAXSIZE, DEFAULT_READ_TIMEOUT,
+    DEFAULT_STREAM_CHUNK_SIZE, MISSING, __version__)
+from mailmanclient.restbase.cache import (
+    CountCache, is_write, normalize_path)
+from mailmanclient.restbase.codec import get_decoder
+from mailmanclient.restbase.deadline import current_deadline, limit_timeout
+from mailmanclient.restbase.endpoints import EndpointSet
+from mailmanclient.restbase.middleware import CallContext
+from mailmanclient.restbase.page import _page_url
+from mailmanclient.restbase.scheduler import current_priority
+from mailmanclient.restbase.session import SessionPool
+from mailmanclient.restbase.singleflight import SingleFlight
+from mailmanclient.restbase.stream import iter_entries
 
 __metaclass__ = type
 __all__ = [
+    'CircuitOpenError',
+    'DeadlineExceeded',
     'MailmanConnectionError',
     'Connection'
 ]
@@ -31,20 +51,99 @@ class MailmanConnectionError(Exception):
     """Custom Exception to catch connection errors."""
 
 
+class DeadlineExceeded(MailmanConnectionError):
+    """The time budget of the current deadline ran out."""
+
+
+class CircuitOpenError(MailmanConnectionError):
+    """The circuit breaker of the endpoint is open, no request was sent."""
+
+
+def _close_response(future):
+    """Release the connection of a response which is not used."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
 class Connection:
     """A connection to the REST client."""
 
-    def __init__(self, baseurl, name=None, password=None, request_hooks=None):
+    _single_flight_class = SingleFlight
+
+    def __init__(self, baseurl, name=None, password=None, request_hooks=None,
+                 session_pool=None, timeout=MISSING, retry=None, cache=None,
+                 single_flight=MISSING, json_decoder=None, transport=None,
+                 hedging=None, circuit_breaker=None, limiter=None,
+                 scheduler=None, middleware=None, tracer=None):
         """Initialize a connection to the REST API.
 
-        :param baseurl: The base url to access the Mailman 3 REST API.
+        :param baseurl: The base url to access the Mailman 3 REST API.  It
+            can also be a list of the base urls of several REST frontends of
+            the same Core, or an :class:`EndpointSet`, to spread the requests
+            over them.
         :param name: The Basic Auth user name.  If given, the `password` must
             also be given.
         :param password: The Basic Auth password.  If given the `name` must
             also be given.
         :param request_hooks: A list of callables that can receive the request
             parameters and return them with some changes or unchanged.
+        :param session_pool: The pool of keep-alive HTTP connections to use.
+            It can be shared between several connections.  If not given, the
+            connection creates its own pool on the first call.
+        :type session_pool: SessionPool
+        :param timeout: The timeout of each HTTP request, either a number of
+            seconds or a ``(connect, read)`` tuple.  ``None`` waits forever.
+            Defaults to ``(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)``.
+        :param retry: The policy used to retry failed idempotent requests.
+            By default, requests are not retried.
+        :type retry: RetryPolicy
+        :param cache: The cache of ``GET`` responses, which is invalidated by
+            the write requests sent through this connection.
+        :type cache: ResponseCache
+        :param single_flight: Where the concurrent identical ``GET`` requests
+            are coalesced into a single one.  Defaults to a new one, ``None``
+            sends all the requests.
+        :type single_flight: SingleFlight
+        :param json_decoder: The function decoding the JSON responses, or
+            the name of one of the supported libraries.  See
+            :func:`get_decoder`.
+        :type json_decoder: str or Callable[[bytes], Any]
+        :param transport: The transport sending the requests, e.g. over a
+            Unix socket or to a WSGI application in the same process.  It
+            replaces the `session_pool`.
+        :type transport: Transport
+        :param hedging: The policy sending a second copy of the slow ``GET``
+            requests.  By default, requests are not hedged.
+        :type hedging: HedgingPolicy
+        :param circuit_breaker: The circuit breaker making the calls fail
+            fast while an endpoint keeps failing.  By default, all the
+            requests are sent.
+        :type circuit_breaker: CircuitBreaker
+        :param limiter: The rate and concurrency limits of the requests.
+            The calls over the limits wait for their turn.  Unlimited by
+            default.
+        :type limiter: RateLimiter
+        :param scheduler: The scheduler dispatching the interactive calls
+            ahead of the bulk ones.  By default, the calls are sent as they
+            come.
+        :type scheduler: PriorityScheduler
+        :param middleware: The middleware wrapping each call, the first one
+            being the outermost.
+        :type middleware: List[Middleware]
+        :param tracer: The tracer opening a span for each call, outside the
+            other middleware.
+        :type tracer: Tracer
         """
+        self.endpoints = None
+        self._owns_endpoints = False
+        if not isinstance(baseurl, str):
+            if not isinstance(baseurl, EndpointSet):
+                baseurl = EndpointSet(baseurl)
+                self._owns_endpoints = True
+            if baseurl.probe is None:
+                baseurl.probe = self._probe
+            self.endpoints = baseurl
+            baseurl = self.endpoints.preferred.baseurl
         if baseurl[-1] != '/':
             baseurl += '/'
         self.baseurl = baseurl
@@ -59,6 +158,63 @@ class Connection:
         else:
             self.auth = (name, password)
         self.request_hooks = request_hooks
+        if transport is None:
+            transport = session_pool
+        self._transport = transport
+        self._owns_transport = transport is None
+        if timeout is MISSING:
+            timeout = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+        self.timeout = timeout
+        self.retry = retry
+        self.cache = cache
+        if single_flight is MISSING:
+            single_flight = self._single_flight_class()
+        self.single_flight = single_flight
+        self.json_decoder = get_decoder(json_decoder)
+        self.hedging = hedging
+        self.circuit_breaker = circuit_breaker
+        self.limiter = limiter
+        self.scheduler = scheduler
+        self.middleware = list(middleware or ())
+        self.tracer = tracer
+        if tracer is not None:
+            self.middleware.insert(0, tracer)
+        self._executor = None
+        self._prefetch_executor = None
+        self._executor_lock = threading.Lock()
+        #: The sizes of the collections counted by :meth:`count`.
+        self.counts = CountCache()
+        self._caches = weakref.WeakSet()
+
+    @property
+    def transport(self):
+        """The transport used to talk to Core.
+
+        Unless one was given, it is a pool of HTTP connections created on
+        the first call.
+        """
+        if self._transport is None:
+            self._transport = SessionPool()
+        return self._transport
+
+    # Before transports, requests always went through a SessionPool.
+    session_pool = transport
+
+    def close(self):
+        """Close the HTTP connections of this connection.
+
+        A transport given to the constructor is left open, since it may still
+        be in use by other connections.
+        """
+        if self._owns_transport and self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._owns_endpoints:
+            self.endpoints.close()
+        for executor in (self._executor, self._prefetch_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._executor = self._prefetch_executor = None
 
     def add_hooks(self, request_hooks):
         """Add a list of hooks to an existing connection object.
@@ -72,14 +228,39 @@ class Connection:
         else:
             self.request_hooks.extend(request_hooks)
 
-    def rewrite_url(self, url):
+    def add_middleware(self, middleware):
+        """Add a middleware inside the ones of the connection.
+
+        :param middleware: The middleware to add.
+        :type middleware: Middleware
+        """
+        self.middleware.append(middleware)
+
+    def add_cache(self, cache):
+        """Invalidate another cache of data from Core on the write requests
+        sent through this connection, like the response cache.
+
+        :param cache: An object with an ``invalidate(key)`` method, called
+            with the normalized path of each write request once it is
+            finished.  Only a weak reference to it is kept.
+        """
+        self._caches.add(cache)
+
+    def rewrite_url(self, url, endpoint=None):
         """rewrite url component with self.baseurl prefix "scheme://netloc"
 
+        With several endpoints, the url is rewritten to the given endpoint,
+        or to the preferred one.
+
         :param url: the URL to rewrite
         :type url: str
+        :param endpoint: the endpoint chosen for the request
+        :type endpoint: Endpoint
         :return: modified URL
         :rtype: str
         """
+        if self.endpoints is not None:
+            return self.endpoints.rewrite_url(url, endpoint)
         # rewrite url component with self.baseurl prefix "scheme://netloc"
         pbaseurl = urlparse(self.baseurl)
         parsed = urlparse(url)
@@ -99,8 +280,10 @@ class Connection:
         for hook in self.request_hooks:
             try:
                 params = hook(params)
-            except Exception:
-                print('[DEBUG] Failed to run hook {hook}')
+            except Exception as error:
+                warnings.warn(
+                    'Failed to run hook {0!r}: {1!r}'.format(hook, error),
+                    RuntimeWarning)
         return params
 
     def _prepare_request(self, path, data, method):
@@ -122,6 +305,442 @@ class Connection:
         return dict(url=url, method=method, data=data_str,
                     headers=headers)
 
+    def _get_timeout(self):
+        """Return the timeout of the next request.
+
+        Inside a :func:`deadline` block, the timeout is capped to the time
+        budget left.
+
+        :raises DeadlineExceeded: when there is no time left.
+        """
+        current = current_deadline()
+        if current is None:
+            return self.timeout
+        remaining = current.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(
+                'Deadline of {}s exceeded'.format(current.timeout))
+        return limit_timeout(self.timeout, remaining)
+
+    def _cache_key(self, params):
+        """Return the key of a request in the response cache."""
+        return normalize_path(params['url'], urlparse(self.baseurl).path)
+
+    def _is_cacheable(self, params):
+        return (self.cache is not None and params['method'] == 'GET'
+                and params['data'] is None)
+
+    def _cache_lookup(self, params):
+        """Look up a request in the response cache.
+
+        Only ``GET`` requests without a body are looked up.  If an expired
+        entry can be revalidated, an ``If-None-Match`` header is added to the
+        request.
+
+        :returns: A ``(response, etag)`` tuple, see
+            :meth:`ResponseCache.lookup`.
+        """
+        if not self._is_cacheable(params):
+            return None, None
+        cached, etag = self.cache.lookup(self._cache_key(params))
+        if etag is not None:
+            params['headers'] = dict(params['headers'])
+            params['headers']['If-None-Match'] = etag
+        return cached, etag
+
+    def _cache_invalidate(self, params):
+        """Drop the cached data a write request may have made stale.
+
+        This is done once the request is finished, whatever its outcome, so
+        that the responses to the ``GET`` requests sent in the meantime are
+        not cached either.
+        """
+        key = self._cache_key(params)
+        if not is_write(params['method'], key):
+            return
+        self.counts.invalidate(key)
+        if self.cache is not None:
+            self.cache.invalidate(key)
+        for cache in list(self._caches):
+            cache.invalidate(key)
+
+    def _cache_store(self, params, response, generation, etag=None):
+        """Cache the successful response of a ``GET`` request.
+
+        :param etag: The etag of the revalidated entry, if any.
+        :returns: The response to use, which is the cached one if Core said
+            it did not change.  None if the request must be sent again
+            without ``If-None-Match``.
+        """
+        if not self._is_cacheable(params):
+            return response
+        key = self._cache_key(params)
+        if etag is not None:
+            return self.cache.revalidate(key, response, etag, generation)
+        if response.status_code // 100 == 2:
+            self.cache.set(key, response, generation)
+        return response
+
+    def _get_retry_delay(self, method, attempt, response=None, error=None):
+        """Return the delay before retrying a failed request, or None.
+
+        The request is not retried if the retry policy says so, or if the
+        delay would not leave any time before the current deadline.
+        """
+        if self.retry is None:
+            return None
+        delay = self.retry.get_delay(method, attempt, response, error)
+        if delay is None:
+            return None
+        current = current_deadline()
+        if current is not None and current.remaining() <= delay:
+            return None
+        self.retry.record(attempt)
+        return delay
+
+    def _acquire_endpoint(self, params):
+        """Choose the endpoint a request is sent to.
+
+        :returns: The endpoint, or None if there is a single one, and the
+            request parameters with the url rewritten to it.
+        """
+        if self.endpoints is None:
+            return None, params
+        # Avoid the endpoints failing fast while others work.
+        usable = None
+        if self.circuit_breaker is not None:
+            usable = self._is_circuit_closed
+        endpoint = self.endpoints.acquire(params['method'], usable)
+        url = self.rewrite_url(params['url'], endpoint)
+        return endpoint, dict(params, url=url)
+
+    def _release_endpoint(self, endpoint, response=None, error=None):
+        if endpoint is not None:
+            self.endpoints.release(endpoint, response, error)
+
+    def _cancel_endpoint(self, endpoint):
+        """Release an endpoint without counting a success or a failure."""
+        if endpoint is not None:
+            self.endpoints.cancel(endpoint)
+
+    def _is_circuit_closed(self, endpoint):
+        return not self.circuit_breaker.is_open(endpoint.baseurl)
+
+    def _circuit_allow(self, endpoint):
+        """Check the circuit breaker of the endpoint of a request.
+
+        :returns: The state to give back to :meth:`_circuit_record`.
+        :raises CircuitOpenError: when the request must fail fast.
+        """
+        if self.circuit_breaker is None:
+            return None
+        key = self.baseurl if endpoint is None else endpoint.baseurl
+        try:
+            return key, self.circuit_breaker.allow(key), time.monotonic()
+        except CircuitOpenError:
+            if endpoint is not None:
+                self.endpoints.cancel(endpoint)
+            raise
+
+    def _circuit_record(self, circuit, response=None, error=None):
+        """Record the outcome of a request in the circuit breaker."""
+        if circuit is None:
+            return
+        key, probe, start = circuit
+        if response is None and error is None:
+            # The request was interrupted, e.g. a cancelled hedged copy.
+            self.circuit_breaker.release(key, probe)
+            return
+        failed = error is not None or response.status_code // 100 == 5
+        self.circuit_breaker.record(
+            key, probe, time.monotonic() - start, failed)
+
+    def _probe(self, endpoint):
+        """Whether an endpoint answers to ``system/versions``."""
+        params = self._prepare_request('system/versions', None, 'GET')
+        params['url'] = self.rewrite_url(params['url'], endpoint)
+        # Don't create the pool of the connection from the prober thread.
+        transport = self._transport
+        if transport is None:
+            transport = SessionPool()
+        try:
+            response = transport.request(
+                **params, auth=self.auth, timeout=self.timeout)
+        except IOError:
+            return False
+        finally:
+            if transport is not self._transport:
+                transport.close()
+        return response.status_code // 100 == 2
+
+    def _is_hedged(self, params):
+        """Whether a second copy of a slow request may be sent."""
+        return (self.hedging is not None and not params.get('stream')
+                and self.hedging.is_enabled(params['method'],
+                                            self._cache_key(params)))
+
+    def _get_executor(self):
+        """Return the threads sending the hedged requests.
+
+        Its size caps the number of copies in progress, see
+        :class:`~mailmanclient.restbase.hedging.HedgingPolicy`.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(
+                    max_workers=2 * DEFAULT_POOL_MAXSIZE,
+                    thread_name_prefix='mailmanclient')
+            return self._executor
+
+    def _get_prefetch_executor(self):
+        """Return the threads fetching the pages ahead.
+
+        A page fetched ahead may wait for the hedged copy of its request, so
+        they can't share the threads of :meth:`_get_executor`.
+        """
+        with self._executor_lock:
+            if self._prefetch_executor is None:
+                self._prefetch_executor = futures.ThreadPoolExecutor(
+                    max_workers=DEFAULT_POOL_MAXSIZE,
+                    thread_name_prefix='mailmanclient-prefetch')
+            return self._prefetch_executor
+
+    def _send(self, params, timeout):
+        """Send a request, hedging it if the hedging policy says so.
+
+        :returns: The response, whatever its status code.
+        :raises MailmanConnectionError: when no response is received.
+        """
+        if not self._is_hedged(params):
+            return self._send_once(params, timeout)
+        delay = self.hedging.get_delay()
+        executor = self._get_executor()
+        starts = {}
+
+        def submit():
+            # Run the copy in the context of the caller, for its deadline.
+            future = executor.submit(
+                copy_context().run, self._send_once, params, timeout)
+            starts[future] = time.monotonic()
+            return future
+
+        first = submit()
+        done, _ = futures.wait([first], timeout=delay)
+        if done:
+            response = first.result()
+            self.hedging.record(time.monotonic() - starts[first])
+            return response
+        permit = self._try_acquire_permit(params)
+        if permit is None:
+            # The copy would go past the limits of the client.
+            response = first.result()
+            self.hedging.record(time.monotonic() - starts[first],
+                                skipped=True)
+            return response
+        second = submit()
+        second.add_done_callback(lambda future: self._release_permit(permit))
+        pending = [first, second]
+        error = None
+        while pending:
+            done, _ = futures.wait(
+                pending, return_when=futures.FIRST_COMPLETED)
+            # Prefer the first copy when both answered.
+            for future in [future for future in pending if future in done]:
+                pending.remove(future)
+                try:
+                    response = future.result()
+                except MailmanConnectionError as e:
+                    error = e
+                    continue
+                for other in pending:
+                    other.add_done_callback(_close_response)
+                self.hedging.record(time.monotonic() - starts[future],
+                                    fired=True, won=future is second)
+                return response
+        self.hedging.record(None, fired=True)
+        raise error
+
+    def _send_once(self, params, timeout):
+        """Send a single HTTP request.
+
+        :returns: The response, whatever its status code.
+        :raises MailmanConnectionError: when no response is received.
+        """
+        endpoint, params = self._acquire_endpoint(params)
+        circuit = self._circuit_allow(endpoint)
+        response = error = None
+        cancelled = False
+        try:
+            response = self.transport.request(
+                **params, auth=self.auth, timeout=timeout)
+            return response
+        except IOError as e:
+            current = current_deadline()
+            if current is not None and current.expired:
+                # Cut short by the caller, not a failure of the endpoint.
+                cancelled = True
+                raise DeadlineExceeded(
+                    'Deadline of {}s exceeded'.format(current.timeout))
+            error = e
+            raise MailmanConnectionError(
+                'Could not connect to Mailman API: ', repr(e))
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._circuit_record(circuit, response, error)
+            if cancelled:
+                self._cancel_endpoint(endpoint)
+            else:
+                self._release_endpoint(endpoint, response, error)
+
+    def _send_with_retries(self, params, context=None):
+        """Send a request, retrying it according to the retry policy.
+
+        :returns: The last response received.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = self._send(params, self._get_timeout())
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except MailmanConnectionError as error:
+                delay = self._get_retry_delay(
+                    params['method'], attempt, error=error)
+                if delay is None:
+                    raise
+            else:
+                delay = self._get_retry_delay(
+                    params['method'], attempt, response=response)
+                if delay is None:
+                    return response
+            attempt += 1
+            if context is not None:
+                context.retries += 1
+            time.sleep(delay)
+
+    def _flight_key(self, params):
+        """Return the key of a request for the single-flight layer, or None.
+
+        Only the ``GET`` requests without a body are coalesced, and only with
+        the ones sent with the same credentials.  A request sent before a
+        write isn't joined by the ones sent after it, which must see the
+        write.
+        """
+        if (self.single_flight is None or params['method'] != 'GET'
+                or params['data'] is not None):
+            return None
+        generation = None if self.cache is None else self.cache.generation
+        return (params['url'], self.auth, self.counts.generation, generation)
+
+    def _get_flight_timeout(self):
+        """Return how long to wait for a request sent by another caller."""
+        current = current_deadline()
+        if current is None:
+            return None
+        return current.remaining()
+
+    def _deadline_exceeded(self):
+        return DeadlineExceeded(
+            'Deadline of {}s exceeded'.format(current_deadline().timeout))
+
+    def _acquire_permit(self, params):
+        """Wait until the scheduler and the rate limiter let a request
+        through.
+
+        :returns: The permit to give back to :meth:`_release_permit`.
+        :raises DeadlineExceeded: when the current deadline runs out first.
+        """
+        lane = permit = None
+        if self.scheduler is not None:
+            lane = current_priority()
+            if not self.scheduler.acquire(
+                    lane, timeout=self._get_flight_timeout()):
+                raise self._deadline_exceeded()
+        try:
+            if self.limiter is not None:
+                permit = self.limiter.acquire(
+                    params['method'], self._cache_key(params),
+                    params['data'], timeout=self._get_flight_timeout())
+                if permit is None:
+                    raise self._deadline_exceeded()
+        except BaseException:
+            self._release_permit((lane, None))
+            raise
+        return lane, permit
+
+    def _try_acquire_permit(self, params):
+        """Take another permit if one is free at once, for the second copy
+        of a hedged request.
+
+        :returns: The permit to give back to :meth:`_release_permit`, or
+            None.
+        """
+        lane = permit = None
+        if self.scheduler is not None:
+            lane = current_priority()
+            if not self.scheduler.acquire(lane, timeout=0):
+                return None
+        if self.limiter is not None:
+            permit = self.limiter.acquire(
+                params['method'], self._cache_key(params), params['data'],
+                timeout=0)
+            if permit is None:
+                self._release_permit((lane, None))
+                return None
+        return lane, permit
+
+    def _release_permit(self, permit):
+        lane, permit = permit
+        if permit is not None:
+            self.limiter.release(permit)
+        if lane is not None:
+            self.scheduler.release(lane)
+
+    def _fetch(self, params, etag=None, context=None):
+        """Send a request and update the response cache.
+
+        :returns: The response to use, see :meth:`_cache_store`.
+        """
+        generation = None if self.cache is None else self.cache.generation
+        start = time.monotonic()
+        permit = self._acquire_permit(params)
+        sent = time.monotonic()
+        try:
+            response = self._send_with_retries(params, context)
+        finally:
+            if context is not None:
+                context.queue_time = sent - start
+                context.network_time = time.monotonic() - sent
+            self._release_permit(permit)
+            self._cache_invalidate(params)
+        return self._cache_store(params, response, generation, etag)
+
+    def _handle_response(self, params, response):
+        """Return the decoded content of the response.
+
+        :raises HTTPError: when a non-2xx status code was returned.
+        """
+        # If we did not get a 2xx status code, make this look like a
+        # urllib2 exception, for backward compatibility.
+        if response.status_code // 100 != 2:
+            try:
+                err = self.json_decoder(response.content)
+                # If this fails, a ValueError is raised. It means either
+                # the response is malformed JSON or None.
+                error_msg = err['description']
+                # This can fail if the error message does not container
+                # description field.
+            except (KeyError, ValueError):
+                error_msg = response.text
+
+            raise HTTPError(params.get('url'), response.status_code,
+                            error_msg, response, None)
+        if len(response.content) == 0:
+            return response, None
+        return response, self.json_decoder(response.content)
+
     def call(self, path, data=None, method=None):
         """Make a call to the Mailman REST API.
 
@@ -136,34 +755,126 @@ class Connection:
             list depending on the actual JSON type returned.
         :rtype: None, list, dict
         :raises HTTPError: when a non-2xx status code is returned.
+        :raises DeadlineExceeded: when the current deadline runs out.
         """
         params = self._prepare_request(path, data, method)
         if self.request_hooks:
             params = self._process_request_hooks(params)
+        context = CallContext(path, data, params,
+                              self._cache_key(params))
+        handler = self._call
+        for middleware in reversed(self.middleware):
+            handler = functools.partial(middleware.wrap, call_next=handler)
+        return handler(context)
 
+    def _call(self, context):
+        """Return the response and the content of a call, the innermost
+        handler of the middleware."""
+        params = context.params
         try:
-            response = request(**params, auth=self.auth)
-            # content = response.content
-            # If we did not get a 2xx status code, make this look like a
-            # urllib2 exception, for backward compatibility.
-            if response.status_code // 100 != 2:
-                try:
-                    err = response.json()
-                    # If this fails, a ValueError is raised. It means either
-                    # the response is malformed JSON or None.
-                    error_msg = err['description']
-                    # This can fail if the error message does not container
-                    # description field.
-                except (KeyError, ValueError):
-                    error_msg = response.text
-
-                raise HTTPError(params.get('url'), response.status_code,
-                                error_msg, response, None)
-            if len(response.content) == 0:
-                return response, None
-            return response, response.json()
-        except HTTPError:
-            raise
-        except IOError as e:
-            raise MailmanConnectionError(
-                'Could not connect to Mailman API: ', repr(e))
+            while True:
+                response, etag = self._cache_lookup(params)
+                if response is not None:
+                    context.cached = True
+                    break
+                response = self._get_response(params, etag, context)
+                if response is not None:
+                    break
+                # The entry was dropped while it was revalidated.
+            context.response = response
+            context.content = self._handle_response(params, response)[1]
+        finally:
+            context.finish()
+        return response, context.content
+
+    def _get_response(self, params, etag, context=None):
+        key = self._flight_key(params)
+        if key is None:
+            return self._fetch(params, etag, context)
+        try:
+            response, leader = self.single_flight.do(
+                key, self._fetch_shared, params, etag, context,
+                timeout=self._get_flight_timeout())
+        except TimeoutError:
+            raise self._deadline_exceeded()
+        if context is not None and leader is not context:
+            context.join(leader)
+        return response
+
+    def _fetch_shared(self, params, etag, context):
+        """Call :meth:`_fetch` for all the callers of a flight.
+
+        :returns: The response and the context of the caller which sent the
+            request.
+        """
+        return self._fetch(params, etag, context), context
+
+    def stream(self, path, meta=None, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        """Yield the entries of a collection while it is received.
+
+        The response body is parsed incrementally, so the memory used does
+        not depend on the size of the collection.  The request is sent when
+        the iteration starts, it bypasses the response cache.
+
+        :param path: The url path to the collection.
+        :type path: str
+        :param meta: If given, a dictionary which is updated with the other
+            keys of the collection, such as ``total_size``.
+        :type meta: dict
+        :param chunk_size: The number of bytes read at a time.
+        :type chunk_size: int
+        :return: An iterator of the entries, as dictionaries.
+        :raises HTTPError: when a non-2xx status code is returned.
+        :raises DeadlineExceeded: when the current deadline runs out.
+        """
+        params = self._prepare_request(path, None, 'GET')
+        if self.request_hooks:
+            params = self._process_request_hooks(params)
+        params['stream'] = True
+        permit = self._acquire_permit(params)
+        try:
+            response = self._send_with_retries(params)
+            try:
+                if response.status_code // 100 != 2:
+                    self._handle_response(params, response)
+                chunks = self._iter_chunks(response, chunk_size)
+                yield from iter_entries(
+                    chunks, response.encoding or 'utf-8', meta)
+            finally:
+                response.close()
+        finally:
+            self._release_permit(permit)
+
+    def _iter_chunks(self, response, chunk_size):
+        for chunk in response.iter_content(chunk_size):
+            # Stop reading when the deadline runs out.
+            self._get_timeout()
+            yield chunk
+
+    def _path_key(self, path):
+        return normalize_path(path, urlparse(self.baseurl).path)
+
+    def count(self, path, max_age=None):
+        """Return the number of entries of a collection.
+
+        The count is the ``total_size`` of a page of a single entry, so the
+        collection is neither downloaded nor built.
+
+        :param path: The url path to the collection.
+        :type path: str
+        :param max_age: If given, a count made less than this number of
+            seconds ago is returned instead, unless a write request through
+            this connection may have changed it.
+        :type max_age: float
+        :return: The number of entries.
+        :rtype: int
+        """
+        key = self._path_key(path)
+        if max_age is not None:
+            count = self.counts.get(key, max_age)
+            if count is not None:
+                return count
+        generation = self.counts.generation
+        response, content = self.call(_page_url(path, 1, 1))
+        self.counts.set(key, content['total_size'], generation)
+        return content['total_size']
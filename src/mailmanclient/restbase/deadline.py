@@ -0,0 +1,112 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time budgets shared by all the REST calls of an operation."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+__metaclass__ = type
+__all__ = [
+    'Deadline',
+    'current_deadline',
+    'deadline',
+    'limit_timeout',
+    'without_deadline',
+]
+
+
+_current_deadline = ContextVar('mailmanclient_deadline', default=None)
+
+
+class Deadline:
+    """A point in time by which some REST calls must be finished.
+
+    :param timeout: The time budget, in seconds.
+    :type timeout: float
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    def __repr__(self):
+        return '<Deadline in {0:.3f}s>'.format(self.remaining())
+
+    def remaining(self):
+        """The number of seconds left before the deadline."""
+        return max(self.expires_at - time.monotonic(), 0)
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+
+def current_deadline():
+    """Return the :class:`Deadline` of the current context, if any."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline(timeout):
+    """Give all the REST calls made inside the block a single time budget.
+
+    The deadline follows the current thread or asyncio task.  A nested block
+    can only shorten the budget of the enclosing one, never extend it.
+
+    :param timeout: The time budget, in seconds.
+    :type timeout: float
+    """
+    new = Deadline(timeout)
+    parent = _current_deadline.get()
+    if parent is not None and parent.expires_at < new.expires_at:
+        new = parent
+    token = _current_deadline.set(new)
+    try:
+        yield new
+    finally:
+        _current_deadline.reset(token)
+
+
+@contextmanager
+def without_deadline():
+    """Lift the deadline of the current context inside the block.
+
+    The tasks created inside the block don't inherit it.
+    """
+    token = _current_deadline.set(None)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def limit_timeout(timeout, remaining):
+    """Cap a `requests` style timeout to the remaining time budget.
+
+    :param timeout: None, a number of seconds or a ``(connect, read)`` tuple.
+    :param remaining: The number of seconds left.
+    :returns: The capped ``(connect, read)`` timeout.
+    """
+    if timeout is None:
+        return (remaining, remaining)
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+    else:
+        connect = read = timeout
+    return (remaining if connect is None else min(connect, remaining),
+            remaining if read is None else min(read, remaining))
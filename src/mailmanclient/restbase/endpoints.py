@@ -0,0 +1,224 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Several Core REST frontends behind a single client."""
+
+import itertools
+import threading
+from urllib.parse import urlparse, urlunparse
+
+__metaclass__ = type
+__all__ = [
+    'Endpoint',
+    'EndpointSet',
+]
+
+
+READ_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+
+class Endpoint:
+    """A Core REST frontend, and its health as seen by the client."""
+
+    def __init__(self, baseurl):
+        if baseurl[-1] != '/':
+            baseurl += '/'
+        self.baseurl = baseurl
+        parsed = urlparse(baseurl)
+        self.scheme = parsed.scheme
+        self.netloc = parsed.netloc
+        #: The number of requests in progress.
+        self.outstanding = 0
+        #: The number of consecutive failed requests.
+        self.failures = 0
+        #: Whether the endpoint is in rotation.
+        self.healthy = True
+
+    def __repr__(self):
+        return '<Endpoint {0} ({1})>'.format(
+            self.baseurl, 'healthy' if self.healthy else 'unhealthy')
+
+
+class EndpointSet:
+    """Spread the requests over several Core REST frontends.
+
+    All the frontends must serve the same Core, with the same API version:
+    they only differ by their scheme and host.  ``GET`` requests go to the
+    healthy endpoint with the fewest requests in progress, the other ones go
+    to the first healthy endpoint, in the order they were given.
+
+    An endpoint is taken out of rotation after `max_failures` consecutive
+    failures (no response, or a 502, 503 or 504 status), and a background
+    thread probes it every `probe_interval` seconds until it answers again.
+    If all the endpoints are out of rotation, they are all used anyway.
+
+    :param baseurls: The base URLs of the frontends, the preferred one
+        first.
+    :type baseurls: Iterable[str]
+    :param max_failures: The number of consecutive failures taking an
+        endpoint out of rotation.
+    :type max_failures: int
+    :param probe_interval: The delay between two probes of an endpoint out
+        of rotation, in seconds.
+    :type probe_interval: float
+    :param probe: A function taking an :class:`Endpoint` and returning
+        whether it is healthy.  The connection sets it to a request to
+        ``system/versions`` if not given.
+    """
+
+    failure_statuses = frozenset([502, 503, 504])
+
+    def __init__(self, baseurls, max_failures=3, probe_interval=5,
+                 probe=None):
+        self.endpoints = [Endpoint(baseurl) for baseurl in baseurls]
+        if not self.endpoints:
+            raise ValueError('At least one base URL is required')
+        self.max_failures = max_failures
+        self.probe_interval = probe_interval
+        self.probe = probe
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._prober = None
+
+    def __repr__(self):
+        return '<EndpointSet {0}>'.format(self.endpoints)
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def __iter__(self):
+        return iter(self.endpoints)
+
+    @property
+    def preferred(self):
+        """The endpoint receiving the write requests."""
+        return self._get_healthy()[0]
+
+    def _get_healthy(self, usable=None):
+        healthy = [endpoint for endpoint in self.endpoints
+                   if endpoint.healthy] or self.endpoints
+        if usable is not None:
+            healthy = [endpoint for endpoint in healthy
+                       if usable(endpoint)] or healthy
+        return healthy
+
+    def acquire(self, method, usable=None):
+        """Choose the endpoint of a request and count it as in progress.
+
+        :param method: The HTTP method of the request.
+        :param usable: A function taking an endpoint and returning whether
+            it should be chosen, e.g. whether its circuit breaker is closed.
+            It is ignored if no healthy endpoint is usable.
+        :returns: The chosen endpoint, which must be given back to
+            :meth:`release` or :meth:`cancel`.
+        """
+        with self._lock:
+            healthy = self._get_healthy(usable)
+            if method in READ_METHODS:
+                # Start from a different endpoint each time, so that ties
+                # don't always go to the same one.
+                start = next(self._counter) % len(healthy)
+                candidates = healthy[start:] + healthy[:start]
+                endpoint = min(candidates,
+                               key=lambda endpoint: endpoint.outstanding)
+            else:
+                endpoint = healthy[0]
+            endpoint.outstanding += 1
+        return endpoint
+
+    def cancel(self, endpoint):
+        """Give back an endpoint no request was sent to.
+
+        :param endpoint: The endpoint returned by :meth:`acquire`.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+
+    def release(self, endpoint, response=None, error=None):
+        """Record the outcome of a request sent by :meth:`acquire`.
+
+        :param endpoint: The endpoint of the request.
+        :param response: The response, if one was received.
+        :param error: The connection error, if no response was received.
+        """
+        failed = error is not None or (
+            response is not None
+            and response.status_code in self.failure_statuses)
+        with self._lock:
+            endpoint.outstanding -= 1
+            if not failed:
+                endpoint.failures = 0
+                return
+            endpoint.failures += 1
+            if (not endpoint.healthy
+                    or endpoint.failures < self.max_failures):
+                return
+            endpoint.healthy = False
+            self._start_prober()
+
+    def rewrite_url(self, url, endpoint=None):
+        """Rewrite the scheme and host of a URL to the ones of an endpoint.
+
+        :param url: The URL to rewrite, e.g. a ``self_link``.
+        :param endpoint: The endpoint, the preferred one by default.
+        :returns: The rewritten URL.
+        """
+        if endpoint is None:
+            endpoint = self.preferred
+        parsed = urlparse(url)
+        return urlunparse(parsed._replace(scheme=endpoint.scheme,
+                                          netloc=endpoint.netloc))
+
+    def check(self):
+        """Probe the endpoints out of rotation, and restore the healthy ones.
+
+        :returns: Whether some endpoints are still out of rotation.
+        """
+        unhealthy = [endpoint for endpoint in self.endpoints
+                     if not endpoint.healthy]
+        for endpoint in unhealthy:
+            try:
+                healthy = self.probe is not None and self.probe(endpoint)
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    endpoint.healthy = True
+                    endpoint.failures = 0
+        return any(not endpoint.healthy for endpoint in self.endpoints)
+
+    def _start_prober(self):
+        # Must be called with the lock held.
+        if self._prober is not None or self._stopped.is_set():
+            return
+        self._prober = threading.Thread(
+            target=self._run_prober, name='mailmanclient-probe', daemon=True)
+        self._prober.start()
+
+    def _run_prober(self):
+        while not self._stopped.wait(self.probe_interval):
+            if not self.check():
+                break
+        with self._lock:
+            self._prober = None
+            # An endpoint may have failed while the thread was stopping.
+            if any(not endpoint.healthy for endpoint in self.endpoints):
+                self._start_prober()
+
+    def close(self):
+        """Stop probing the endpoints out of rotation."""
+        self._stopped.set()
@@ -0,0 +1,139 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Hedged requests, to cut the tail latency of the REST calls."""
+
+import math
+import threading
+from collections import deque
+from fnmatch import fnmatchcase
+
+__metaclass__ = type
+__all__ = [
+    'HedgingPolicy',
+]
+
+
+class HedgingPolicy:
+    """Decide when a second copy of a slow ``GET`` request is sent.
+
+    If no response arrived after a delay, the request is sent again (to
+    another endpoint if the client has several) and the first response wins.
+    The delay is a percentile of the latencies of the recent requests, so
+    that only the slowest ones are hedged.
+
+    Only ``GET`` requests are hedged, since they can safely be sent twice.
+    The second copy takes its own slot of the client's ``limiter`` and
+    ``scheduler``, it is not sent if none is free at once.
+
+    With :class:`~mailmanclient.Client`, the requests which may be hedged
+    are sent from a pool of ``2 * DEFAULT_POOL_MAXSIZE`` (20) threads of the
+    client, so at most 20 copies are in progress at once, the others wait
+    for a free thread.  A thread can't be interrupted: the slower copy is
+    not cancelled, it keeps its thread, connection and slot until it gets
+    its response, which is then closed.  The
+    :class:`~mailmanclient.asynclient.AsyncClient` cancels it.
+
+    :param percentile: The percentile of the recent latencies after which a
+        request is hedged.
+    :type percentile: float
+    :param routes: Shell-style patterns of the routes to hedge, matched
+        against the path relative to the API root, e.g. ``'lists/*'``.  All
+        the routes are hedged by default.
+    :type routes: Iterable[str]
+    :param window: The number of recent latencies the percentile is
+        computed from.
+    :type window: int
+    :param min_samples: The number of latencies needed before using the
+        percentile, `initial_delay` is used until then.
+    :type min_samples: int
+    :param initial_delay: The delay used until enough latencies are known,
+        in seconds.
+    :type initial_delay: float
+    :param min_delay: The minimum delay, in seconds.
+    :type min_delay: float
+    :param max_delay: The maximum delay, in seconds.
+    :type max_delay: float
+    """
+
+    def __init__(self, percentile=95, routes=None, window=200,
+                 min_samples=20, initial_delay=0.1, min_delay=0.01,
+                 max_delay=2):
+        self.percentile = percentile
+        self.routes = None if routes is None else tuple(routes)
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        #: The number of requests which could have been hedged.
+        self.calls = 0
+        #: The number of hedged requests.
+        self.fired = 0
+        #: The number of hedged requests answered first by the second copy.
+        self.won = 0
+        #: The number of copies not sent because the limiter or the
+        #: scheduler had no free slot for them.
+        self.skipped = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<HedgingPolicy p{0} ({1} fired, {2} won)>'.format(
+            self.percentile, self.fired, self.won)
+
+    def is_enabled(self, method, key):
+        """Whether a request can be hedged.
+
+        :param method: The HTTP method of the request.
+        :param key: The path of the request, relative to the API root.
+        """
+        if method != 'GET':
+            return False
+        if self.routes is None:
+            return True
+        path = key.split('?', 1)[0]
+        return any(fnmatchcase(path, pattern) for pattern in self.routes)
+
+    def get_delay(self):
+        """Return how long to wait for a response before hedging."""
+        with self._lock:
+            self.calls += 1
+            if len(self._latencies) < self.min_samples:
+                delay = self.initial_delay
+            else:
+                latencies = sorted(self._latencies)
+                index = math.ceil(len(latencies) * self.percentile / 100) - 1
+                delay = latencies[max(index, 0)]
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    def record(self, latency, fired=False, won=False, skipped=False):
+        """Record the outcome of a request.
+
+        :param latency: The time the response took, in seconds, or None if
+            no response was received.
+        :param fired: Whether a second copy was sent.
+        :param won: Whether the second copy answered first.
+        :param skipped: Whether the second copy was due but not sent.
+        """
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            if fired:
+                self.fired += 1
+            if won:
+                self.won += 1
+            if skipped:
+                self.skipped += 1
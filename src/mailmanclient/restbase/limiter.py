@@ -0,0 +1,525 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Client-side rate and concurrency limits, to protect Core."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import copy_context
+from urllib.error import HTTPError
+from urllib.parse import parse_qsl, unquote
+
+from mailmanclient.restbase.cache import is_write
+from mailmanclient.restbase.connection import (
+    CircuitOpenError, DeadlineExceeded, MailmanConnectionError)
+from mailmanclient.restbase.deadline import current_deadline
+from mailmanclient.restbase.waiting import Slots
+
+__metaclass__ = type
+__all__ = [
+    'AdaptiveLimiter',
+    'Limit',
+    'RateLimiter',
+    'TokenBucket',
+    'get_tenant',
+]
+
+
+READ = 'read'
+WRITE = 'write'
+
+
+def _list_host(identifier):
+    # Either a fqdn_listname or a list_id.
+    separator = '@' if '@' in identifier else '.'
+    return identifier.partition(separator)[2] or None
+
+
+def get_tenant(method, path, data):
+    """Return the mail host of the domain a request is about, or None.
+
+    :param method: The HTTP method of the request.
+    :param path: The path of the request, relative to the API root, with its
+        query string.
+    :param data: The fields of the request body, as a dictionary.
+    """
+    path, _, query = path.partition('?')
+    parts = [unquote(part) for part in path.split('/')]
+    if len(parts) > 1 and parts[0] == 'domains':
+        return parts[1]
+    if len(parts) > 1 and parts[0] == 'lists':
+        return _list_host(parts[1])
+    fields = dict(parse_qsl(query))
+    fields.update(data)
+    if fields.get('mail_host'):
+        return fields['mail_host']
+    for name in ('fqdn_listname', 'list_id'):
+        if fields.get(name):
+            return _list_host(fields[name])
+    return None
+
+
+class TokenBucket:
+    """Let through `rate` calls per second on average, and bursts of `burst`.
+
+    A call over the rate reserves the next token in advance, so the waiting
+    calls are served in order.
+
+    :param rate: The number of tokens added per second.
+    :type rate: float
+    :param burst: The maximum number of tokens, at least 1.  Defaults to
+        `rate`.
+    :type burst: float
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = max(burst or rate, 1)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<TokenBucket {0}/s burst={1}>'.format(self.rate, self.burst)
+
+    def reserve(self, max_wait=None):
+        """Take a token.
+
+        :param max_wait: The longest the caller can wait, in seconds.
+        :returns: How long to wait before the token can be used, or None if
+            it would be longer than `max_wait`, in which case no token is
+            taken.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0, (1 - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def refund(self):
+        """Give back a token which was not used."""
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+
+class Limit:
+    """The limits of a class of requests.
+
+    :param rate: The maximum number of requests per second.  Unlimited by
+        default.
+    :type rate: float
+    :param burst: The number of requests which can be sent at once, on top
+        of the rate.  Defaults to `rate`.
+    :type burst: float
+    :param max_in_flight: The maximum number of requests in progress.
+        Unlimited by default.
+    :type max_in_flight: int
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+
+    def __repr__(self):
+        return '<Limit rate={0} max_in_flight={1}>'.format(
+            self.rate, self.max_in_flight)
+
+
+class _Limiter:
+    """The token bucket and the slots enforcing a :class:`Limit`."""
+
+    def __init__(self, limit):
+        self.bucket = self.slots = None
+        if limit.rate is not None:
+            self.bucket = TokenBucket(limit.rate, limit.burst)
+        if limit.max_in_flight is not None:
+            self.slots = Slots(limit.max_in_flight)
+
+
+class _Permit:
+    """What a request took from the limiters, given back when it is done."""
+
+    __slots__ = ('limiters', 'buckets', 'slots')
+
+    def __init__(self, limiters):
+        self.limiters = limiters
+        self.buckets = []
+        self.slots = []
+
+
+class RateLimiter:
+    """Cap the rate and the number of concurrent requests sent to Core.
+
+    The limits are set separately for the reads (``GET`` requests and the
+    ``find`` queries) and the writes, and optionally for each tenant: the
+    mail host of the domain a request is about.  A call over a limit waits
+    for its turn, it fails only when the current deadline runs out.  The
+    limits apply to the calls actually sent, after the response cache and
+    the coalescing of identical requests, and the retries of a call don't
+    count again.
+
+    A limiter can be shared between several :class:`mailmanclient.Client`
+    and :class:`mailmanclient.asynclient.AsyncClient`, even in different
+    threads.
+
+    :param reads: The limits of the read requests.
+    :type reads: Limit
+    :param writes: The limits of the write requests.
+    :type writes: Limit
+    :param per_tenant: The limits of all the requests of each tenant.
+    :type per_tenant: Limit
+    :param tenants: The limits of some tenants, replacing `per_tenant`.
+    :type tenants: Mapping[str, Limit]
+    :param tenant_key: A function taking the method, the path relative to
+        the API root and the request body as a dictionary, and returning
+        the tenant of a request or None.  Defaults to :func:`get_tenant`.
+    """
+
+    def __init__(self, reads=None, writes=None, per_tenant=None,
+                 tenants=None, tenant_key=None):
+        self._classes = {
+            READ: None if reads is None else _Limiter(reads),
+            WRITE: None if writes is None else _Limiter(writes),
+            }
+        self.per_tenant = per_tenant
+        self.tenants = dict(tenants or {})
+        self.tenant_key = tenant_key or get_tenant
+        #: The number of requests which had to wait.
+        self.queued = 0
+        #: The total time spent waiting, in seconds.
+        self.wait_time = 0.0
+        self._tenant_limiters = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<RateLimiter ({0} queued)>'.format(self.queued)
+
+    def _get_tenant_limiter(self, method, path, data):
+        if self.per_tenant is None and not self.tenants:
+            return None
+        if data:
+            data = dict(parse_qsl(data))
+        tenant = self.tenant_key(method, path, data or {})
+        if tenant is None:
+            return None
+        with self._lock:
+            limiter = self._tenant_limiters.get(tenant)
+            if limiter is None:
+                limit = self.tenants.get(tenant, self.per_tenant)
+                if limit is None:
+                    return None
+                limiter = self._tenant_limiters[tenant] = _Limiter(limit)
+        return limiter
+
+    def _get_limiters(self, method, path, data):
+        # The tenant slot is taken first, so that a busy tenant waiting for
+        # a slot of its class doesn't hold slots of the other tenants.
+        route_class = WRITE if is_write(method, path) else READ
+        return [limiter for limiter in (
+            self._get_tenant_limiter(method, path, data),
+            self._classes[route_class]) if limiter is not None]
+
+    def _reserve(self, permit, timeout):
+        """Take the tokens of a request.
+
+        :returns: How long to wait before sending it, or None if it is
+            longer than `timeout`.
+        """
+        wait = 0
+        for limiter in permit.limiters:
+            if limiter.bucket is None:
+                continue
+            delay = limiter.bucket.reserve(timeout)
+            if delay is None:
+                self._give_up(permit)
+                return None
+            permit.buckets.append(limiter.bucket)
+            wait = max(wait, delay)
+        return wait
+
+    def _give_up(self, permit):
+        """Give back the tokens and the slots of a request not sent."""
+        while permit.buckets:
+            permit.buckets.pop().refund()
+        self.release(permit)
+
+    def _remaining(self, timeout, start):
+        if timeout is None:
+            return None
+        return timeout - (time.monotonic() - start)
+
+    def _record(self, start):
+        elapsed = time.monotonic() - start
+        if elapsed > 0.001:
+            with self._lock:
+                self.queued += 1
+                self.wait_time += elapsed
+
+    def acquire(self, method, path, data=None, timeout=None):
+        """Wait until a request can be sent.
+
+        :param method: The HTTP method of the request.
+        :param path: The path of the request, relative to the API root.
+        :param data: The body of the request, url-encoded.
+        :param timeout: The longest the caller can wait, in seconds.
+        :returns: A permit to give back to :meth:`release` once the request
+            is done, or None if the request could not be sent in time.
+        """
+        start = time.monotonic()
+        permit = _Permit(self._get_limiters(method, path, data))
+        wait = self._reserve(permit, timeout)
+        if wait is None:
+            return None
+        if wait > 0:
+            time.sleep(wait)
+        for limiter in permit.limiters:
+            if limiter.slots is None:
+                continue
+            if not limiter.slots.acquire(self._remaining(timeout, start)):
+                self._give_up(permit)
+                return None
+            permit.slots.append(limiter.slots)
+        self._record(start)
+        return permit
+
+    async def aacquire(self, method, path, data=None, timeout=None):
+        """Wait until a request can be sent, from a coroutine.
+
+        See :meth:`acquire`.
+        """
+        start = time.monotonic()
+        permit = _Permit(self._get_limiters(method, path, data))
+        wait = self._reserve(permit, timeout)
+        if wait is None:
+            return None
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            for limiter in permit.limiters:
+                if limiter.slots is None:
+                    continue
+                remaining = self._remaining(timeout, start)
+                if not await limiter.slots.aacquire(remaining):
+                    self._give_up(permit)
+                    return None
+                permit.slots.append(limiter.slots)
+        except asyncio.CancelledError:
+            self._give_up(permit)
+            raise
+        self._record(start)
+        return permit
+
+    def release(self, permit):
+        """Give back the slots taken by :meth:`acquire`."""
+        while permit.slots:
+            permit.slots.pop().release()
+
+    def stats(self):
+        """Return the number of requests in progress and waiting."""
+        stats = {'queued': self.queued, 'wait_time': self.wait_time}
+        for name, limiter in self._classes.items():
+            if limiter is not None and limiter.slots is not None:
+                stats['{}_in_flight'.format(name)] = limiter.slots.in_use
+        return stats
+
+
+def _is_overload(error):
+    """Whether an exception shows that Core is overloaded."""
+    if isinstance(error, HTTPError):
+        return error.code // 100 == 5
+    # The caller ran out of time, or the call was not even sent.
+    if isinstance(error, (DeadlineExceeded, CircuitOpenError)):
+        return False
+    return isinstance(error, (MailmanConnectionError, TimeoutError,
+                              asyncio.TimeoutError))
+
+
+class AdaptiveLimiter:
+    """Adapt the number of concurrent calls to the load of Core (AIMD).
+
+    The window, the number of calls allowed in progress, grows by
+    `increase` every `window` successful calls answered within
+    `target_latency`, and is multiplied by `backoff` when a call fails with
+    a connection error, a timeout or a 5xx status.  The calls started before
+    the last cut don't cut it again, so that a burst of failures only cuts
+    it once.  Slow calls keep the window as it is.
+
+    It is meant for bulk operations fanning out many calls: ::
+
+        limiter = AdaptiveLimiter(target_latency=0.5)
+        lists = limiter.map(client.get_list, fqdn_listnames)
+
+    Each call can also be wrapped in :meth:`slot` (or :meth:`aslot` in a
+    coroutine), e.g. in the tasks of an existing executor.  The same limiter
+    can be shared by threads and coroutines.
+
+    :param initial: The initial window.
+    :type initial: int
+    :param min_limit: The minimum window.
+    :type min_limit: int
+    :param max_limit: The maximum window.
+    :type max_limit: int
+    :param target_latency: The latency, in seconds, under which the window
+        grows.
+    :type target_latency: float
+    :param increase: How much the window grows per window of successes.
+    :type increase: float
+    :param backoff: The factor applied to the window on failures.
+    :type backoff: float
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64,
+                 target_latency=1.0, increase=1, backoff=0.5):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.increase = increase
+        self.backoff = backoff
+        #: The number of times the window was cut.
+        self.decreases = 0
+        self._window = float(min(max(initial, min_limit), max_limit))
+        self._last_decrease = float('-inf')
+        self._slots = Slots(int(self._window))
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<AdaptiveLimiter limit={0} in_flight={1}>'.format(
+            self.limit, self.in_flight)
+
+    @property
+    def limit(self):
+        """The current window."""
+        return self._slots.size
+
+    @property
+    def in_flight(self):
+        """The number of calls in progress."""
+        return self._slots.in_use
+
+    def stats(self):
+        """Return the current window and the number of calls in progress."""
+        return {'limit': self.limit, 'in_flight': self.in_flight,
+                'decreases': self.decreases}
+
+    def record(self, start, latency, failed):
+        """Update the window with the outcome of a call.
+
+        :param start: When the call started, from :func:`time.monotonic`.
+        :param latency: How long the call took, in seconds.
+        :param failed: Whether it failed because of the load of Core.
+        """
+        with self._lock:
+            if failed:
+                if start < self._last_decrease:
+                    return
+                self._window = max(self.min_limit,
+                                   self._window * self.backoff)
+                self._last_decrease = time.monotonic()
+                self.decreases += 1
+            elif latency <= self.target_latency:
+                self._window = min(self.max_limit,
+                                   self._window + self.increase / self._window)
+            else:
+                return
+            size = int(self._window)
+        self._slots.resize(size)
+
+    def _get_timeout(self):
+        current = current_deadline()
+        return None if current is None else current.remaining()
+
+    def _deadline_exceeded(self):
+        return DeadlineExceeded(
+            'Deadline of {}s exceeded'.format(current_deadline().timeout))
+
+    @contextmanager
+    def slot(self):
+        """Wait for a slot in the window, and record the outcome of the
+        calls made in the block.
+
+        :raises DeadlineExceeded: when the current deadline runs out first.
+        """
+        if not self._slots.acquire(self._get_timeout()):
+            raise self._deadline_exceeded()
+        start = time.monotonic()
+        failed = False
+        try:
+            yield
+        except BaseException as error:
+            failed = _is_overload(error)
+            raise
+        finally:
+            self._slots.release()
+            self.record(start, time.monotonic() - start, failed)
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Like :meth:`slot`, from a coroutine."""
+        if not await self._slots.aacquire(self._get_timeout()):
+            raise self._deadline_exceeded()
+        start = time.monotonic()
+        failed = False
+        try:
+            yield
+        except BaseException as error:
+            failed = _is_overload(error)
+            raise
+        finally:
+            self._slots.release()
+            self.record(start, time.monotonic() - start, failed)
+
+    def _call(self, func, item):
+        with self.slot():
+            return func(item)
+
+    def map(self, func, items):
+        """Call a function on each item, in threads within the window.
+
+        :param func: The function, typically making a call to Core.
+        :param items: The arguments of the calls.
+        :returns: The list of the results, in the order of the items.
+        :raises Exception: the first exception raised by a call, once all
+            the calls are done.
+        """
+        executor = ThreadPoolExecutor(
+            self.max_limit, thread_name_prefix='mailmanclient-bulk')
+        with executor:
+            futures = [executor.submit(copy_context().run, self._call,
+                                       func, item)
+                       for item in items]
+        return [future.result() for future in futures]
+
+    async def amap(self, func, items):
+        """Await a coroutine function on each item, within the window.
+
+        :param func: The coroutine function, typically making a call to
+            Core.
+        :param items: The arguments of the calls.
+        :returns: The list of the results, in the order of the items.
+        """
+        async def call(item):
+            async with self.aslot():
+                return await func(item)
+        return await asyncio.gather(*[call(item) for item in items])
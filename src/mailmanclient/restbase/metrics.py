@@ -0,0 +1,370 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Per-route metrics of the REST calls."""
+
+import bisect
+import math
+import socket
+import threading
+from collections import namedtuple
+
+from mailmanclient.restbase.middleware import Middleware
+
+__metaclass__ = type
+__all__ = [
+    'Metrics',
+    'PrometheusExporter',
+    'StatsdExporter',
+    'route_template',
+]
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# The placeholder of the segment following each collection of the API.
+PLACEHOLDERS = {
+    'addresses': '{address}',
+    'bans': '{email}',
+    'config': '{attribute}',
+    'configuration': '{section}',
+    'domains': '{domain}',
+    'header-matches': '{index}',
+    'held': '{request}',
+    'lists': '{list}',
+    'member': '{email}',
+    'members': '{member}',
+    'moderator': '{email}',
+    'nonmember': '{email}',
+    'owner': '{email}',
+    'owners': '{owner}',
+    'queues': '{queue}',
+    'requests': '{request}',
+    'roster': '{role}',
+    'uris': '{template}',
+    'users': '{user}',
+    # The files of a queue are below its identifier.
+    '{queue}': '{file}',
+}
+
+# The segments which are resources of a collection, not identifiers.
+KEYWORDS = frozenset(['count', 'find', 'styles'])
+
+
+def route_template(resource):
+    """Return the route of a resource, without its identifiers.
+
+    ``lists/ant.example.com/roster/member?page=2`` becomes
+    ``lists/{list}/roster/{role}``, so that the calls to all the lists and
+    all the pages are counted together.
+
+    :param resource: The path of the resource relative to the API root.
+    :type resource: str
+    """
+    segments = resource.partition('?')[0].strip('/').split('/')
+    route = []
+    previous = None
+    for segment in segments:
+        placeholder = PLACEHOLDERS.get(previous)
+        if placeholder is not None and segment not in KEYWORDS:
+            route.append(placeholder)
+            # The identifier is not a collection itself, but may be
+            # followed by another one.
+            previous = placeholder
+        else:
+            route.append(segment)
+            previous = segment
+    return '/'.join(route)
+
+
+def status_class(status_code):
+    """Return the class of a status code, e.g. ``'2xx'``, or ``'error'``
+    when no response was received."""
+    if status_code is None:
+        return 'error'
+    return '{}xx'.format(status_code // 100)
+
+
+#: What the exporters receive about each call.
+Sample = namedtuple('Sample', [
+    'method', 'route', 'status', 'elapsed', 'size', 'retries', 'cached'])
+
+
+class RouteStats:
+    """The metrics of the calls to a route."""
+
+    def __init__(self, buckets):
+        #: The number of calls per status class.
+        self.statuses = {}
+        #: The number of calls in each latency bucket, the last one being
+        #: the calls slower than the upper bucket.
+        self.buckets = [0] * (len(buckets) + 1)
+        #: The total latency, in seconds.
+        self.latency = 0
+        #: The bytes of the responses received from Core.
+        self.response_bytes = 0
+        self.retries = 0
+        self.cache_hits = 0
+
+    def __repr__(self):
+        return '<RouteStats {0} calls>'.format(self.calls)
+
+    @property
+    def calls(self):
+        return sum(self.statuses.values())
+
+    def copy(self):
+        copy = RouteStats(())
+        copy.__dict__.update(self.__dict__)
+        copy.statuses = dict(self.statuses)
+        copy.buckets = list(self.buckets)
+        return copy
+
+
+class Metrics(Middleware):
+    """Count the calls, their latency and their size per route.
+
+    The routes are templates like ``lists/{list}/roster/{role}``, see
+    :func:`route_template`.  Add the metrics to the middleware of a client,
+    and read them with a :class:`PrometheusExporter`, or push each call to
+    other exporters such as a :class:`StatsdExporter`::
+
+        metrics = Metrics(exporters=[StatsdExporter()])
+        client = Client(..., middleware=[metrics])
+
+    :param buckets: The upper bounds of the latency histogram, in seconds.
+    :type buckets: Iterable[float]
+    :param exporters: The exporters to which each call is pushed.  They have
+        an ``export(sample)`` method.
+    :param route: The function returning the route of a resource.
+    :type route: Callable[[str], str]
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, exporters=(),
+                 route=route_template):
+        self.buckets = tuple(sorted(buckets))
+        self.exporters = list(exporters)
+        self.route = route
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<Metrics {0} routes>'.format(len(self._routes))
+
+    def on_response(self, context):
+        self.observe(context)
+
+    def on_error(self, context):
+        self.observe(context)
+
+    def observe(self, context):
+        """Record a finished call.
+
+        :param context: The :class:`CallContext` of the call.
+        """
+        elapsed = context.elapsed
+        if elapsed is None:
+            elapsed = 0
+        size = retries = 0
+        # The size and retries of a coalesced call are counted with the one
+        # sent.
+        if not context.coalesced:
+            retries = context.retries
+            if context.response is not None and not context.cached:
+                size = context.body_size
+        sample = Sample(context.method, self.route(context.resource),
+                        status_class(context.status_code), elapsed, size,
+                        retries, context.cached)
+        with self._lock:
+            stats = self._routes.get((sample.method, sample.route))
+            if stats is None:
+                stats = self._routes[sample.method, sample.route] = (
+                    RouteStats(self.buckets))
+            stats.statuses[sample.status] = (
+                stats.statuses.get(sample.status, 0) + 1)
+            stats.buckets[bisect.bisect_left(self.buckets, elapsed)] += 1
+            stats.latency += elapsed
+            stats.response_bytes += size
+            stats.retries += sample.retries
+            stats.cache_hits += sample.cached
+        for exporter in self.exporters:
+            exporter.export(sample)
+
+    def get(self, method, route):
+        """Return the :class:`RouteStats` of a route, or None."""
+        return self._routes.get((method.upper(), route))
+
+    def snapshot(self):
+        """Return a copy of the :class:`RouteStats` of each ``(method,
+        route)`` tuple."""
+        with self._lock:
+            return {key: stats.copy() for key, stats in self._routes.items()}
+
+    def routes(self):
+        """Return the ``(method, route)`` tuples which were called."""
+        with self._lock:
+            return sorted(self._routes)
+
+    def reset(self):
+        """Forget all the calls."""
+        with self._lock:
+            self._routes.clear()
+
+
+def _escape(value):
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _format(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(value)
+
+
+class PrometheusExporter:
+    """Render metrics in the Prometheus text format.
+
+    Serve :meth:`render` on the ``/metrics`` page of the application::
+
+        exporter = PrometheusExporter(metrics)
+        body = exporter.render()
+
+    :param metrics: The metrics to render.
+    :type metrics: Metrics
+    :param prefix: The prefix of the metric names.
+    :type prefix: str
+    """
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, metrics, prefix='mailmanclient'):
+        self.metrics = metrics
+        self.prefix = prefix
+
+    def __repr__(self):
+        return '<PrometheusExporter {0}>'.format(self.prefix)
+
+    def render(self):
+        """Return the current value of the metrics.
+
+        :rtype: str
+        """
+        routes = sorted(self.metrics.snapshot().items())
+        lines = []
+        self._write(lines, 'calls_total', 'counter',
+                    'REST calls made to Core.', [
+                        (key, '', dict(status=status), count)
+                        for key, stats in routes
+                        for status, count in sorted(stats.statuses.items())])
+        histogram = []
+        for key, stats in routes:
+            cumulative = 0
+            bounds = self.metrics.buckets + (math.inf,)
+            for bound, count in zip(bounds, stats.buckets):
+                cumulative += count
+                histogram.append(
+                    (key, '_bucket', dict(le=_format(bound)), cumulative))
+            histogram.append((key, '_sum', {}, stats.latency))
+            histogram.append((key, '_count', {}, stats.calls))
+        self._write(lines, 'call_duration_seconds', 'histogram',
+                    'Duration of the REST calls, in seconds.', histogram)
+        for name, attribute, description in (
+                ('response_bytes_total', 'response_bytes',
+                 'Bytes of the responses received from Core.'),
+                ('retries_total', 'retries', 'Retries of the REST calls.'),
+                ('cache_hits_total', 'cache_hits',
+                 'REST calls answered by the response cache.')):
+            self._write(lines, name, 'counter', description, [
+                (key, '', {}, getattr(stats, attribute))
+                for key, stats in routes])
+        return '\n'.join(lines) + '\n'
+
+    def _write(self, lines, name, kind, description, samples):
+        name = '{}_{}'.format(self.prefix, name)
+        lines.append('# HELP {} {}'.format(name, description))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for (method, route), suffix, labels, value in samples:
+            labels = dict(method=method, route=route, **labels)
+            labels = ','.join(
+                '{}="{}"'.format(label, _escape(text))
+                for label, text in labels.items())
+            lines.append('{}{}{{{}}} {}'.format(
+                name, suffix, labels, _format(value)))
+
+
+class StatsdExporter:
+    """Push each call to a statsd server over UDP.
+
+    Each call sends a counter and a timer named after the method and the
+    route, e.g. ``mailmanclient.GET.lists.list.roster.role.calls.2xx``.
+    Sending is best effort: the errors are ignored.
+
+    :param host: The host of the statsd server.
+    :type host: str
+    :param port: The UDP port of the statsd server.
+    :type port: int
+    :param prefix: The prefix of the metric names.
+    :type prefix: str
+    """
+
+    def __init__(self, host='localhost', port=8125, prefix='mailmanclient'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<StatsdExporter {0[0]}:{0[1]}>'.format(self.address)
+
+    def get_name(self, sample):
+        """Return the name of the metrics of a call."""
+        route = sample.route.replace('{', '').replace('}', '')
+        route = route.replace('.', '_').replace('/', '.') or 'root'
+        return '{}.{}.{}'.format(self.prefix, sample.method, route)
+
+    def format(self, sample):
+        """Return the statsd lines of a call."""
+        name = self.get_name(sample)
+        lines = [
+            '{}.calls.{}:1|c'.format(name, sample.status),
+            '{}.duration:{:.3f}|ms'.format(name, sample.elapsed * 1000),
+        ]
+        if sample.size:
+            lines.append('{}.response_bytes:{}|c'.format(name, sample.size))
+        if sample.retries:
+            lines.append('{}.retries:{}|c'.format(name, sample.retries))
+        if sample.cached:
+            lines.append('{}.cache_hits:1|c'.format(name))
+        return lines
+
+    def export(self, sample):
+        """Send a call to the statsd server."""
+        packet = '\n'.join(self.format(sample)).encode('utf-8')
+        try:
+            with self._lock:
+                if self._socket is None:
+                    self._socket = socket.socket(
+                        socket.AF_INET, socket.SOCK_DGRAM)
+                self._socket.sendto(packet, self.address)
+        except OSError:
+            pass
+
+    def close(self):
+        with self._lock:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
@@ -0,0 +1,177 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Middleware wrapping the REST calls."""
+
+import time
+
+__metaclass__ = type
+__all__ = [
+    'CallContext',
+    'Middleware',
+]
+
+
+class CallContext:
+    """What a middleware knows about a REST call.
+
+    :param path: The path given to :meth:`Connection.call`.
+    :param data: The data of the call, if any.
+    :param params: The request parameters: ``url``, ``method``, ``data``
+        and ``headers``.  A middleware can change them before the request
+        is sent.
+    :param resource: The path of the resource relative to the API root,
+        with the sorted query string.  Unlike `path`, it is never a full URL.
+    """
+
+    def __init__(self, path, data, params, resource=None):
+        self.path = path
+        self.data = data
+        self.params = params
+        self.resource = path if resource is None else resource
+        #: When the call started, from :func:`time.monotonic`.
+        self.start = time.monotonic()
+        #: How long the call took, in seconds, once it is finished.
+        self.elapsed = None
+        #: The :class:`requests.Response`, once received.
+        self.response = None
+        #: The decoded content of the response.
+        self.content = None
+        #: The exception raised by the call, if any.
+        self.error = None
+        #: Whether the response came from the response cache.
+        self.cached = False
+        #: Whether the response was received by an identical call made at
+        #: the same time by another caller.  The retries and the times are
+        #: then the ones of that call.
+        self.coalesced = False
+        #: The number of times the request was sent again.
+        self.retries = 0
+        #: The time spent waiting for the limiter or the scheduler.
+        self.queue_time = 0
+        #: The time spent sending the request and its retries.
+        self.network_time = 0
+        #: Free storage for the middleware.
+        self.extra = {}
+
+    def __repr__(self):
+        return '<CallContext {0} {1}>'.format(self.method, self.url)
+
+    def join(self, leader):
+        """Record that the response was received by another call.
+
+        :param leader: The context of that call, if it has one.
+        """
+        self.coalesced = True
+        if leader is not None:
+            self.retries = leader.retries
+            self.queue_time = leader.queue_time
+            self.network_time = leader.network_time
+
+    @property
+    def method(self):
+        return self.params['method']
+
+    @property
+    def url(self):
+        return self.params['url']
+
+    @property
+    def status_code(self):
+        """The status of the response, or None."""
+        if self.response is None:
+            return None
+        return self.response.status_code
+
+    @property
+    def request_size(self):
+        """The size of the request body in bytes."""
+        data = self.params.get('data')
+        if not data:
+            return 0
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return len(data)
+
+    @property
+    def body_size(self):
+        """The size of the response body in bytes, or None."""
+        if self.response is None:
+            return None
+        return len(self.response.content)
+
+    def finish(self):
+        self.elapsed = time.monotonic() - self.start
+
+
+class Middleware:
+    """Base class of the middleware.
+
+    A middleware wraps the whole REST call, from the request parameters to
+    the decoded content, including the response cache and the retries.
+    It works the same with :class:`mailmanclient.Client` and
+    :class:`mailmanclient.asynclient.AsyncClient`: override
+    :meth:`on_request`, :meth:`on_response` and :meth:`on_error`, which
+    receive the :class:`CallContext` of the call.
+
+    To control the call itself, e.g. to replay it, override :meth:`wrap`
+    and :meth:`awrap` instead.  The middleware are called in the order they
+    were given, the first one being the outermost.
+    """
+
+    def on_request(self, context):
+        """Called before the call is made."""
+
+    def on_response(self, context):
+        """Called once the call returned the content."""
+
+    def on_error(self, context):
+        """Called when the call raised ``context.error``, which is then
+        raised again."""
+
+    def wrap(self, context, call_next):
+        """Make a call, from the :class:`mailmanclient.Client`.
+
+        :param context: The :class:`CallContext` of the call.
+        :param call_next: The next middleware, or the call itself, taking
+            the context and returning a ``(response, content)`` tuple.
+        :returns: The ``(response, content)`` tuple.
+        """
+        self.on_request(context)
+        try:
+            result = call_next(context)
+        except Exception as error:
+            context.error = error
+            self.on_error(context)
+            raise
+        self.on_response(context)
+        return result
+
+    async def awrap(self, context, call_next):
+        """Make a call, from the
+        :class:`mailmanclient.asynclient.AsyncClient`.
+
+        See :meth:`wrap`, `call_next` is a coroutine function.
+        """
+        self.on_request(context)
+        try:
+            result = await call_next(context)
+        except Exception as error:
+            context.error = error
+            self.on_error(context)
+            raise
+        self.on_response(context)
+        return result
@@ -13,13 +13,21 @@
 #
 # You should have received a copy of the GNU Lesser General Public License
 # along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+import threading
+from collections import OrderedDict, deque
+from concurrent import futures
+from contextvars import copy_context
 from urllib.parse import urlencode, urlsplit, parse_qs, urlunsplit
 
 from mailmanclient.constants import DEFAULT_PAGE_ITEM_COUNT
+from mailmanclient.restbase.cache import related_collections
 
 __metaclass__ = type
 __all__ = [
-    'Page'
+    'Page',
+    'Paginator',
+    'iter_entries',
+    'iter_pages',
 ]
 
 
@@ -50,12 +58,7 @@ class Page:
         return len(self._entries)
 
     def _build_url(self):
-        url = list(urlsplit(self._path))
-        qs = parse_qs(url[3])
-        qs["count"] = self._count
-        qs["page"] = self._page
-        url[3] = urlencode(qs, doseq=True)
-        return urlunsplit(url)
+        return _page_url(self._path, self._count, self._page)
 
     def _create_page(self):
         self._entries = []
@@ -90,3 +93,262 @@ class Page:
     @property
     def has_next(self):
         return self._count * self._page < self.total_size
+
+    @property
+    def page_count(self):
+        """The number of pages of the collection, at least 1."""
+        return _page_count(self.total_size, self._count)
+
+    def fetch_all(self, parallel=4):
+        """Return the entries of all the pages of the collection.
+
+        The number of pages is known from :attr:`total_size`, so the other
+        pages are fetched at the same time by `parallel` threads.  The
+        entries are returned in order, and those which moved to another page
+        while the pages were fetched are returned only once.
+
+        :param int parallel: The number of pages fetched at the same time.
+        :returns: A list of `model` instances.
+        """
+        pages = {self._page: self}
+        executor = futures.ThreadPoolExecutor(
+            max_workers=max(1, parallel),
+            thread_name_prefix='mailmanclient-page')
+        fetching = {}
+        try:
+            for nr in range(1, self.page_count + 1):
+                if nr != self._page:
+                    fetching[nr] = executor.submit(
+                        copy_context().run, self.__class__, self._connection,
+                        self._path, self._model, self._count, nr)
+            for nr, future in fetching.items():
+                pages[nr] = future.result()
+        finally:
+            # Don't fetch the pages left after an error.  The futures are
+            # cancelled one by one, shutdown() only cancels since Python 3.9.
+            for future in fetching.values():
+                future.cancel()
+            executor.shutdown(wait=False)
+        return _unique([entry for nr in sorted(pages) for entry in pages[nr]],
+                       lambda entry: entry._url)
+
+
+class Paginator:
+    """Random access to the pages of a collection, with a cache.
+
+    The last `max_pages` pages used are kept, so that going back to a page
+    doesn't request it again, and the pages around the one returned last
+    are fetched in the background.  The pages are dropped when a write
+    request through the same connection may have changed the collection.
+
+    :param connection: The connection to fetch the pages with.
+    :param str path: The path of the collection.
+    :param model: The class of the entries.
+    :param int count: The number of entries per page.
+    :param int max_pages: The number of pages kept.
+    :param bool prefetch: Whether to fetch the previous and the next pages
+        of the page returned last.
+    """
+
+    def __init__(self, connection, path, model, count=DEFAULT_PAGE_ITEM_COUNT,
+                 max_pages=10, prefetch=True):
+        self._connection = connection
+        self._path = path
+        self._model = model
+        self._count = count
+        self.max_pages = max_pages
+        self.prefetch = prefetch
+        self.hits = 0
+        self.misses = 0
+        self._collection = connection._path_key(path).split(
+            '?', 1)[0].split('/', 1)[0]
+        self._pages = OrderedDict()
+        self._pending = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        connection.add_cache(self)
+
+    def __repr__(self):
+        return '<Paginator {0} ({1} pages)>'.format(
+            self._path, len(self._pages))
+
+    def __len__(self):
+        return len(self._pages)
+
+    @property
+    def page_count(self):
+        """The number of pages of the collection, at least 1."""
+        with self._lock:
+            pages = list(self._pages.values())
+        page = pages[-1] if pages else self.get_page(1)
+        return page.page_count
+
+    def get_page(self, nr):
+        """Return a page, from the cache if it is there.
+
+        :param int nr: The page number, starting at 1.
+        :rtype: Page
+        """
+        with self._lock:
+            page = self._pages.get(nr)
+            future = self._pending.get(nr)
+            generation = self._generation
+            if page is not None:
+                self._pages.move_to_end(nr)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if page is None and future is not None:
+            try:
+                page = future.result()
+            except Exception:
+                # Cancelled or failed, fetch it again.
+                page = None
+            with self._lock:
+                if generation != self._generation:
+                    # Fetched before a write, it may be stale.
+                    page = None
+        if page is None:
+            page = self._fetch(nr)
+        if self.prefetch:
+            for neighbour in (nr + 1, nr - 1):
+                if 1 <= neighbour <= page.page_count:
+                    self._prefetch(neighbour)
+        return page
+
+    def _fetch(self, nr, future=None):
+        generation = self._generation
+        try:
+            page = Page(self._connection, self._path, self._model,
+                        self._count, nr)
+        finally:
+            with self._lock:
+                # A newer fetch may be pending since an invalidation.
+                if future is not None and self._pending.get(nr) is future:
+                    del self._pending[nr]
+        with self._lock:
+            # The page may be stale if the collection was written since.
+            if generation == self._generation:
+                self._pages[nr] = page
+                self._pages.move_to_end(nr)
+                while len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+        return page
+
+    def _prefetch(self, nr):
+        with self._lock:
+            if nr in self._pages or nr in self._pending:
+                return
+            future = futures.Future()
+            executor = self._connection._get_prefetch_executor()
+            executor.submit(
+                copy_context().run, self._run_prefetch, nr, future)
+            self._pending[nr] = future
+
+    def _run_prefetch(self, nr, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(self._fetch(nr, future))
+        except Exception as error:
+            future.set_exception(error)
+
+    def invalidate(self, key=None):
+        """Drop the cached pages.
+
+        :param str key: The normalized path of a write request.  If given,
+            the pages are only dropped if it may have changed the
+            collection.
+        """
+        if key is not None and self._collection not in related_collections(
+                key):
+            return
+        with self._lock:
+            self._generation += 1
+            self._pages.clear()
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+
+
+def _page_url(path, count, page):
+    """Return the url of a page of the collection at `path`."""
+    url = list(urlsplit(path))
+    qs = parse_qs(url[3])
+    qs["count"] = count
+    qs["page"] = page
+    url[3] = urlencode(qs, doseq=True)
+    return urlunsplit(url)
+
+
+def _page_count(total_size, count):
+    return max(1, -(-total_size // count))
+
+
+def _unique(entries, key):
+    """Drop the entries seen on a previous page, keeping the order."""
+    seen = set()
+    unique = []
+    for entry in entries:
+        if key(entry) not in seen:
+            seen.add(key(entry))
+            unique.append(entry)
+    return unique
+
+
+def iter_pages(connection, path, model, count=DEFAULT_PAGE_ITEM_COUNT,
+               prefetch=1):
+    """Iterate over all the pages of a collection.
+
+    While a page is processed, the `prefetch` next ones are fetched by the
+    threads of the connection, so that walking a big collection isn't a
+    strict request-process-request loop.  At most ``prefetch + 1`` pages are
+    held at once, whatever the size of the collection.
+
+    The pages which are not consumed yet when the iteration is stopped are
+    cancelled, or dropped when they are already being fetched.
+
+    :param connection: The connection to fetch the pages with.
+    :param str path: The path of the collection.
+    :param model: The class of the entries.
+    :param int count: The number of entries per page.
+    :param int prefetch: The number of pages fetched ahead, 0 fetches the
+        pages only when they are needed.
+    :returns: An iterator of :class:`Page`.
+    """
+    page = Page(connection, path, model, count)
+    # The number of pages is only known after the first one.
+    last = page.page_count
+    next_nr = 2
+    pending = deque()
+    try:
+        while True:
+            while len(pending) < prefetch and next_nr <= last:
+                # Keep the deadline, the priority and the tracing span.
+                pending.append(connection._get_prefetch_executor().submit(
+                    copy_context().run, Page, connection, path, model, count,
+                    next_nr))
+                next_nr += 1
+            yield page
+            if pending:
+                page = pending.popleft().result()
+            elif next_nr <= last:
+                page = Page(connection, path, model, count, next_nr)
+                next_nr += 1
+            else:
+                return
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def iter_entries(connection, path, model, count=DEFAULT_PAGE_ITEM_COUNT,
+                 prefetch=1):
+    """Iterate over the entries of all the pages of a collection.
+
+    See :func:`iter_pages` for the parameters.
+
+    :returns: An iterator of `model` instances.
+    """
+    for page in iter_pages(connection, path, model, count, prefetch):
+        yield from page
@@ -0,0 +1,152 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Record the REST calls made by a block of code."""
+
+import warnings
+from collections import namedtuple
+from contextvars import ContextVar
+
+from mailmanclient.restbase.callsite import get_call_site
+from mailmanclient.restbase.metrics import route_template
+from mailmanclient.restbase.middleware import Middleware
+
+__metaclass__ = type
+__all__ = [
+    'CallRecorder',
+    'NPlusOneWarning',
+    'RecordedCall',
+]
+
+
+_active_recorders = ContextVar('mailmanclient_recorders', default=())
+
+
+class NPlusOneWarning(UserWarning):
+    """The same route was called again and again, e.g. once per object of a
+    collection."""
+
+
+#: A REST call made in a :class:`CallRecorder` block.
+RecordedCall = namedtuple('RecordedCall', [
+    'method', 'route', 'resource', 'status_code', 'elapsed', 'call_site'])
+
+
+class CallRecorder(Middleware):
+    """Record the REST calls made inside a ``with`` block.
+
+    The calls are recorded with the line of code which made them, and the
+    routes called at least `threshold` times are reported, since they are
+    usually made once per object of a collection (the "N+1" pattern)::
+
+        with client.record_calls() as calls:
+            emails = [member.address.email for member in mlist.members]
+        calls.assert_max_calls(2)
+
+    Only the calls made in the current thread or asyncio task, and the tasks
+    it creates, are recorded.
+
+    :param connection: The connection whose calls are recorded.
+    :param threshold: The number of calls to the same route reported as a
+        repeat.
+    :type threshold: int
+    :param warn: Whether to issue a :class:`NPlusOneWarning` at the end of
+        the block for each repeated route.
+    :type warn: bool
+    """
+
+    def __init__(self, connection, threshold=3, warn=True):
+        self.connection = connection
+        self.threshold = threshold
+        self.warn = warn
+        #: The :class:`RecordedCall` made in the block.
+        self.calls = []
+        self._token = None
+
+    def __repr__(self):
+        return '<CallRecorder {0} calls>'.format(len(self.calls))
+
+    def __enter__(self):
+        # Other threads may be iterating over the middleware.
+        self.connection.middleware = self.connection.middleware + [self]
+        self._token = _active_recorders.set(_active_recorders.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_recorders.reset(self._token)
+        self.connection.middleware = [
+            middleware for middleware in self.connection.middleware
+            if middleware is not self]
+        if self.warn and exc_info[0] is None:
+            for (method, route), calls in self.repeated().items():
+                warnings.warn(NPlusOneWarning(
+                    '{} {} called {} times, from {}'.format(
+                        method, route, len(calls), calls[0].call_site)),
+                    stacklevel=2)
+
+    def on_response(self, context):
+        self._record(context)
+
+    def on_error(self, context):
+        self._record(context)
+
+    def _record(self, context):
+        if self not in _active_recorders.get():
+            return
+        self.calls.append(RecordedCall(
+            context.method, route_template(context.resource),
+            context.resource, context.status_code, context.elapsed,
+            get_call_site()))
+
+    def repeated(self):
+        """Return the calls to the routes called at least `threshold` times.
+
+        :returns: A dictionary of the lists of calls, keyed by ``(method,
+            route)``.
+        """
+        routes = {}
+        for call in self.calls:
+            routes.setdefault((call.method, call.route), []).append(call)
+        return {key: calls for key, calls in routes.items()
+                if len(calls) >= self.threshold}
+
+    def report(self):
+        """Return a description of the recorded calls, one per line."""
+        return '\n'.join(
+            '{0.method} {0.resource} ({0.status_code}) from {0.call_site}'
+            .format(call) for call in self.calls)
+
+    def assert_max_calls(self, count):
+        """Check that at most `count` calls were made.
+
+        :raises AssertionError: when more calls were made.
+        """
+        if len(self.calls) > count:
+            raise AssertionError(
+                '{} REST calls made, expected at most {}:\n{}'.format(
+                    len(self.calls), count, self.report()))
+
+    def assert_no_repeats(self):
+        """Check that no route was called `threshold` times.
+
+        :raises AssertionError: when a route was.
+        """
+        repeated = self.repeated()
+        if repeated:
+            raise AssertionError('Repeated REST calls: {}\n{}'.format(
+                ', '.join('{} {} ({} times)'.format(method, route, len(calls))
+                          for (method, route), calls in repeated.items()),
+                self.report()))
@@ -0,0 +1,148 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Retry policy for the REST calls."""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+__metaclass__ = type
+__all__ = [
+    'RetryPolicy',
+]
+
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+
+class RetryPolicy:
+    """Decide when and after how long a failed REST call is sent again.
+
+    Only idempotent methods are retried, so that a request which reached
+    Core before failing is never applied twice.  The delay between two
+    attempts grows exponentially, is capped and is randomized ("full
+    jitter") so that the clients of a restarting Core don't all come back at
+    the same time.
+
+    :param max_retries: The maximum number of retries of a single call.
+    :type max_retries: int
+    :param backoff_factor: The base delay, in seconds.  The delay before
+        retry ``n`` (counting from 0) is drawn between 0 and
+        ``backoff_factor * 2 ** n``.
+    :type backoff_factor: float
+    :param max_backoff: The maximum delay between two attempts, in seconds.
+        A ``Retry-After`` asking to wait longer than that ends the retries.
+    :type max_backoff: float
+    :param statuses: The HTTP status codes to retry.
+    :type statuses: Iterable[int]
+    :param retry_patch: Whether ``PATCH`` requests can be retried too.  They
+        are not idempotent in general, but the ones sent by this library only
+        set attributes to given values.
+    :type retry_patch: bool
+    :param jitter: Whether to randomize the delays.
+    :type jitter: bool
+    """
+
+    def __init__(self, max_retries=3, backoff_factor=0.2, max_backoff=10,
+                 statuses=(502, 503, 504), retry_patch=False, jitter=True):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.retry_patch = retry_patch
+        self.jitter = jitter
+        #: The total number of retries made with this policy.
+        self.retries = 0
+        #: The number of calls which were retried at least once.
+        self.retried_calls = 0
+        #: The number of calls which still failed after all the retries.
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<RetryPolicy max_retries={0} ({1} retries so far)>'.format(
+            self.max_retries, self.retries)
+
+    def is_retryable(self, method):
+        """Whether a request with the given HTTP method can be retried."""
+        return method in IDEMPOTENT_METHODS or (
+            self.retry_patch and method == 'PATCH')
+
+    def get_delay(self, method, attempt, response=None, error=None):
+        """Return how long to wait before sending a failed request again.
+
+        :param method: The HTTP method of the request.
+        :param attempt: The number of retries already made for the call.
+        :param response: The response, if one was received.
+        :param error: The connection error, if no response was received.
+        :returns: The delay in seconds, or None if the call must not be
+            retried.
+        """
+        if response is not None and response.status_code not in self.statuses:
+            return None
+        if response is None and error is None:
+            return None
+        if not self.is_retryable(method):
+            return None
+        if attempt >= self.max_retries:
+            if attempt > 0:
+                self._count('exhausted')
+            return None
+        delay = min(self.backoff_factor * 2 ** attempt, self.max_backoff)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if response is not None:
+            retry_after = parse_retry_after(
+                response.headers.get('retry-after'))
+            if retry_after is not None:
+                if retry_after > self.max_backoff:
+                    self._count('exhausted')
+                    return None
+                delay = retry_after
+        return delay
+
+    def record(self, attempt):
+        """Record that retry number `attempt` (counting from 0) is sent."""
+        with self._lock:
+            self.retries += 1
+            if attempt == 0:
+                self.retried_calls += 1
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def parse_retry_after(value):
+    """Parse a ``Retry-After`` header into a number of seconds.
+
+    :param value: The header value, a number of seconds or an HTTP date.
+    :returns: The number of seconds to wait, or None if it is missing or
+        invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0)
@@ -0,0 +1,194 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Priority lanes for the interactive and the bulk REST calls."""
+
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from mailmanclient.restbase.waiting import await_in_queue, wait_in_queue
+
+__metaclass__ = type
+__all__ = [
+    'BULK',
+    'INTERACTIVE',
+    'PriorityScheduler',
+    'current_priority',
+    'priority',
+]
+
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+LANES = (INTERACTIVE, BULK)
+
+_current_priority = ContextVar('mailmanclient_priority', default=INTERACTIVE)
+
+
+def current_priority():
+    """Return the lane of the calls made in the current context."""
+    return _current_priority.get()
+
+
+@contextmanager
+def priority(lane):
+    """Send all the REST calls made inside the block in a lane.
+
+    The lane follows the current thread or asyncio task.  Calls are
+    interactive by default.
+
+    :param lane: :data:`INTERACTIVE` or :data:`BULK`.
+    :type lane: str
+    """
+    if lane not in LANES:
+        raise ValueError('Unknown priority lane: {}'.format(lane))
+    token = _current_priority.set(lane)
+    try:
+        yield lane
+    finally:
+        _current_priority.reset(token)
+
+
+class PriorityScheduler:
+    """Dispatch the interactive calls ahead of the bulk ones.
+
+    At most `max_in_flight` calls are in progress.  The other ones wait in
+    their lane, and when a call finishes the next interactive call starts
+    first.  So that bulk work is never starved, one bulk call is let through
+    after `bulk_every` interactive calls dispatched while bulk calls were
+    waiting.
+
+    The bulk calls can also be kept from filling all the slots with
+    `bulk_max_in_flight`, so that an interactive call doesn't wait for the
+    bulk calls in progress to finish.
+
+    A scheduler can be shared by several clients, in threads and
+    coroutines.
+
+    :param max_in_flight: The maximum number of calls in progress.
+    :type max_in_flight: int
+    :param bulk_max_in_flight: The maximum number of bulk calls in
+        progress.  Defaults to one less than `max_in_flight`.
+    :type bulk_max_in_flight: int
+    :param bulk_every: The number of interactive calls dispatched ahead of
+        a waiting bulk call.
+    :type bulk_every: int
+    """
+
+    def __init__(self, max_in_flight=8, bulk_max_in_flight=None,
+                 bulk_every=4):
+        self.max_in_flight = max_in_flight
+        if bulk_max_in_flight is None:
+            bulk_max_in_flight = max(max_in_flight - 1, 1)
+        self.bulk_max_in_flight = bulk_max_in_flight
+        self.bulk_every = bulk_every
+        #: The number of calls dispatched, per lane.
+        self.dispatched = dict.fromkeys(LANES, 0)
+        self._in_flight = dict.fromkeys(LANES, 0)
+        self._queues = {lane: deque() for lane in LANES}
+        # The interactive calls dispatched while bulk calls were waiting.
+        self._streak = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<PriorityScheduler {0}>'.format(self.stats())
+
+    def stats(self):
+        """Return the number of calls in progress and waiting, per lane."""
+        with self._lock:
+            stats = {}
+            for lane in LANES:
+                stats['{}_in_flight'.format(lane)] = self._in_flight[lane]
+                stats['{}_waiting'.format(lane)] = len(self._queues[lane])
+            return stats
+
+    def _can_start(self, lane):
+        if sum(self._in_flight.values()) >= self.max_in_flight:
+            return False
+        return (lane == INTERACTIVE
+                or self._in_flight[BULK] < self.bulk_max_in_flight)
+
+    def _dispatch(self):
+        """Start the waiting calls which can be, interactive ones first.
+
+        Must be called with the lock held.
+
+        :returns: The waiters to wake up.
+        """
+        woken = []
+        interactive, bulk = self._queues[INTERACTIVE], self._queues[BULK]
+        while True:
+            bulk_ready = bool(bulk) and self._can_start(BULK)
+            if (interactive and self._can_start(INTERACTIVE)
+                    and not (bulk_ready and self._streak >= self.bulk_every)):
+                lane = INTERACTIVE
+                if bulk_ready:
+                    self._streak += 1
+            elif bulk_ready:
+                lane = BULK
+                self._streak = 0
+            else:
+                return woken
+            waiter = self._queues[lane].popleft()
+            waiter.granted = True
+            self._in_flight[lane] += 1
+            self.dispatched[lane] += 1
+            woken.append(waiter)
+
+    def _enqueue(self, lane, waiter):
+        with self._lock:
+            self._queues[lane].append(waiter)
+            woken = self._dispatch()
+        for other in woken:
+            if other is not waiter:
+                other.wake()
+        return waiter.granted
+
+    def _give_up(self, lane, waiter):
+        with self._lock:
+            if not waiter.granted:
+                self._queues[lane].remove(waiter)
+                return
+        self.release(lane)
+
+    def acquire(self, lane=INTERACTIVE, timeout=None):
+        """Wait for the turn of a call.
+
+        :param lane: The lane of the call.
+        :param timeout: The longest the caller can wait, in seconds.
+        :returns: Whether the call can start.  It must then be given back to
+            :meth:`release`.
+        """
+        return wait_in_queue(functools.partial(self._enqueue, lane),
+                             functools.partial(self._give_up, lane), timeout)
+
+    async def aacquire(self, lane=INTERACTIVE, timeout=None):
+        """Wait for the turn of a call from a coroutine, see
+        :meth:`acquire`."""
+        return await await_in_queue(
+            functools.partial(self._enqueue, lane),
+            functools.partial(self._give_up, lane), timeout)
+
+    def release(self, lane=INTERACTIVE):
+        """Record the end of a call, and start the next ones."""
+        with self._lock:
+            self._in_flight[lane] -= 1
+            woken = self._dispatch()
+        for waiter in woken:
+            waiter.wake()
@@ -0,0 +1,231 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Pooled keep-alive HTTP sessions."""
+
+import functools
+import socket
+import threading
+import time
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+from mailmanclient.constants import (
+    DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_IDLE_TIMEOUT, DEFAULT_POOL_MAXSIZE)
+from mailmanclient.restbase.transport import Transport
+
+__metaclass__ = type
+__all__ = [
+    'SessionPool',
+    'UnixSocketTransport',
+]
+
+
+class SessionPool(Transport):
+    """A thread-safe pool of keep-alive HTTP connections to Mailman Core.
+
+    All the threads share a single connection pool, so a TCP (and TLS)
+    connection opened by one request is reused by the following ones instead
+    of being set up again for every call.  Each thread gets its own
+    :class:`requests.Session` on top of that shared pool, since sessions
+    themselves are not safe to share between threads.
+
+    :param pool_connections: The number of per-host pools to keep around.
+    :type pool_connections: int
+    :param pool_maxsize: The maximum number of connections kept alive for a
+        single host.
+    :type pool_maxsize: int
+    :param pool_block: Whether a request should wait for a free connection
+        when `pool_maxsize` connections to the host are already in use,
+        instead of opening an extra one which is discarded afterwards.
+    :type pool_block: bool
+    :param idle_timeout: Number of seconds after which the kept alive
+        connections of an idle pool are closed, so that a connection already
+        dropped by the server is not reused.  ``None`` disables the eviction.
+    :type idle_timeout: float
+    """
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False,
+                 idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._adapter = self._make_adapter(pool_connections=pool_connections,
+                                           pool_maxsize=pool_maxsize,
+                                           pool_block=pool_block)
+        self._local = threading.local()
+        # The session of each thread, dropped when the thread is gone.
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._last_used = time.monotonic()
+        self._closed = False
+
+    def __repr__(self):
+        return '<SessionPool ({0} in flight)>'.format(self._in_flight)
+
+    def _make_adapter(self, **kw):
+        return HTTPAdapter(**kw)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def session(self):
+        """The :class:`requests.Session` of the current thread."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+            with self._lock:
+                dead = self._prune_sessions()
+                self._sessions[threading.current_thread()] = session
+            self._close_sessions(dead)
+        return session
+
+    def _prune_sessions(self):
+        # Must be called with the lock held.
+        dead = [thread for thread in self._sessions
+                if not thread.is_alive()]
+        return [self._sessions.pop(thread) for thread in dead]
+
+    def _close_sessions(self, sessions):
+        for session in sessions:
+            # The adapter is shared with the other sessions, only the
+            # session's own state is released.
+            session.adapters.clear()
+            session.close()
+
+    def request(self, **params):
+        """Send a request through one of the pooled connections.
+
+        The parameters are the ones accepted by
+        :meth:`requests.Session.request`.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('The session pool is closed')
+            self._evict_if_idle()
+            self._in_flight += 1
+        try:
+            return self.session.request(**params)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._last_used = time.monotonic()
+
+    def _evict_if_idle(self):
+        # Must be called with the lock held.  Connections are only closed
+        # when no request is using the pool.
+        if self.idle_timeout is None or self._in_flight > 0:
+            return False
+        if time.monotonic() - self._last_used < self.idle_timeout:
+            return False
+        self._adapter.poolmanager.clear()
+        return True
+
+    def evict_idle(self):
+        """Close the kept alive connections if the pool has been idle.
+
+        The sessions of the threads which are gone are released too.
+
+        :returns: Whether the connections were closed.
+        :rtype: bool
+        """
+        with self._lock:
+            dead = self._prune_sessions()
+            evicted = self._evict_if_idle()
+        self._close_sessions(dead)
+        return evicted
+
+    def close(self):
+        """Close all the connections of the pool."""
+        with self._lock:
+            self._closed = True
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+        self._adapter.close()
+
+
+class _UnixHTTPConnection(HTTPConnection):
+    """An HTTP connection over an AF_UNIX socket."""
+
+    def __init__(self, *args, socket_path, **kw):
+        self.socket_path = socket_path
+        super().__init__(*args, **kw)
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class _UnixHTTPConnectionPool(HTTPConnectionPool):
+
+    ConnectionCls = _UnixHTTPConnection
+
+    def __init__(self, *args, socket_path, **kw):
+        super().__init__(*args, socket_path=socket_path, **kw)
+
+
+class _UnixHTTPAdapter(HTTPAdapter):
+
+    def __init__(self, socket_path, **kw):
+        self.socket_path = socket_path
+        super().__init__(**kw)
+
+    def init_poolmanager(self, *args, **kw):
+        super().init_poolmanager(*args, **kw)
+        pool_cls = functools.partial(
+            _UnixHTTPConnectionPool, socket_path=self.socket_path)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': pool_cls, 'https': pool_cls}
+
+
+class UnixSocketTransport(SessionPool):
+    """A pool of keep-alive HTTP connections to Core over a Unix socket.
+
+    This avoids the TCP loopback when Core's REST API listens on an
+    ``AF_UNIX`` socket of the same host.  The host of the base URL given to
+    the client is only used for the ``Host`` header.
+
+    :param socket_path: The path of the socket.
+    :type socket_path: str
+    :param kw: The other parameters of :class:`SessionPool`.
+    """
+
+    def __init__(self, socket_path, **kw):
+        self.socket_path = socket_path
+        super().__init__(**kw)
+
+    def __repr__(self):
+        return '<UnixSocketTransport {0} ({1} in flight)>'.format(
+            self.socket_path, self._in_flight)
+
+    def _make_adapter(self, **kw):
+        return _UnixHTTPAdapter(self.socket_path, **kw)
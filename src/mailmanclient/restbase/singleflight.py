@@ -0,0 +1,176 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Coalescing of concurrent identical requests."""
+
+import asyncio
+import threading
+import time
+
+from mailmanclient.restbase.deadline import current_deadline, without_deadline
+
+__metaclass__ = type
+__all__ = [
+    'AsyncSingleFlight',
+    'SingleFlight',
+]
+
+
+class _Flight:
+    """A call in progress, and its outcome."""
+
+    __slots__ = ('event', 'result', 'error', 'task', 'waiters', 'deadline')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.task = None
+        self.waiters = 0
+        #: The deadline of the thread making the call.
+        self.deadline = current_deadline()
+
+    def timed_out(self):
+        """Whether the call may have failed for lack of time.
+
+        The deadline of the thread which made the call is not the one of the
+        threads waiting for it, unless they share it.
+        """
+        return (self.deadline is not None and self.deadline.expired
+                and self.deadline is not current_deadline())
+
+
+class SingleFlight:
+    """Share a single call between the threads asking for the same key.
+
+    The first thread asking for a key makes the call, the threads asking for
+    the same key while it is in progress wait for it and get the same result,
+    or the same exception.  When the call failed after the deadline of the
+    thread making it ran out, one of the waiting threads makes it again.
+
+    This is used by the connections to send only one of the concurrent
+    identical ``GET`` requests.  Each caller decodes the shared response
+    itself, so that they never share mutable data.
+    """
+
+    def __init__(self):
+        #: The number of calls made.
+        self.flights = 0
+        #: The number of calls which were spared by joining another one.
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<{0} {1} calls, {2} coalesced>'.format(
+            self.__class__.__name__, self.flights, self.coalesced)
+
+    def __len__(self):
+        """The number of calls in progress."""
+        return len(self._flights)
+
+    def do(self, key, func, *args, timeout=None):
+        """Call ``func(*args)``, or wait for the call in progress for `key`.
+
+        :param key: The key identifying identical calls.
+        :param func: The function to call.
+        :param timeout: How long to wait for a call made by another thread,
+            in seconds.  ``None`` waits until it is finished.
+        :returns: The result of the call.
+        :raises TimeoutError: when the call made by another thread did not
+            finish in time.
+        """
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.flights += 1
+                else:
+                    self.coalesced += 1
+            if leader:
+                break
+            if expires_at is not None:
+                timeout = max(expires_at - time.monotonic(), 0)
+            if not flight.event.wait(timeout):
+                raise TimeoutError('timed out waiting for {}'.format(key))
+            if flight.error is None:
+                return flight.result
+            if not flight.timed_out():
+                raise flight.error
+        try:
+            flight.result = func(*args)
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+        return flight.result
+
+
+class AsyncSingleFlight(SingleFlight):
+    """Share a single call between the tasks asking for the same key.
+
+    The call runs in its own task, so that cancelling the task which started
+    it doesn't cancel it for the others.  It is only cancelled when all the
+    tasks waiting for it are.  The task runs without the deadline of the task
+    which started it, each task only waits for it until its own deadline.
+    """
+
+    async def do(self, key, func, *args, timeout=None):
+        """Await ``func(*args)``, or the call in progress for `key`.
+
+        :param key: The key identifying identical calls.
+        :param func: The coroutine function to call.
+        :param timeout: How long to wait for the call, in seconds.  ``None``
+            waits until it is finished.
+        :returns: The result of the call.
+        :raises asyncio.TimeoutError: when the call did not finish in time.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            with without_deadline():
+                flight.task = asyncio.ensure_future(func(*args))
+            flight.task.add_done_callback(
+                lambda task: self._done(key, flight))
+            self.flights += 1
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task),
+                                          timeout)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                # Its task only finishes later, it must not be joined.
+                self._forget(key, flight)
+
+    def _forget(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def _done(self, key, flight):
+        self._forget(key, flight)
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved, the waiters got it already.
+            flight.task.exception()
@@ -0,0 +1,109 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Log of the slow REST calls."""
+
+import logging
+import threading
+from collections import deque, namedtuple
+
+from mailmanclient.restbase.callsite import get_call_site
+from mailmanclient.restbase.metrics import route_template
+from mailmanclient.restbase.middleware import Middleware
+
+__metaclass__ = type
+__all__ = [
+    'SlowCall',
+    'SlowCallLog',
+]
+
+
+logger = logging.getLogger(__name__)
+
+
+#: A call which took longer than the threshold of a :class:`SlowCallLog`.
+SlowCall = namedtuple('SlowCall', [
+    'method', 'route', 'resource', 'status_code', 'elapsed', 'queue_time',
+    'network_time', 'request_bytes', 'response_bytes', 'cached', 'error',
+    'call_site'])
+
+
+class SlowCallLog(Middleware):
+    """Log the REST calls which take longer than a threshold.
+
+    Each slow call is logged as a warning, with the fields of a
+    :class:`SlowCall` as extra attributes of the log record, and is kept in
+    a bounded buffer.  Besides the method, the route and the sizes, it tells
+    how long the call waited for the limiter or the scheduler and how long
+    the requests took, and which line of the code using the client made it.
+
+    :param threshold: The duration over which a call is slow, in seconds.
+    :type threshold: float
+    :param maxlen: The number of slow calls kept in :attr:`calls`.
+    :type maxlen: int
+    :param logger: The logger to write to.  Defaults to the
+        ``mailmanclient.restbase.slowlog`` logger, ``None`` doesn't log.
+    :type logger: logging.Logger
+    """
+
+    def __init__(self, threshold=1.0, maxlen=100, logger=logger):
+        self.threshold = threshold
+        self.logger = logger
+        #: The most recent slow calls, oldest first.
+        self.calls = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<SlowCallLog {0}s, {1} calls>'.format(
+            self.threshold, len(self.calls))
+
+    def on_response(self, context):
+        self.observe(context)
+
+    def on_error(self, context):
+        self.observe(context)
+
+    def observe(self, context):
+        """Record a finished call if it was slow.
+
+        :param context: The :class:`CallContext` of the call.
+        """
+        if context.elapsed is None or context.elapsed < self.threshold:
+            return
+        call = SlowCall(
+            context.method, route_template(context.resource),
+            context.resource, context.status_code, context.elapsed,
+            context.queue_time, context.network_time, context.request_size,
+            context.body_size, context.cached,
+            None if context.error is None else repr(context.error),
+            get_call_site())
+        with self._lock:
+            self.calls.append(call)
+        if self.logger is not None:
+            self.logger.warning(
+                'Slow REST call: %s %s (%s) took %.3fs, %.3fs waiting and '
+                '%.3fs sending, from %s', call.method, call.resource,
+                call.status_code, call.elapsed, call.queue_time,
+                call.network_time, call.call_site, extra=call._asdict())
+
+    def get_calls(self):
+        """Return a copy of the recorded slow calls, oldest first."""
+        with self._lock:
+            return list(self.calls)
+
+    def clear(self):
+        with self._lock:
+            self.calls.clear()
@@ -0,0 +1,191 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Incremental parsing of the collections returned by Core."""
+
+import codecs
+import json
+
+__metaclass__ = type
+__all__ = [
+    'aiter_entries',
+    'iter_entries',
+]
+
+
+WHITESPACE = ' \t\n\r'
+# Drop the parsed part of the buffer once it is that long.
+COMPACT_SIZE = 64 * 1024
+
+
+# Yielded by the parser when it needs the next chunk of the body.
+_MORE = object()
+
+
+class _Reader:
+    """A text buffer filled with the byte chunks sent to the parser.
+
+    The methods reading the buffer are generators, which yield
+    :data:`_MORE` and receive the next chunk, or None at the end of the body,
+    when the buffer runs out.
+    """
+
+    def __init__(self, encoding):
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._decode = json.JSONDecoder().raw_decode
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read one more chunk.
+
+        :raises ValueError: when the document is truncated.
+        """
+        if self.eof:
+            raise ValueError('Truncated JSON document')
+        if self.pos >= COMPACT_SIZE:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = yield _MORE
+        if chunk is None:
+            self.eof = True
+            self.buffer += self._decoder.decode(b'', final=True)
+        else:
+            self.buffer += self._decoder.decode(chunk)
+
+    def peek(self):
+        """Return the next character which isn't whitespace, or ''."""
+        while True:
+            while (self.pos < len(self.buffer)
+                   and self.buffer[self.pos] in WHITESPACE):
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ''
+            yield from self.fill()
+
+    def expect(self, chars):
+        """Consume the next character, which must be one of `chars`."""
+        char = yield from self.peek()
+        if not char or char not in chars:
+            raise ValueError('Expected one of {!r} at offset {}, got {!r}'
+                             .format(chars, self.pos, char))
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next JSON value."""
+        yield from self.peek()
+        while True:
+            try:
+                value, end = self._decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number at the end of the buffer may be cut.
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            yield from self.fill()
+
+
+def _parse(encoding, meta):
+    """Yield the entries of a collection, and :data:`_MORE` when the next
+    chunk of the body must be sent."""
+    reader = _Reader(encoding)
+    yield from reader.expect('{')
+    if (yield from reader.peek()) == '}':
+        return
+    while True:
+        key = yield from reader.value()
+        if not isinstance(key, str):
+            raise ValueError('Expected a key at offset {}'.format(reader.pos))
+        yield from reader.expect(':')
+        if key == 'entries':
+            yield from reader.expect('[')
+            if (yield from reader.peek()) == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    yield (yield from reader.value())
+                    if (yield from reader.expect(',]')) == ']':
+                        break
+        else:
+            value = yield from reader.value()
+            if meta is not None:
+                meta[key] = value
+        if (yield from reader.expect(',}')) == '}':
+            break
+
+
+def iter_entries(chunks, encoding='utf-8', meta=None):
+    """Yield the entries of a collection, parsing it as it is received.
+
+    Only one entry is decoded at a time, so the memory used doesn't depend on
+    the size of the collection.  The entries are decoded with the standard
+    library, whatever the configured JSON decoder.
+
+    :param chunks: The body of the response, as an iterable of bytes.
+    :param encoding: The encoding of the body.
+    :param meta: If given, a dictionary which is updated with the other keys
+        of the collection, such as ``total_size``, as they are parsed.
+    :raises ValueError: when the body isn't a valid JSON object.
+    """
+    chunks = iter(chunks)
+    parser = _parse(encoding, meta)
+    chunk = None
+    while True:
+        try:
+            entry = parser.send(chunk)
+        except StopIteration:
+            return
+        if entry is _MORE:
+            chunk = next(chunks, None)
+        else:
+            chunk = None
+            yield entry
+
+
+async def aiter_entries(chunks, encoding='utf-8', meta=None):
+    """Yield the entries of a collection received by an async iterable.
+
+    See :func:`iter_entries`.
+
+    :param chunks: The body of the response, as an async iterable of bytes.
+    :param encoding: The encoding of the body.
+    :param meta: If given, a dictionary which is updated with the other keys
+        of the collection.
+    :raises ValueError: when the body isn't a valid JSON object.
+    """
+    chunks = chunks.__aiter__()
+    parser = _parse(encoding, meta)
+    chunk = None
+    while True:
+        try:
+            entry = parser.send(chunk)
+        except StopIteration:
+            return
+        if entry is _MORE:
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                chunk = None
+        else:
+            chunk = None
+            yield entry
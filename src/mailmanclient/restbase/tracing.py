@@ -0,0 +1,372 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tracing of the client operations and of the REST calls they make."""
+
+import functools
+import inspect
+import json
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from mailmanclient.restbase.metrics import route_template
+from mailmanclient.restbase.middleware import Middleware
+
+__metaclass__ = type
+__all__ = [
+    'InMemoryExporter',
+    'JSONLinesExporter',
+    'OpenTelemetryExporter',
+    'Span',
+    'SpanExporter',
+    'Tracer',
+    'current_span',
+    'no_trace',
+    'trace_methods',
+]
+
+
+_current_span = ContextVar('mailmanclient_span', default=None)
+
+
+def current_span():
+    """Return the span in progress in the current context, or None."""
+    return _current_span.get()
+
+
+class Span:
+    """An operation of the client, or a REST call.
+
+    :param name: The name of the operation, e.g. ``User.subscriptions`` or
+        ``GET lists/{list}``.
+    :param parent: The span in which this one was opened, if any.
+    :param attributes: The attributes of the operation.
+    """
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.parent = parent
+        if parent is None:
+            self.trace_id = secrets.token_hex(16)
+            self.parent_id = None
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+        self.span_id = secrets.token_hex(8)
+        self.attributes = dict(attributes or {})
+        #: When the span started, from :func:`time.time`.
+        self.start_time = time.time()
+        #: How long the span lasted, in seconds, once it is finished.
+        self.duration = None
+        #: The exception raised in the span, if any.
+        self.error = None
+        self._start = time.monotonic()
+
+    def __repr__(self):
+        return '<Span {0} {1}>'.format(self.name, self.span_id)
+
+    @property
+    def request_id(self):
+        """The ID of the span sent to Core."""
+        return '{}-{}'.format(self.trace_id, self.span_id)
+
+    def set_attribute(self, name, value):
+        self.attributes[name] = value
+
+    def finish(self, error=None):
+        self.duration = time.monotonic() - self._start
+        self.error = error
+
+    def to_dict(self):
+        """Return the span as a dictionary which can be dumped to JSON."""
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_time': self.start_time,
+            'duration': self.duration,
+            'attributes': self.attributes,
+            'error': None if self.error is None else repr(self.error),
+        }
+
+
+class SpanExporter:
+    """Base class of the destinations of the spans."""
+
+    def on_start(self, span):
+        """Called when a span is opened."""
+
+    def export(self, span):
+        """Called when a span is finished."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemoryExporter(SpanExporter):
+    """Keep the finished spans in a list, e.g. for the tests.
+
+    :param max_spans: The number of spans kept, the oldest ones are
+        dropped.  ``None`` keeps all of them.
+    :type max_spans: int
+    """
+
+    def __init__(self, max_spans=None):
+        self.max_spans = max_spans
+        #: The finished spans, children before their parents.
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<InMemoryExporter {0} spans>'.format(len(self.spans))
+
+    def export(self, span):
+        with self._lock:
+            self.spans.append(span)
+            if self.max_spans is not None:
+                del self.spans[:-self.max_spans]
+
+    def children(self, span):
+        """Return the finished spans opened in `span`."""
+        return [child for child in self.spans
+                if child.parent_id == span.span_id]
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+
+class JSONLinesExporter(SpanExporter):
+    """Write each finished span as a line of JSON.
+
+    :param output: The file object or the path of the file to write to.  A
+        path is opened in append mode.
+    """
+
+    def __init__(self, output):
+        self._owns_output = isinstance(output, str)
+        if self._owns_output:
+            output = open(output, 'a', encoding='utf-8')
+        self.output = output
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<JSONLinesExporter {0!r}>'.format(self.output)
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def close(self):
+        if self._owns_output:
+            self.output.close()
+
+
+class OpenTelemetryExporter(SpanExporter):
+    """Report the spans to OpenTelemetry.
+
+    It requires the ``opentelemetry-api`` package.  The spans are children
+    of the OpenTelemetry span in progress when a trace starts.
+
+    :param tracer: The OpenTelemetry tracer.  Defaults to the one of the
+        global tracer provider.
+    :raises ImportError: when OpenTelemetry isn't installed.
+    """
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+        self._trace = trace
+        if tracer is None:
+            tracer = trace.get_tracer('mailmanclient')
+        self.tracer = tracer
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span):
+        context = None
+        if span.parent is not None:
+            with self._lock:
+                parent = self._spans.get(span.parent.span_id)
+            if parent is not None:
+                context = self._trace.set_span_in_context(parent)
+        native = self.tracer.start_span(
+            span.name, context=context,
+            start_time=int(span.start_time * 1e9))
+        with self._lock:
+            self._spans[span.span_id] = native
+
+    def export(self, span):
+        with self._lock:
+            native = self._spans.pop(span.span_id, None)
+        if native is None:
+            return
+        native.set_attributes({
+            name: value for name, value in span.attributes.items()
+            if value is not None})
+        if span.error is not None:
+            native.record_exception(span.error)
+            native.set_status(self._trace.Status(
+                self._trace.StatusCode.ERROR, str(span.error)))
+        native.end(end_time=int((span.start_time + span.duration) * 1e9))
+
+
+class Tracer(Middleware):
+    """Open a span for each operation of the client and each REST call.
+
+    The operations of :class:`mailmanclient.Client`, and of the mailing
+    lists, domains and users it returns, open the root spans.  The REST calls
+    they make are their children, and are sent with a request ID header so
+    that they can be found in Core's logs.  Give the tracer to the client::
+
+        exporter = InMemoryExporter()
+        client = Client(..., tracer=Tracer(exporter))
+
+    :param exporter: Where the finished spans go.  Defaults to a new
+        :class:`InMemoryExporter`.
+    :type exporter: SpanExporter
+    :param request_id_header: The name of the header carrying the ID of the
+        span of a REST call, or None not to send it.
+    :type request_id_header: str
+    """
+
+    def __init__(self, exporter=None, request_id_header='X-Request-ID'):
+        if exporter is None:
+            exporter = InMemoryExporter()
+        self.exporter = exporter
+        self.request_id_header = request_id_header
+
+    def __repr__(self):
+        return '<Tracer {0!r}>'.format(self.exporter)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Open a span, child of the span in progress if any.
+
+        :param name: The name of the span.
+        :returns: A context manager giving the :class:`Span`.
+        """
+        span = Span(name, _current_span.get(), attributes)
+        self.exporter.on_start(span)
+        token = _current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as exception:
+            error = exception
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish(error)
+            self.exporter.export(span)
+
+    def _start_call(self, context, span):
+        span.set_attribute('http.method', context.method)
+        span.set_attribute('http.url', context.url)
+        if self.request_id_header is not None:
+            context.params['headers'] = dict(context.params['headers'])
+            context.params['headers'][self.request_id_header] = (
+                span.request_id)
+
+    def _end_call(self, context, span):
+        span.set_attribute('http.status_code', context.status_code)
+        span.set_attribute('http.response_size', context.body_size)
+        span.set_attribute('retries', context.retries)
+        span.set_attribute('cached', context.cached)
+        span.set_attribute('coalesced', context.coalesced)
+
+    def _get_name(self, context):
+        return '{} {}'.format(context.method, route_template(context.resource))
+
+    def wrap(self, context, call_next):
+        with self.span(self._get_name(context)) as span:
+            self._start_call(context, span)
+            try:
+                return call_next(context)
+            finally:
+                self._end_call(context, span)
+
+    async def awrap(self, context, call_next):
+        with self.span(self._get_name(context)) as span:
+            self._start_call(context, span)
+            try:
+                return await call_next(context)
+            finally:
+                self._end_call(context, span)
+
+
+def _get_tracer(obj):
+    connection = getattr(obj, '_connection', None)
+    if connection is None:
+        connection = getattr(obj, 'connection', None)
+    return getattr(connection, 'tracer', None)
+
+
+def _traced(func, name):
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kw):
+            tracer = _get_tracer(self)
+            if tracer is None:
+                return await func(self, *args, **kw)
+            with tracer.span(name):
+                return await func(self, *args, **kw)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kw):
+        tracer = _get_tracer(self)
+        if tracer is None:
+            return func(self, *args, **kw)
+        with tracer.span(name):
+            return func(self, *args, **kw)
+    return wrapper
+
+
+def no_trace(func):
+    """Leave a method out of :func:`trace_methods`, e.g. because it makes no
+    call to Core."""
+    func._no_trace = True
+    return func
+
+
+def trace_methods(cls):
+    """Class decorator opening a span in the public methods and properties
+    of a class, when its connection has a tracer.
+
+    The generators are left alone, since the span would end before the
+    iteration starts, and so are the methods marked with :func:`no_trace`.
+    """
+    for name, value in list(vars(cls).items()):
+        if (name.startswith('_') or inspect.isgeneratorfunction(value)
+                or inspect.isasyncgenfunction(value)
+                or getattr(value, '_no_trace', False)):
+            continue
+        span_name = '{}.{}'.format(cls.__name__, name)
+        if inspect.isfunction(value):
+            setattr(cls, name, _traced(value, span_name))
+        elif isinstance(value, property):
+            setattr(cls, name, property(
+                value.fget and _traced(value.fget, span_name),
+                value.fset and _traced(value.fset, span_name),
+                value.fdel, value.__doc__))
+    return cls
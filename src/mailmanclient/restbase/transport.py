@@ -0,0 +1,230 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Transports sending the requests to Core."""
+
+import asyncio
+import base64
+import functools
+import io
+import sys
+from http import HTTPStatus
+from urllib.parse import unquote_to_bytes, urlsplit
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+__metaclass__ = type
+__all__ = [
+    'ASGITransport',
+    'Transport',
+    'WSGITransport',
+]
+
+
+class Transport:
+    """Base class of the transports.
+
+    A transport sends a request to Core and returns a
+    :class:`requests.Response`.  It can be given to both
+    :class:`mailmanclient.Client` and
+    :class:`mailmanclient.asynclient.AsyncClient` with the ``transport``
+    parameter.
+
+    The keyword arguments of the requests are ``method``, ``url``, ``data``,
+    ``headers``, ``auth`` (a ``(name, password)`` tuple or None),
+    ``timeout`` and ``stream``, as for :meth:`requests.Session.request`.
+    """
+
+    def request(self, **params):
+        """Send a request and return the response."""
+        raise NotImplementedError
+
+    async def arequest(self, **params):
+        """Send a request from a coroutine and return the response.
+
+        By default, :meth:`request` runs in the default executor of the
+        event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self.request, **params))
+
+    def close(self):
+        """Release the resources of the transport."""
+
+
+def _encode_body(data):
+    if data is None:
+        return b''
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    return data
+
+
+def _get_headers(headers, auth, body):
+    headers = dict(headers or {})
+    if auth is not None:
+        credentials = '{}:{}'.format(*auth).encode('utf-8')
+        headers['Authorization'] = 'Basic {}'.format(
+            base64.b64encode(credentials).decode('ascii'))
+    if body:
+        headers['Content-Length'] = str(len(body))
+    return headers
+
+
+def _build_response(url, status_code, headers, body):
+    response = Response()
+    response.url = url
+    response.status_code = status_code
+    try:
+        response.reason = HTTPStatus(status_code).phrase
+    except ValueError:
+        response.reason = ''
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = 'utf-8'
+    response._content = body
+    response._content_consumed = True
+    response.raw = io.BytesIO(body)
+    return response
+
+
+class WSGITransport(Transport):
+    """Call a WSGI application in the same process, without any socket.
+
+    This is mostly useful for scripts and tests running next to Core, with
+    its REST application::
+
+        from mailman.core.initialize import initialize
+        from mailman.rest.wsgiapp import make_application
+
+        initialize('/etc/mailman.cfg')
+        client = Client('http://localhost/3.1', 'restadmin', 'restpass',
+                        transport=WSGITransport(make_application()))
+
+    Timeouts are ignored, the call runs in the calling thread.
+
+    :param app: The WSGI application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __repr__(self):
+        return '<WSGITransport {!r}>'.format(self.app)
+
+    def request(self, method, url, data=None, headers=None, auth=None,
+                timeout=None, stream=False):
+        parts = urlsplit(url)
+        body = _encode_body(data)
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote_to_bytes(parts.path).decode('latin-1'),
+            'QUERY_STRING': parts.query,
+            'SERVER_NAME': parts.hostname or 'localhost',
+            'SERVER_PORT': str(parts.port or 80),
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': parts.scheme or 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            }
+        for name, value in _get_headers(headers, auth, body).items():
+            key = name.upper().replace('-', '_')
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = 'HTTP_' + key
+            environ[key] = value
+        status = []
+
+        def start_response(status_line, response_headers, exc_info=None):
+            status[:] = [status_line, response_headers]
+
+        result = self.app(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        status_line, response_headers = status
+        return _build_response(
+            url, int(status_line.split(None, 1)[0]), response_headers,
+            content)
+
+
+class ASGITransport(Transport):
+    """Call an ASGI application in the same process, without any socket.
+
+    The synchronous :meth:`request` runs the application in a new event
+    loop, it cannot be used from a coroutine.  Timeouts are ignored.
+
+    :param app: The ASGI application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __repr__(self):
+        return '<ASGITransport {!r}>'.format(self.app)
+
+    def request(self, **params):
+        return asyncio.run(self.arequest(**params))
+
+    async def arequest(self, method, url, data=None, headers=None,
+                       auth=None, timeout=None, stream=False):
+        parts = urlsplit(url)
+        body = _encode_body(data)
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': parts.scheme or 'http',
+            'path': unquote_to_bytes(parts.path).decode('utf-8'),
+            'raw_path': parts.path.encode('ascii'),
+            'query_string': parts.query.encode('ascii'),
+            'root_path': '',
+            'headers': [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in _get_headers(headers, auth, body).items()],
+            'server': (parts.hostname or 'localhost', parts.port or 80),
+            'client': ('127.0.0.1', 0),
+            }
+        messages = [{'type': 'http.request', 'body': body,
+                     'more_body': False}]
+        response = {'status': None, 'headers': [], 'body': []}
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = [
+                    (name.decode('latin-1'), value.decode('latin-1'))
+                    for name, value in message.get('headers', [])]
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        return _build_response(url, response['status'], response['headers'],
+                               b''.join(response['body']))
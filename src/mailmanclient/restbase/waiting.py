@@ -0,0 +1,143 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Queues of waiters, usable from both threads and coroutines."""
+
+import asyncio
+import threading
+from collections import deque
+
+__metaclass__ = type
+__all__ = [
+    'Slots',
+    'Waiter',
+    'await_in_queue',
+    'wait_in_queue',
+]
+
+
+class Waiter:
+    """A thread or a coroutine waiting in a queue."""
+
+    __slots__ = ('granted', 'wake')
+
+    def __init__(self, wake):
+        self.granted = False
+        self.wake = wake
+
+
+def wait_in_queue(enqueue, give_up, timeout=None):
+    """Wait in a queue from a thread.
+
+    :param enqueue: A function taking a :class:`Waiter`, and returning
+        whether it was served at once.  Otherwise, the waiter is woken up
+        once it is served.
+    :param give_up: A function called with the waiter when the `timeout`
+        runs out, which must leave the queue, or give back what was granted
+        in the meantime.
+    :returns: Whether the waiter was served.
+    """
+    event = threading.Event()
+    waiter = Waiter(event.set)
+    if enqueue(waiter) or event.wait(timeout):
+        return True
+    give_up(waiter)
+    return False
+
+
+async def await_in_queue(enqueue, give_up, timeout=None):
+    """Wait in a queue from a coroutine, see :func:`wait_in_queue`."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def wake():
+        loop.call_soon_threadsafe(
+            lambda: future.done() or future.set_result(None))
+    waiter = Waiter(wake)
+    if enqueue(waiter):
+        return True
+    try:
+        await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        give_up(waiter)
+        return False
+    except asyncio.CancelledError:
+        give_up(waiter)
+        raise
+    return True
+
+
+class Slots:
+    """A semaphore usable from both threads and coroutines, first come first
+    served."""
+
+    def __init__(self, size):
+        self.size = size
+        self.in_use = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _enqueue(self, waiter):
+        with self._lock:
+            if self.in_use < self.size and not self._waiters:
+                self.in_use += 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _give_up(self, waiter):
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                return
+        self.release()
+
+    def acquire(self, timeout=None):
+        """Take a slot, waiting at most `timeout` seconds.
+
+        :returns: Whether a slot was taken.
+        """
+        return wait_in_queue(self._enqueue, self._give_up, timeout)
+
+    async def aacquire(self, timeout=None):
+        """Take a slot from a coroutine, waiting at most `timeout` seconds.
+
+        :returns: Whether a slot was taken.
+        """
+        return await await_in_queue(self._enqueue, self._give_up, timeout)
+
+    def release(self):
+        """Give back a slot, to the first waiter if any."""
+        with self._lock:
+            if not self._waiters or self.in_use > self.size:
+                self.in_use -= 1
+                return
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        waiter.wake()
+
+    def resize(self, size):
+        """Change the number of slots, waking up waiters if it grew."""
+        woken = []
+        with self._lock:
+            self.size = size
+            while self._waiters and self.in_use < self.size:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                self.in_use += 1
+                woken.append(waiter)
+        for waiter in woken:
+            waiter.wake()
@@ -19,7 +19,8 @@ from mailmanclient.restobjects.mailinglist import MailingList
 from mailmanclient.restobjects.templates import TemplateList
 from mailmanclient.restobjects.user import User
 from mailmanclient.restbase.base import RESTObject
-from mailmanclient.restbase.page import Page
+from mailmanclient.restbase.page import Page, iter_entries
+from mailmanclient.restbase.tracing import trace_methods
 
 __metaclass__ = type
 __all__ = [
@@ -27,6 +28,7 @@ __all__ = [
 ]
 
 
+@trace_methods
 class Domain(RESTObject):
 
     _properties = ('alias_domain', 'description', 'mail_host', 'self_link')
@@ -83,6 +85,34 @@ class Domain(RESTObject):
             url += '?advertised=true'
         return Page(self._connection, url, MailingList, count, page)
 
+    def iter_lists(self, count=50, advertised=None, prefetch=1):
+        """Iterate over the lists of the domain, page by page.
+
+        :param int count: Number of entries per-page (defaults to 50).
+        :param advertised: Whether to return only the advertised lists.
+        :param int prefetch: Number of pages fetched ahead (defaults to 1).
+        :returns: An iterator of :class:`MailingList`.
+        """
+        url = 'domains/{0}/lists'.format(self.mail_host)
+        if advertised:
+            url += '?advertised=true'
+        yield from iter_entries(self._connection, url, MailingList, count,
+                                prefetch)
+
+    def count_lists(self, advertised=None, max_age=None):
+        """Return the number of lists of the domain, without fetching them.
+
+        :param advertised: Whether to count only the advertised lists.
+        :param float max_age: If given, a count made less than this number
+            of seconds ago may be returned, see
+            :meth:`~mailmanclient.restbase.connection.Connection.count`.
+        :rtype: int
+        """
+        url = 'domains/{0}/lists'.format(self.mail_host)
+        if advertised:
+            url += '?advertised=true'
+        return self._connection.count(url, max_age)
+
     def create_list(self, list_name, style_name=None):
         fqdn_listname = '{0}@{1}'.format(list_name, self.mail_host)
         data = dict(fqdn_listname=fqdn_listname)
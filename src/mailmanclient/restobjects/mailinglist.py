@@ -25,7 +25,8 @@ from mailmanclient.restobjects.settings import Settings
 from mailmanclient.restobjects.held_message import HeldMessage
 from mailmanclient.restobjects.templates import TemplateList
 from mailmanclient.restbase.base import RESTObject
-from mailmanclient.restbase.page import Page
+from mailmanclient.restbase.page import Page, Paginator, iter_entries
+from mailmanclient.restbase.tracing import no_trace, trace_methods
 
 __metaclass__ = type
 __all__ = [
@@ -33,6 +34,7 @@ __all__ = [
 ]
 
 
+@trace_methods
 class MailingList(RESTObject):
 
     _properties = ('advertised', 'display_name', 'fqdn_listname', 'list_id',
@@ -64,6 +66,34 @@ class MailingList(RESTObject):
            when they aren't required since they need to be fetched from
            database individually.
         """
+        url = self._get_roster_url(roster, fields)
+        response, content = self._connection.call(url)
+        if 'entries' not in content:
+            return []
+        else:
+            return [Member(self._connection, entry['self_link'], entry)
+                    for entry in sorted(content['entries'],
+                                        key=itemgetter('address'))]
+
+    def stream_roster(self, roster, fields=None):
+        """Iterate over a roster of the MailingList while it is received.
+
+        Unlike :meth:`get_roster`, the members are built one at a time as the
+        response is parsed, so that huge rosters can be processed with
+        bounded memory.  They are returned in the order of Core, not sorted
+        by address.
+
+        :param str roster: One of the Membership rosters from
+           'owner', 'moderator', 'member' and 'nonmember'.
+        :param List[str] fields: List of Member's fields to fetch from the
+           API, see :meth:`get_roster`.
+        :returns: An iterator of :class:`Member`.
+        """
+        url = self._get_roster_url(roster, fields)
+        for entry in self._connection.stream(url):
+            yield Member(self._connection, entry['self_link'], entry)
+
+    def _get_roster_url(self, roster, fields):
         url = self._url + '/roster/{}'.format(roster)
         if fields is not None:
             # We cannot instantiate Member object without address and
@@ -74,13 +104,38 @@ class MailingList(RESTObject):
             if 'self_link' not in fields:
                 fields.append('self_link')
             url += '?' + '&'.join('fields={}'.format(each) for each in fields)
-        response, content = self._connection.call(url)
-        if 'entries' not in content:
-            return []
-        else:
-            return [Member(self._connection, entry['self_link'], entry)
-                    for entry in sorted(content['entries'],
-                                        key=itemgetter('address'))]
+        return url
+
+    def iter_roster(self, roster, fields=None, count=50, prefetch=1):
+        """Iterate over a roster of the MailingList, page by page.
+
+        The next pages are fetched in the background while a page is
+        processed, see :func:`~mailmanclient.restbase.page.iter_pages`.
+
+        :param str roster: One of the Membership rosters from
+           'owner', 'moderator', 'member' and 'nonmember'.
+        :param List[str] fields: List of Member's fields to fetch from the
+           API, see :meth:`get_roster`.
+        :param int count: Count of members in one page.
+        :param int prefetch: Number of pages fetched ahead.
+        :returns: An iterator of :class:`Member`.
+        """
+        url = self._get_roster_url(roster, fields)
+        yield from iter_entries(self._connection, url, Member, count,
+                                prefetch)
+
+    def count_roster(self, roster, max_age=None):
+        """Return the number of members of a roster, without fetching them.
+
+        :param str roster: One of the Membership rosters from
+           'owner', 'moderator', 'member' and 'nonmember'.
+        :param float max_age: If given, a count made less than this number
+            of seconds ago may be returned, see
+            :meth:`~mailmanclient.restbase.connection.Connection.count`.
+        :rtype: int
+        """
+        return self._connection.count(
+            self._get_roster_url(roster, None), max_age)
 
     @property
     def moderators(self):
@@ -106,6 +161,37 @@ class MailingList(RESTObject):
         url = 'lists/{0}/roster/member'.format(self.fqdn_listname)
         return Page(self._connection, url, Member, count, page)
 
+    @no_trace
+    def get_member_paginator(self, count=50, max_pages=10, prefetch=True):
+        """Get a paginator caching the pages of MailingList's members.
+
+        :param int count: Count of members in one page.
+        :param int max_pages: Number of pages kept (defaults to 10).
+        :param bool prefetch: Whether to fetch the pages around the last one
+            in the background (defaults to True).
+        :rtype: :class:`Paginator` of :class:`Member`
+        """
+        url = 'lists/{0}/roster/member'.format(self.fqdn_listname)
+        return Paginator(self._connection, url, Member, count, max_pages,
+                         prefetch)
+
+    def iter_members(self, count=50, prefetch=1):
+        """Iterate over the MailingList's members, page by page.
+
+        :param int count: Count of members in one page.
+        :param int prefetch: Number of pages fetched ahead.
+        :returns: An iterator of :class:`Member`.
+        """
+        yield from self.iter_roster('member', count=count, prefetch=prefetch)
+
+    def count_members(self, max_age=None):
+        """Return the number of members of the MailingList.
+
+        :param float max_age: See :meth:`count_roster`.
+        :rtype: int
+        """
+        return self.count_roster('member', max_age)
+
     def find_members(
             self, address=None, role=None, page=None, count=50):
         """Find a Mailinglist's members.
@@ -163,6 +249,34 @@ class MailingList(RESTObject):
         url = 'lists/{0}/held'.format(self.fqdn_listname)
         return Page(self._connection, url, HeldMessage, count, page)
 
+    @no_trace
+    def get_held_paginator(self, count=50, max_pages=10, prefetch=True):
+        """Get a paginator caching the pages of held messages.
+
+        Moderating a message through the same client drops the cached
+        pages.
+
+        :param int count: Number of results per-page for paginated results.
+        :param int max_pages: Number of pages kept (defaults to 10).
+        :param bool prefetch: Whether to fetch the pages around the last one
+            in the background (defaults to True).
+        :rtype: :class:`Paginator` of :class:`HeldMessage`
+        """
+        url = 'lists/{0}/held'.format(self.fqdn_listname)
+        return Paginator(self._connection, url, HeldMessage, count,
+                         max_pages, prefetch)
+
+    def iter_held(self, count=50, prefetch=1):
+        """Iterate over the held messages of the MailingList, page by page.
+
+        :param int count: Number of results per-page.
+        :param int prefetch: Number of pages fetched ahead.
+        :returns: An iterator of :class:`HeldMessage`.
+        """
+        url = 'lists/{0}/held'.format(self.fqdn_listname)
+        yield from iter_entries(self._connection, url, HeldMessage, count,
+                                prefetch)
+
     def get_held_count(self):
         """Get a count of held messages for the MailingList."""
         response, json = self._connection.call(
@@ -557,6 +671,28 @@ class MailingList(RESTObject):
         url = 'lists/{0}/bans'.format(self.list_id)
         return Page(self._connection, url, BannedAddress, count, page)
 
+    def iter_bans(self, count=50, prefetch=1):
+        """Iterate over the bans of this MailingList, page by page.
+
+        :param int count: Number of results per-page.
+        :param int prefetch: Number of pages fetched ahead.
+        :returns: An iterator of :class:`BannedAddress`.
+        """
+        from mailmanclient.restobjects.ban import BannedAddress
+        url = 'lists/{0}/bans'.format(self.list_id)
+        yield from iter_entries(self._connection, url, BannedAddress, count,
+                                prefetch)
+
+    def count_bans(self, max_age=None):
+        """Return the number of bans of this MailingList, without fetching
+        them.
+
+        :param float max_age: See :meth:`count_roster`.
+        :rtype: int
+        """
+        url = 'lists/{0}/bans'.format(self.list_id)
+        return self._connection.count(url, max_age)
+
     @property
     def header_matches(self):
         """A list of header-match rules for the MailingList."""
@@ -38,15 +38,27 @@ class Member(RESTObject, PreferencesMixin):
     def __str__(self):
         return 'Member "{0}" on "{1}"'.format(self.email, self.list_id)
 
+    def __init__(self, connection, url, data=None):
+        super(Member, self).__init__(connection, url, data)
+        self._address = None
+        self._user = None
+
     @property
     def address(self):
         from mailmanclient.restobjects.address import Address
-        return Address(self._connection, self.rest_data['address'])
+        url = self.rest_data['address']
+        # Keep the object, and the data it fetched, between two accesses.
+        if self._address is None or self._address._url != url:
+            self._address = Address(self._connection, url)
+        return self._address
 
     @property
     def user(self):
         from mailmanclient.restobjects.user import User
-        return User(self._connection, self.rest_data['user'])
+        url = self.rest_data['user']
+        if self._user is None or self._user._url != url:
+            self._user = User(self._connection, url)
+        return self._user
 
     def unsubscribe(self):
         """Unsubscribe the member from a mailing list."""
@@ -19,6 +19,7 @@ from urllib.error import HTTPError
 from mailmanclient.restobjects.preferences import PreferencesMixin
 from mailmanclient.restobjects.address import Addresses, Address
 from mailmanclient.restbase.base import RESTObject
+from mailmanclient.restbase.tracing import trace_methods
 
 __metaclass__ = type
 __all__ = [
@@ -26,6 +27,7 @@ __all__ = [
 ]
 
 
+@trace_methods
 class User(RESTObject, PreferencesMixin):
 
     _properties = ('created_on', 'display_name', 'is_server_owner',
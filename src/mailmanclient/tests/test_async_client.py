@@ -1,10 +1,11 @@
+import asyncio
 import httpx
 import pytest
 import pytest_asyncio
 import concurrent.futures
 
 from mailmanclient.asynclient import AsyncClient
-from mailmanclient import Client
+from mailmanclient import Client, DeadlineExceeded
 
 
 if pytest_asyncio.__version__ < '0.17':
@@ -71,6 +72,18 @@ async def test_get_lists(client):
         await ml.config()
 
 
+@pytest.mark.asyncio
+async def test_count_lists(client):
+    assert await client.count_lists(mail_host='example.com') == 10
+    assert await client.count_lists(
+        advertised=True, mail_host='example.com') == 10
+    assert await client.count_lists() >= 10
+    domains = await client.domains()
+    domain = [each for each in domains if each.mail_host == 'example.com'][0]
+    assert await domain.count_lists() == 10
+    assert await domain.count_lists(advertised=True) == 10
+
+
 @pytest.mark.asyncio
 async def test_get_members(client):
     members = await client.members()
@@ -79,6 +92,15 @@ async def test_get_members(client):
               end='')
 
 
+@pytest.mark.asyncio
+async def test_iter_members(client):
+    members = await client.members()
+    emails = [member.email async for member in client.iter_members(count=20)]
+    assert sorted(emails) == sorted(member.email for member in members)
+    page = await client.get_member_page(count=20)
+    assert page.total_size == len(members)
+
+
 @pytest.mark.asyncio
 async def test_get_users(client):
     users = await client.users()
@@ -96,3 +118,19 @@ async def test_get_addresses(client):
     addresses = await client.addresses()
     for addr in addresses:
         print(f'Address: {addr.email}', end='')
+
+
+@pytest.mark.asyncio
+async def test_deadline(client):
+    with client.deadline(10):
+        await client.domains()
+    with pytest.raises(DeadlineExceeded):
+        with client.deadline(0):
+            await client.domains()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_are_coalesced(client):
+    results = await asyncio.gather(*(client.domains() for i in range(5)))
+    assert client.connection.single_flight.coalesced == 4
+    assert len({id(domains) for domains in results}) == 5
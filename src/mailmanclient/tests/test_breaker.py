@@ -0,0 +1,295 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the circuit breaker."""
+
+import unittest
+from unittest.mock import patch
+from urllib.parse import urlparse
+
+import httpx
+
+from mailmanclient import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded,
+    MailmanConnectionError, RetryPolicy)
+from mailmanclient.asynclient import AsyncClient
+from mailmanclient.restbase.breaker import CLOSED, HALF_OPEN, OPEN
+from mailmanclient.tests.utils import (
+    FakeTransport, make_async_client, make_client)
+
+__metaclass__ = type
+__all__ = [
+    'TestBreakerAsyncClient',
+    'TestBreakerClient',
+    'TestCircuitBreaker',
+    ]
+
+
+KEY = 'http://localhost:9001/3.1/'
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def status_transport(statuses, delay=0):
+    """Answer with the status given for the host, None failing to connect."""
+    def answer(method, url):
+        host = urlparse(url).hostname
+        if statuses[host] is None:
+            raise ConnectionError('{} is down'.format(host))
+        return statuses[host], b'{}'
+
+    return FakeTransport(handler=answer, delay=delay)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.changes = []
+        self.breaker = CircuitBreaker(
+            failure_rate=0.5, window=4, min_calls=4, reset_timeout=10,
+            half_open_calls=2, on_state_change=self._on_state_change)
+        self.clock = Clock()
+        patcher = patch('mailmanclient.restbase.breaker.time.monotonic',
+                        self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _on_state_change(self, key, old, new):
+        self.changes.append((key, old, new))
+
+    def _call(self, failed, latency=0.01):
+        probe = self.breaker.allow(KEY)
+        self.breaker.record(KEY, probe, latency, failed)
+        return probe
+
+    def _open(self):
+        for failed in (False, True, False, True):
+            self._call(failed)
+        self.assertEqual(self.breaker.state(KEY), OPEN)
+
+    def test_closed(self):
+        for failed in (True, False, False, False, True, False):
+            self.assertFalse(self._call(failed))
+        self.assertEqual(self.breaker.state(KEY), CLOSED)
+        self.assertEqual(self.changes, [])
+
+    def test_min_calls(self):
+        for i in range(3):
+            self._call(True)
+        self.assertEqual(self.breaker.state(KEY), CLOSED)
+        self._call(True)
+        self.assertEqual(self.breaker.state(KEY), OPEN)
+
+    def test_open_fails_fast(self):
+        self._open()
+        self.assertEqual(self.changes, [(KEY, CLOSED, OPEN)])
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow(KEY)
+        self.assertEqual(self.breaker.rejected, 1)
+        # The other endpoints are not affected.
+        self.assertFalse(self.breaker.allow('http://other/3.1/'))
+
+    def test_half_open_probes_close(self):
+        self._open()
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow(KEY))
+        self.assertTrue(self.breaker.allow(KEY))
+        # Only two probes at a time.
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow(KEY)
+        self.breaker.record(KEY, True, 0.01, False)
+        self.assertEqual(self.breaker.state(KEY), HALF_OPEN)
+        self.breaker.record(KEY, True, 0.01, False)
+        self.assertEqual(self.breaker.state(KEY), CLOSED)
+        self.assertEqual(self.changes, [
+            (KEY, CLOSED, OPEN), (KEY, OPEN, HALF_OPEN),
+            (KEY, HALF_OPEN, CLOSED)])
+
+    def test_failed_probe_opens_again(self):
+        self._open()
+        self.clock.now += 10
+        self.assertTrue(self._call(True))
+        self.assertEqual(self.breaker.state(KEY), OPEN)
+        self.clock.now += 5
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow(KEY)
+
+    def test_released_probe(self):
+        breaker = CircuitBreaker(min_calls=1, half_open_calls=1,
+                                 reset_timeout=0)
+        probe = breaker.allow(KEY)
+        breaker.record(KEY, probe, 0.01, True)
+        self.assertTrue(breaker.allow(KEY))
+        breaker.release(KEY, True)
+        self.assertTrue(breaker.allow(KEY))
+
+    def test_late_outcomes_are_ignored(self):
+        self._open()
+        self.breaker.record(KEY, False, 0.01, False)
+        self.assertEqual(self.breaker.state(KEY), OPEN)
+
+    def test_slow_calls(self):
+        breaker = CircuitBreaker(min_calls=2, window=2,
+                                 slow_call_duration=1, slow_call_rate=1)
+        breaker.record(KEY, False, 2, False)
+        breaker.record(KEY, False, 0.1, False)
+        self.assertEqual(breaker.state(KEY), CLOSED)
+        breaker.record(KEY, False, 3, False)
+        self.assertEqual(breaker.state(KEY), CLOSED)
+        breaker.record(KEY, False, 4, False)
+        self.assertEqual(breaker.state(KEY), OPEN)
+
+    def test_reset(self):
+        self._open()
+        self.breaker.reset()
+        self.assertEqual(self.breaker.state(KEY), CLOSED)
+        self.assertFalse(self.breaker.allow(KEY))
+
+
+class TestBreakerClient(unittest.TestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(min_calls=2, window=2, reset_timeout=60)
+
+    def test_fail_fast(self):
+        transport = status_transport({'one': None})
+        client = make_client(transport, 'http://one/3.1',
+                             circuit_breaker=self.breaker)
+        for i in range(2):
+            with self.assertRaises(MailmanConnectionError):
+                client._connection.call('system/versions')
+        self.assertTrue(self.breaker.is_open('http://one/3.1/'))
+        with self.assertRaises(CircuitOpenError):
+            client._connection.call('system/versions')
+        self.assertEqual(len(transport.hosts), 2)
+
+    def test_server_errors(self):
+        transport = status_transport({'one': 500})
+        client = make_client(transport, 'http://one/3.1',
+                             circuit_breaker=self.breaker)
+        for i in range(2):
+            with self.assertRaises(Exception):
+                client._connection.call('system/versions')
+        self.assertTrue(self.breaker.is_open('http://one/3.1/'))
+
+    def test_not_retried(self):
+        transport = status_transport({'one': None})
+        retry = RetryPolicy(backoff_factor=0, max_retries=5)
+        client = make_client(transport, 'http://one/3.1', retry=retry,
+                             circuit_breaker=self.breaker)
+        with self.assertRaises(CircuitOpenError):
+            client._connection.call('system/versions')
+        self.assertEqual(len(transport.hosts), 2)
+
+    def test_open_endpoint_is_avoided(self):
+        transport = status_transport({'one': None, 'two': 200})
+        client = make_client(transport, ['http://one/3.1', 'http://two/3.1'],
+                             circuit_breaker=self.breaker)
+        endpoints = client._connection.endpoints
+        endpoints.max_failures = 100
+        for i in range(2):
+            with self.assertRaises(MailmanConnectionError):
+                client._connection.call('lists', {'fqdn_listname': 'a@b.c'})
+        self.assertTrue(self.breaker.is_open('http://one/3.1/'))
+        # The writes now go to the other endpoint.
+        client._connection.call('lists', {'fqdn_listname': 'a@b.c'})
+        self.assertEqual(transport.hosts, ['one', 'one', 'two'])
+        for endpoint in endpoints:
+            self.assertEqual(endpoint.outstanding, 0)
+        client.close()
+
+    def test_deadline_is_not_a_failure(self):
+        statuses = {'one': None, 'two': None}
+        transport = status_transport(statuses, delay=0.05)
+        client = make_client(transport, ['http://one/3.1', 'http://two/3.1'],
+                             circuit_breaker=self.breaker)
+        endpoints = client._connection.endpoints
+        endpoints.max_failures = 1
+        for i in range(4):
+            with self.assertRaises(DeadlineExceeded):
+                with client.deadline(0.02):
+                    client._connection.call('system/versions')
+        self.assertFalse(self.breaker.is_open('http://one/3.1/'))
+        self.assertFalse(self.breaker.is_open('http://two/3.1/'))
+        for endpoint in endpoints:
+            self.assertTrue(endpoint.healthy)
+            self.assertEqual(endpoint.outstanding, 0)
+        # A caller without a deadline is not failed fast.
+        statuses.update(one=200, two=200)
+        transport.delay = 0
+        client._connection.call('system/versions')
+        client.close()
+
+
+class TestBreakerAsyncClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_fail_fast(self):
+        breaker = CircuitBreaker(min_calls=2, window=2, reset_timeout=60)
+        transport = status_transport({'one': None})
+        client = make_async_client(transport, 'http://one/3.1',
+                                   circuit_breaker=breaker)
+        for i in range(2):
+            with self.assertRaises(MailmanConnectionError):
+                await client.connection.call('system/versions')
+        with self.assertRaises(CircuitOpenError):
+            await client.connection.call('system/versions')
+        self.assertEqual(len(transport.hosts), 2)
+
+    async def test_httpx_errors_are_failures(self):
+        def handler(request):
+            raise httpx.ConnectError('one is down', request=request)
+
+        breaker = CircuitBreaker(min_calls=2, window=2, reset_timeout=60)
+        async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)) as conn:
+            client = AsyncClient(conn, 'http://one/3.1', 'restadmin',
+                                 'restpass', circuit_breaker=breaker)
+            for i in range(2):
+                with self.assertRaises(MailmanConnectionError):
+                    await client.connection.call('system/versions')
+            with self.assertRaises(CircuitOpenError):
+                await client.connection.call('system/versions')
+        self.assertEqual(breaker.state('http://one/3.1/'), OPEN)
+
+    async def test_deadline_is_not_a_failure(self):
+        breaker = CircuitBreaker(min_calls=2, window=2, reset_timeout=60)
+        transport = status_transport({'one': 200, 'two': 200}, delay=0.1)
+        client = make_async_client(
+            transport, ['http://one/3.1', 'http://two/3.1'],
+            circuit_breaker=breaker)
+        endpoints = client.connection.endpoints
+        endpoints.max_failures = 1
+        # Writes are not coalesced, they time out while being sent.
+        for i in range(4):
+            with self.assertRaises(DeadlineExceeded):
+                with client.deadline(0.02):
+                    await client.connection.call(
+                        'lists', {'fqdn_listname': 'a@b.c'})
+        self.assertEqual(breaker.state('http://one/3.1/'), CLOSED)
+        self.assertEqual(breaker.state('http://two/3.1/'), CLOSED)
+        for endpoint in endpoints:
+            self.assertTrue(endpoint.healthy)
+            self.assertEqual(endpoint.outstanding, 0)
+        transport.delay = 0
+        await client.connection.call('system/versions')
+        endpoints.close()
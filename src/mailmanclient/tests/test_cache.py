@@ -0,0 +1,202 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the response cache."""
+
+import unittest
+from unittest.mock import Mock, patch
+
+from mailmanclient import Client, ResponseCache
+from mailmanclient.restbase.cache import get_etag, normalize_path
+
+__metaclass__ = type
+__all__ = [
+    'TestCachedClient',
+    'TestResponseCache',
+    ]
+
+
+def make_response(body=b'{}', status_code=200, headers=None):
+    return Mock(status_code=status_code, content=body, headers=headers or {})
+
+
+def expire():
+    return patch('mailmanclient.restbase.cache.time.monotonic',
+                 return_value=1e12)
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_normalize_path(self):
+        self.assertEqual(
+            normalize_path('http://localhost:9001/3.1/lists/?page=2&count=5',
+                           '/3.1/'),
+            'lists?count=5&page=2')
+        self.assertEqual(
+            normalize_path('http://127.0.0.1:9001/3.1/domains/example.com',
+                           '/3.1/'),
+            'domains/example.com')
+
+    def test_lru_by_entries(self):
+        cache = ResponseCache(max_entries=2)
+        cache.set('a', make_response())
+        cache.set('b', make_response())
+        cache.get('a')
+        cache.set('c', make_response())
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_lru_by_size(self):
+        cache = ResponseCache(max_bytes=20)
+        cache.set('a', make_response(b'x' * 10))
+        cache.set('b', make_response(b'x' * 10))
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.size, 11)
+        # Responses which don't fit at all are not cached.
+        cache.set('c', make_response(b'x' * 30))
+        self.assertIsNone(cache.get('c'))
+
+    def test_route_ttl(self):
+        cache = ResponseCache(ttl=10, routes={'lists/*/config': 1,
+                                              'members*': 0})
+        self.assertEqual(cache.get_ttl('lists/ant.example.com/config'), 1)
+        self.assertEqual(cache.get_ttl('lists/ant.example.com'), 10)
+        cache.set('members/find?list_id=x', make_response())
+        self.assertEqual(len(cache), 0)
+        cache.set('lists/ant.example.com/config', make_response())
+        with expire():
+            self.assertIsNone(cache.get('lists/ant.example.com/config'))
+
+    def test_invalidate_related_collections(self):
+        cache = ResponseCache()
+        for key in ('lists', 'lists/ant.example.com', 'users?count=2',
+                    'domains', 'system/versions'):
+            cache.set(key, make_response())
+        self.assertEqual(cache.invalidate('members/123'), 3)
+        self.assertEqual(cache.invalidate('domains/example.com'), 1)
+        self.assertIsNotNone(cache.get('system/versions'))
+
+    def test_stale_generation_is_not_stored(self):
+        cache = ResponseCache()
+        generation = cache.generation
+        cache.invalidate('lists')
+        cache.set('lists', make_response(), generation)
+        self.assertIsNone(cache.get('lists'))
+
+    def test_get_etag(self):
+        body = (b'{"entries": [{"http_etag": "\\"a\\""}], '
+                b'"http_etag": "\\"b\\""}')
+        self.assertEqual(get_etag(make_response(body)), '"b"')
+        self.assertEqual(
+            get_etag(make_response(body, headers={'etag': '"c"'})), '"c"')
+        self.assertIsNone(get_etag(make_response(b'{}')))
+
+    def test_expired_entry_is_revalidated(self):
+        cache = ResponseCache()
+        cached = make_response(b'{"http_etag": "\\"1\\""}')
+        cache.set('lists', cached)
+        with expire():
+            self.assertEqual(cache.lookup('lists'), (None, '"1"'))
+        # Not modified.
+        response = cache.revalidate(
+            'lists', make_response(b'', 304), '"1"')
+        self.assertIs(response, cached)
+        self.assertIs(cache.get('lists'), cached)
+        # Same etag.
+        response = cache.revalidate('lists', make_response(
+            b'{"http_etag": "\\"1\\""}'), '"1"')
+        self.assertIs(response, cached)
+        # Modified.
+        changed = make_response(b'{"http_etag": "\\"2\\""}')
+        self.assertIs(cache.revalidate('lists', changed, '"1"'), changed)
+        self.assertIs(cache.get('lists'), changed)
+        stats = cache.stats()
+        self.assertEqual(stats['revalidations'], 3)
+        self.assertEqual(stats['not_modified'], 2)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_not_modified_without_entry(self):
+        cache = ResponseCache()
+        self.assertIsNone(
+            cache.revalidate('lists', make_response(b'', 304), '"1"'))
+
+    def test_expired_entry_without_etag_is_dropped(self):
+        cache = ResponseCache()
+        cache.set('lists', make_response())
+        with expire():
+            self.assertEqual(cache.lookup('lists'), (None, None))
+        self.assertEqual(len(cache), 0)
+
+
+class TestCachedClient(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache()
+        self._client = Client(
+            'http://localhost:9001/3.1', 'restadmin', 'restpass',
+            cache=self.cache)
+        self.domain = self._client.create_domain('example.org')
+
+    def tearDown(self):
+        self.domain.delete()
+
+    def test_get_is_cached(self):
+        pool = self._client._connection.session_pool
+        with patch.object(pool, 'request', wraps=pool.request) as request:
+            self._client.get_domain('example.org')
+            self._client.get_domain('example.org')
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(request.call_count, 1)
+
+    def test_write_invalidates(self):
+        self.assertEqual(len(self._client.domains), 1)
+        self._client.create_domain('example.net')
+        try:
+            self.assertEqual(len(self._client.domains), 2)
+        finally:
+            self._client.delete_domain('example.net')
+        self.assertEqual(len(self._client.domains), 1)
+
+    def test_cached_content_is_not_shared(self):
+        mlist = self.domain.create_list('ant')
+        first = self._client.get_list('ant@example.org')
+        first.rest_data['display_name'] = 'Changed'
+        second = self._client.get_list('ant@example.org')
+        self.assertEqual(second.display_name, 'Ant')
+        mlist.delete()
+
+    def test_revalidation(self):
+        pool = self._client._connection.session_pool
+        domain = self._client.get_domain('example.org')
+        domain.rest_data
+        with patch.object(pool, 'request', wraps=pool.request) as request:
+            with expire():
+                self._client.get_domain('example.org').rest_data
+        self.assertEqual(
+            request.call_args[1]['headers']['If-None-Match'], domain._etag)
+        self.assertEqual(self.cache.not_modified, 1)
+
+    def test_refresh_keeps_unchanged_data(self):
+        domain = self._client.get_domain('example.org')
+        data = domain.rest_data
+        self.assertFalse(domain.refresh())
+        self.assertIs(domain.rest_data, data)
+        domain.description = 'Changed'
+        domain.save()
+        self.assertTrue(domain.refresh())
+        self.assertEqual(domain.description, 'Changed')
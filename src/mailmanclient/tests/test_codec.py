@@ -0,0 +1,74 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the JSON decoders."""
+
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+from mailmanclient import Client
+from mailmanclient.restbase.codec import DECODERS, get_decoder
+
+__metaclass__ = type
+__all__ = [
+    'TestDecoders',
+    ]
+
+
+class TestDecoders(unittest.TestCase):
+
+    def _installed(self):
+        for name in DECODERS:
+            try:
+                yield name, get_decoder(name)
+            except ImportError:
+                pass
+
+    def test_decoders_agree(self):
+        content = json.dumps({
+            'entries': [{'email': 'anne@example.com', 'bounce_score': 0,
+                         'display_name': 'Anné', 'moderation': None}],
+            'start': 0, 'total_size': 1}).encode('utf-8')
+        for name, decode in self._installed():
+            with self.subTest(decoder=name):
+                self.assertEqual(decode(content), json.loads(content))
+
+    def test_invalid_json_raises_value_error(self):
+        for name, decode in self._installed():
+            with self.subTest(decoder=name):
+                with self.assertRaises(ValueError):
+                    decode(b'{"entries": [')
+
+    def test_fallback_to_stdlib(self):
+        def missing():
+            raise ImportError
+        with patch.dict(DECODERS, orjson=missing, msgspec=missing):
+            self.assertIs(get_decoder(), json.loads)
+
+    def test_unknown_decoder(self):
+        with self.assertRaises(ValueError):
+            get_decoder('yaml')
+
+    def test_custom_decoder(self):
+        pool = Mock()
+        pool.request.return_value = Mock(status_code=200, content=b'{}')
+        decode = Mock(return_value={'decoded': True})
+        client = Client('http://localhost:9001/3.1', session_pool=pool,
+                        json_decoder=decode)
+        response, content = client._connection.call('system/versions')
+        self.assertEqual(content, {'decoded': True})
+        decode.assert_called_once_with(b'{}')
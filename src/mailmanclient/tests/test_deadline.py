@@ -0,0 +1,89 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test timeouts and deadlines."""
+
+import unittest
+from unittest.mock import Mock
+
+from mailmanclient import Client, DeadlineExceeded
+from mailmanclient.constants import (
+    DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+from mailmanclient.restbase.deadline import deadline, current_deadline
+
+__metaclass__ = type
+__all__ = [
+    'TestDeadline',
+    'TestTimeout',
+    ]
+
+
+class TestTimeout(unittest.TestCase):
+
+    def _make_client(self, **kw):
+        pool = Mock()
+        pool.request.return_value = Mock(status_code=204, content=b'')
+        client = Client('http://localhost:9001/3.1', session_pool=pool, **kw)
+        return client, pool
+
+    def test_default_timeout(self):
+        client, pool = self._make_client()
+        client._connection.call('system/versions')
+        self.assertEqual(
+            pool.request.call_args[1]['timeout'],
+            (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT))
+
+    def test_no_timeout(self):
+        client, pool = self._make_client(timeout=None)
+        client._connection.call('system/versions')
+        self.assertIsNone(pool.request.call_args[1]['timeout'])
+
+    def test_timeout_capped_by_deadline(self):
+        client, pool = self._make_client(timeout=(5, 30))
+        with client.deadline(1):
+            client._connection.call('system/versions')
+        connect, read = pool.request.call_args[1]['timeout']
+        self.assertLessEqual(connect, 1)
+        self.assertLessEqual(read, 1)
+
+    def test_expired_deadline_fails_fast(self):
+        client, pool = self._make_client()
+        with self.assertRaises(DeadlineExceeded):
+            with client.deadline(0):
+                client._connection.call('system/versions')
+        self.assertFalse(pool.request.called)
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_nested_deadline_cannot_extend(self):
+        with deadline(1) as outer:
+            with deadline(10) as inner:
+                self.assertIs(inner, outer)
+            with deadline(0.5) as inner:
+                self.assertLess(inner.remaining(), outer.remaining())
+            self.assertIs(current_deadline(), outer)
+        self.assertIsNone(current_deadline())
+
+    def test_lazy_fetch_shares_deadline(self):
+        client = Client('http://localhost:9001/3.1', 'restadmin', 'restpass')
+        with client.deadline(10):
+            preferences = client.preferences
+            # The data is fetched lazily, still inside the block.
+            self.assertIn('delivery_mode', preferences)
+        with self.assertRaises(DeadlineExceeded):
+            with client.deadline(0):
+                client.preferences['delivery_mode']
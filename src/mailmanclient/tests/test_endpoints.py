@@ -0,0 +1,202 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the multi-endpoint connections."""
+
+import asyncio
+import threading
+import unittest
+from unittest.mock import Mock, patch
+from urllib.parse import urlparse
+
+import httpx
+
+from mailmanclient import (
+    Client, EndpointSet, MailmanConnectionError, RetryPolicy)
+from mailmanclient.asynclient import AsyncClient
+
+__metaclass__ = type
+__all__ = [
+    'TestAsyncMultiEndpointClient',
+    'TestEndpointSet',
+    'TestMultiEndpointClient',
+    ]
+
+
+class TestEndpointSet(unittest.TestCase):
+
+    def setUp(self):
+        self.endpoints = EndpointSet(
+            ['http://one:9001/3.1', 'http://two:9001/3.1/'], max_failures=2)
+        self.one, self.two = self.endpoints
+
+    def test_reads_go_to_least_outstanding(self):
+        first = self.endpoints.acquire('GET')
+        second = self.endpoints.acquire('GET')
+        self.assertIsNot(first, second)
+        self.endpoints.release(first)
+        self.assertIs(self.endpoints.acquire('GET'), first)
+
+    def test_writes_go_to_preferred(self):
+        self.endpoints.acquire('POST')
+        self.assertIs(self.endpoints.acquire('PATCH'), self.one)
+
+    def test_failures_take_endpoint_out(self):
+        self.endpoints.probe = Mock(return_value=False)
+        self.endpoints.probe_interval = 60
+        self.endpoints.release(self.endpoints.acquire('POST'),
+                               error=ConnectionError())
+        self.assertTrue(self.one.healthy)
+        self.endpoints.release(self.endpoints.acquire('POST'),
+                               response=Mock(status_code=503))
+        self.assertFalse(self.one.healthy)
+        self.assertIs(self.endpoints.preferred, self.two)
+        for i in range(3):
+            self.assertIs(self.endpoints.acquire('GET'), self.two)
+        # A probe brings it back.
+        self.assertTrue(self.endpoints.check())
+        self.endpoints.probe.return_value = True
+        self.assertFalse(self.endpoints.check())
+        self.assertTrue(self.one.healthy)
+        self.endpoints.close()
+
+    def test_success_resets_failures(self):
+        self.endpoints.release(self.endpoints.acquire('POST'),
+                               error=ConnectionError())
+        self.endpoints.release(self.endpoints.acquire('POST'),
+                               response=Mock(status_code=404))
+        self.assertEqual(self.one.failures, 0)
+
+    def test_all_unhealthy(self):
+        self.one.healthy = self.two.healthy = False
+        self.assertIs(self.endpoints.preferred, self.one)
+        self.assertIn(self.endpoints.acquire('GET'), (self.one, self.two))
+
+    def test_background_probe(self):
+        probed = threading.Event()
+
+        def probe(endpoint):
+            probed.set()
+            return True
+        endpoints = EndpointSet(['http://one', 'http://two'],
+                                max_failures=1, probe_interval=0.2,
+                                probe=probe)
+        one = endpoints.acquire('POST')
+        endpoints.release(one, error=ConnectionError())
+        prober = endpoints._prober
+        self.assertFalse(one.healthy)
+        self.assertTrue(probed.wait(5))
+        prober.join(5)
+        self.assertTrue(one.healthy)
+
+    def test_rewrite_url(self):
+        url = 'http://localhost:9001/3.1/lists/ant.example.com'
+        self.assertEqual(self.endpoints.rewrite_url(url, self.two),
+                         'http://two:9001/3.1/lists/ant.example.com')
+        self.assertEqual(self.endpoints.rewrite_url(url),
+                         'http://one:9001/3.1/lists/ant.example.com')
+
+
+class TestMultiEndpointClient(unittest.TestCase):
+
+    def test_requests_are_spread(self):
+        client = Client(['http://localhost:9001/3.1',
+                         'http://127.0.0.1:9001/3.1'],
+                        'restadmin', 'restpass')
+        transport = client._connection.transport
+        with patch.object(transport, 'request',
+                          wraps=transport.request) as request:
+            domain = client.create_domain('example.org')
+            for i in range(4):
+                client.get_domain('example.org')
+            domain.delete()
+        hosts = [urlparse(call[1]['url']).hostname
+                 for call in request.call_args_list]
+        # Writes go to the preferred endpoint.
+        self.assertEqual(hosts[0], 'localhost')
+        self.assertEqual(hosts[-1], 'localhost')
+        self.assertEqual(set(hosts[1:-1]), {'localhost', '127.0.0.1'})
+        client.close()
+
+    def test_failover(self):
+        endpoints = EndpointSet(
+            ['http://127.0.0.1:9/3.1', 'http://localhost:9001/3.1'],
+            max_failures=1, probe_interval=60)
+        client = Client(endpoints, 'restadmin', 'restpass',
+                        retry=RetryPolicy(backoff_factor=0))
+        for i in range(3):
+            response, content = client._connection.call('system/versions')
+            self.assertIn('api_version', content)
+        self.assertFalse(endpoints.endpoints[0].healthy)
+        # The probe of system/versions still fails.
+        self.assertTrue(endpoints.check())
+        endpoints.close()
+
+
+class TestAsyncMultiEndpointClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_httpx_errors_are_failures(self):
+        def handler(request):
+            if request.url.host == 'one':
+                raise httpx.ConnectError('one is down', request=request)
+            return httpx.Response(200, json={'api_version': '3.1'})
+
+        endpoints = EndpointSet(['http://one/3.1', 'http://two/3.1'],
+                                max_failures=1, probe_interval=60)
+        endpoints.probe = Mock(return_value=False)
+        one, two = endpoints
+        async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)) as conn:
+            client = AsyncClient(conn, endpoints, 'restadmin', 'restpass')
+            # Writes go to the preferred endpoint, and are not retried.
+            with self.assertRaises(MailmanConnectionError):
+                await client.connection.call('domains', {'mail_host': 'a.org'})
+            self.assertFalse(one.healthy)
+            self.assertEqual(one.outstanding, 0)
+            response, content = await client.connection.call(
+                'system/versions')
+            self.assertEqual(content['api_version'], '3.1')
+        endpoints.close()
+
+    async def test_probe_goes_through_the_client(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request.url.host)
+            if request.url.host == 'one' and len(calls) == 1:
+                raise httpx.ConnectError('one is down', request=request)
+            return httpx.Response(200, json={'api_version': '3.1'})
+
+        endpoints = EndpointSet(['http://one/3.1', 'http://two/3.1'],
+                                max_failures=1, probe_interval=60)
+        one, two = endpoints
+        async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)) as conn:
+            client = AsyncClient(conn, endpoints, 'restadmin', 'restpass')
+            with self.assertRaises(MailmanConnectionError):
+                await client.connection.call('system/versions')
+            self.assertFalse(one.healthy)
+            # The prober thread sends the probe on the loop of the client.
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, endpoints.check)
+            self.assertTrue(one.healthy)
+            self.assertEqual(calls, ['one', 'one'])
+            self.assertIsNone(client.connection._transport)
+            response, content = await client.connection.call(
+                'system/versions')
+            self.assertEqual(content['api_version'], '3.1')
+            self.assertEqual(len(calls), 3)
+        endpoints.close()
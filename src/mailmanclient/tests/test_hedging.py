@@ -0,0 +1,207 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the hedged requests."""
+
+import asyncio
+import time
+import unittest
+from urllib.parse import urlparse
+
+from mailmanclient import (
+    HedgingPolicy, Limit, MailmanConnectionError, RateLimiter)
+from mailmanclient.tests.utils import (
+    FakeTransport, make_async_client, make_client)
+
+__metaclass__ = type
+__all__ = [
+    'TestHedgedAsyncClient',
+    'TestHedgedClient',
+    'TestHedgingPolicy',
+    ]
+
+
+def slow_transport(delays):
+    """Answer after the delay given for the host, None failing to connect."""
+    def answer(method, url):
+        host = urlparse(url).hostname
+        if delays[host] is None:
+            raise ConnectionError('{} is down'.format(host))
+        return 200, {'host': host}
+
+    return FakeTransport(
+        handler=answer, delay=lambda url: delays[urlparse(url).hostname] or 0)
+
+
+class TestHedgingPolicy(unittest.TestCase):
+
+    def test_only_gets(self):
+        policy = HedgingPolicy()
+        self.assertTrue(policy.is_enabled('GET', 'lists'))
+        self.assertFalse(policy.is_enabled('POST', 'lists'))
+        self.assertFalse(policy.is_enabled('DELETE', 'lists/a.example.com'))
+
+    def test_routes(self):
+        policy = HedgingPolicy(routes=['lists/*', 'members'])
+        self.assertTrue(policy.is_enabled('GET', 'lists/a.example.com'))
+        self.assertTrue(policy.is_enabled('GET', 'members?count=10'))
+        self.assertFalse(policy.is_enabled('GET', 'users'))
+
+    def test_initial_delay(self):
+        policy = HedgingPolicy(initial_delay=0.5, min_samples=3)
+        policy.record(0.001)
+        self.assertEqual(policy.get_delay(), 0.5)
+        self.assertEqual(policy.calls, 1)
+
+    def test_percentile(self):
+        policy = HedgingPolicy(percentile=90, min_samples=10, min_delay=0)
+        for i in range(1, 11):
+            policy.record(i / 100)
+        self.assertEqual(policy.get_delay(), 0.09)
+        policy.percentile = 100
+        self.assertEqual(policy.get_delay(), 0.1)
+
+    def test_bounds(self):
+        policy = HedgingPolicy(min_samples=1, min_delay=0.05, max_delay=1)
+        policy.record(0.001)
+        self.assertEqual(policy.get_delay(), 0.05)
+        policy = HedgingPolicy(min_samples=1, min_delay=0.05, max_delay=1)
+        policy.record(10)
+        self.assertEqual(policy.get_delay(), 1)
+
+    def test_window(self):
+        policy = HedgingPolicy(window=2, min_samples=1, min_delay=0)
+        for latency in (5, 0.1, 0.2):
+            policy.record(latency)
+        self.assertEqual(policy.get_delay(), 0.2)
+
+    def test_counters(self):
+        policy = HedgingPolicy()
+        policy.record(None, fired=True)
+        policy.record(0.1, fired=True, won=True)
+        self.assertEqual((policy.fired, policy.won), (2, 1))
+        self.assertEqual(len(policy._latencies), 1)
+
+
+class TestHedgedClient(unittest.TestCase):
+
+    def setUp(self):
+        self.delays = {'one': 0, 'two': 0}
+        self.transport = slow_transport(self.delays)
+        self.policy = HedgingPolicy(initial_delay=0.05)
+        self.client = make_client(
+            self.transport, ['http://one/3.1', 'http://two/3.1'],
+            single_flight=None, hedging=self.policy)
+        self.connection = self.client._connection
+
+    def tearDown(self):
+        self.client.close()
+
+    def call(self):
+        response, content = self.connection.call('system/versions')
+        return content['host']
+
+    def test_fast_response(self):
+        self.assertIn(self.call(), ('one', 'two'))
+        self.assertEqual(len(self.transport.hosts), 1)
+        self.assertEqual((self.policy.calls, self.policy.fired), (1, 0))
+
+    def test_slow_response_is_hedged(self):
+        self.delays['one'] = 1
+        # The first copy goes to "one", it has no request in progress.
+        self.connection.endpoints._counter = iter([0, 1])
+        start = time.monotonic()
+        self.assertEqual(self.call(), 'two')
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(self.transport.hosts, ['one', 'two'])
+        self.assertEqual((self.policy.fired, self.policy.won), (1, 1))
+        # The slower response is released once it arrives.
+        self.connection._executor.shutdown(wait=True)
+        self.assertEqual(len(self.transport.closed), 1)
+        for endpoint in self.connection.endpoints:
+            self.assertEqual(endpoint.outstanding, 0)
+
+    def test_hedge_fails(self):
+        self.delays.update(one=0.2, two=None)
+        self.connection.endpoints._counter = iter([0, 1])
+        self.assertEqual(self.call(), 'one')
+        self.assertEqual((self.policy.fired, self.policy.won), (1, 0))
+
+    def test_both_fail(self):
+        self.delays.update(one=None, two=None)
+        with self.assertRaises(MailmanConnectionError):
+            self.call()
+        self.assertEqual(self.policy.fired, 0)
+
+    def test_hedge_takes_a_slot_of_the_limiter(self):
+        limiter = RateLimiter(reads=Limit(max_in_flight=2))
+        self.connection.limiter = limiter
+        self.delays['one'] = 0.2
+        self.connection.endpoints._counter = iter([0, 1])
+        self.assertEqual(self.call(), 'two')
+        self.assertEqual(self.policy.fired, 1)
+        self.connection._executor.shutdown(wait=True)
+        self.assertEqual(limiter.stats()['read_in_flight'], 0)
+
+    def test_no_hedge_without_free_slot(self):
+        limiter = RateLimiter(reads=Limit(max_in_flight=1))
+        self.connection.limiter = limiter
+        self.delays['one'] = 0.2
+        self.connection.endpoints._counter = iter([0, 1])
+        self.assertEqual(self.call(), 'one')
+        self.assertEqual(self.transport.hosts, ['one'])
+        self.assertEqual((self.policy.fired, self.policy.skipped), (0, 1))
+        self.assertEqual(limiter.stats()['read_in_flight'], 0)
+
+    def test_writes_are_not_hedged(self):
+        self.delays['one'] = 0.2
+        self.connection.call('lists', dict(fqdn_listname='a@example.com'))
+        self.assertEqual(self.transport.hosts, ['one'])
+        self.assertEqual(self.policy.calls, 0)
+
+
+class TestHedgedAsyncClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_slow_response_is_hedged(self):
+        transport = slow_transport({'one': 1, 'two': 0})
+        policy = HedgingPolicy(initial_delay=0.05)
+        client = make_async_client(
+            transport, ['http://one/3.1', 'http://two/3.1'],
+            single_flight=None, hedging=policy)
+        connection = client.connection
+        connection.endpoints._counter = iter([0, 1])
+        start = time.monotonic()
+        response, content = await connection.call('system/versions')
+        self.assertEqual(content['host'], 'two')
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual((policy.fired, policy.won), (1, 1))
+        # The slower copy was cancelled.
+        await asyncio.sleep(0.1)
+        for endpoint in connection.endpoints:
+            self.assertEqual(endpoint.outstanding, 0)
+
+    async def test_no_hedge_without_free_slot(self):
+        transport = slow_transport({'one': 0.2, 'two': 0})
+        policy = HedgingPolicy(initial_delay=0.05)
+        limiter = RateLimiter(reads=Limit(max_in_flight=1))
+        client = make_async_client(
+            transport, ['http://one/3.1', 'http://two/3.1'],
+            single_flight=None, hedging=policy, limiter=limiter)
+        client.connection.endpoints._counter = iter([0, 1])
+        response, content = await client.connection.call('system/versions')
+        self.assertEqual(content['host'], 'one')
+        self.assertEqual((policy.fired, policy.skipped), (0, 1))
+        self.assertEqual(limiter.stats()['read_in_flight'], 0)
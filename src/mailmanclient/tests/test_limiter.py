@@ -0,0 +1,322 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the rate and concurrency limits."""
+
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+
+from mailmanclient import (
+    AdaptiveLimiter, CircuitOpenError, Client, DeadlineExceeded, Limit,
+    MailmanConnectionError, RateLimiter)
+from mailmanclient.restbase.limiter import TokenBucket, get_tenant
+from mailmanclient.tests.utils import (
+    FakeTransport, make_async_client, make_client)
+
+__metaclass__ = type
+__all__ = [
+    'TestAdaptiveLimiter',
+    'TestAdaptiveLimiterAsync',
+    'TestGetTenant',
+    'TestLimitedAsyncClient',
+    'TestLimitedClient',
+    'TestRateLimiter',
+    'TestTokenBucket',
+    ]
+
+
+class TestGetTenant(unittest.TestCase):
+
+    def test_paths(self):
+        self.assertEqual(get_tenant('GET', 'domains/example.com', {}),
+                         'example.com')
+        self.assertEqual(get_tenant('GET', 'lists/ant.example.com', {}),
+                         'example.com')
+        self.assertEqual(
+            get_tenant('DELETE', 'lists/ant%40example.com/member/x', {}),
+            'example.com')
+        self.assertEqual(get_tenant('GET', 'members?list_id=a.example.org',
+                                    {}), 'example.org')
+        self.assertIsNone(get_tenant('GET', 'users', {}))
+
+    def test_data(self):
+        self.assertEqual(get_tenant('POST', 'lists',
+                                    {'fqdn_listname': 'ant@example.com'}),
+                         'example.com')
+        self.assertEqual(get_tenant('POST', 'domains',
+                                    {'mail_host': 'example.net'}),
+                         'example.net')
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(10, burst=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        # The next tokens are reserved in advance.
+        self.assertAlmostEqual(bucket.reserve(), 0.1, delta=0.01)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, delta=0.01)
+
+    def test_max_wait(self):
+        bucket = TokenBucket(1)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertIsNone(bucket.reserve(max_wait=0.5))
+        # No token was taken.
+        self.assertAlmostEqual(bucket.reserve(), 1, delta=0.01)
+
+    def test_refund(self):
+        bucket = TokenBucket(1)
+        bucket.reserve()
+        bucket.refund()
+        self.assertEqual(bucket.reserve(), 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_route_classes(self):
+        limiter = RateLimiter(reads=Limit(max_in_flight=1),
+                              writes=Limit(max_in_flight=1))
+        read = limiter.acquire('GET', 'lists')
+        self.assertIsNone(limiter.acquire('GET', 'users', timeout=0.05))
+        # The writes and the find queries have their own limits.
+        write = limiter.acquire('POST', 'lists', 'fqdn_listname=a%40b.c')
+        self.assertIsNone(limiter.acquire('DELETE', 'lists/a.b.c',
+                                          timeout=0.05))
+        limiter.release(write)
+        limiter.release(read)
+        self.assertIsNotNone(limiter.acquire('POST', 'users/find'))
+
+    def test_tenants(self):
+        limiter = RateLimiter(per_tenant=Limit(max_in_flight=1),
+                              tenants={'big.org': Limit(max_in_flight=2)})
+        first = limiter.acquire('GET', 'domains/example.com')
+        self.assertIsNone(limiter.acquire('GET', 'lists/ant.example.com',
+                                          timeout=0.05))
+        self.assertIsNotNone(limiter.acquire('GET', 'lists/ant.example.org'))
+        self.assertIsNotNone(limiter.acquire('GET', 'domains/big.org'))
+        self.assertIsNotNone(limiter.acquire('GET', 'domains/big.org'))
+        # Requests without a tenant are not limited.
+        self.assertIsNotNone(limiter.acquire('GET', 'users'))
+        limiter.release(first)
+        self.assertIsNotNone(limiter.acquire('GET', 'domains/example.com'))
+
+    def test_queued_in_order(self):
+        limiter = RateLimiter(reads=Limit(max_in_flight=1))
+        permit = limiter.acquire('GET', 'lists')
+        order = []
+
+        def call(i):
+            permit = limiter.acquire('GET', 'lists')
+            order.append(i)
+            limiter.release(permit)
+
+        threads = []
+        for i in range(3):
+            threads.append(threading.Thread(target=call, args=(i,)))
+            threads[-1].start()
+            time.sleep(0.02)
+        limiter.release(permit)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, [0, 1, 2])
+        self.assertEqual(limiter.queued, 3)
+
+    def test_tokens_refunded_on_timeout(self):
+        limiter = RateLimiter(reads=Limit(rate=1, burst=2, max_in_flight=1))
+        permit = limiter.acquire('GET', 'lists')
+        self.assertIsNone(limiter.acquire('GET', 'lists', timeout=0.01))
+        limiter.release(permit)
+        # The token of the request which timed out was given back.
+        self.assertIsNotNone(limiter.acquire('GET', 'lists', timeout=0))
+
+    def test_rate(self):
+        limiter = RateLimiter(writes=Limit(rate=20, burst=1))
+        start = time.monotonic()
+        for i in range(5):
+            limiter.release(limiter.acquire('POST', 'lists'))
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+
+class TestLimitedClient(unittest.TestCase):
+
+    def test_concurrency_is_capped(self):
+        transport = FakeTransport(body=b'{}', delay=0.05)
+        limiter = RateLimiter(reads=Limit(max_in_flight=2))
+        client = make_client(transport, limiter=limiter, single_flight=None)
+        with ThreadPoolExecutor(8) as executor:
+            for future in [executor.submit(client._connection.call,
+                                           'lists/{}'.format(i))
+                           for i in range(8)]:
+                future.result()
+        self.assertEqual(transport.calls, 8)
+        self.assertEqual(transport.max_in_flight, 2)
+        self.assertGreater(limiter.queued, 0)
+
+    def test_deadline(self):
+        transport = FakeTransport(body=b'{}')
+        limiter = RateLimiter(writes=Limit(rate=1))
+        client = make_client(transport, limiter=limiter)
+        client._connection.call('lists', {'fqdn_listname': 'a@b.c'})
+        with client.deadline(0.2):
+            with self.assertRaises(DeadlineExceeded):
+                client._connection.call('lists', {'fqdn_listname': 'b@b.c'})
+        self.assertEqual(transport.calls, 1)
+
+
+class TestLimitedAsyncClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrency_is_capped(self):
+        transport = FakeTransport(body=b'{}', delay=0.05)
+        limiter = RateLimiter(reads=Limit(max_in_flight=3))
+        client = make_async_client(
+            transport, limiter=limiter, single_flight=None)
+        await asyncio.gather(*[
+            client.connection.call('lists/{}'.format(i)) for i in range(9)])
+        self.assertEqual(transport.calls, 9)
+        self.assertEqual(transport.max_in_flight, 3)
+
+    async def test_cancelled_waiter(self):
+        limiter = RateLimiter(reads=Limit(max_in_flight=1))
+        permit = limiter.acquire('GET', 'lists')
+        task = asyncio.ensure_future(limiter.aacquire('GET', 'lists'))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        limiter.release(permit)
+        # The slot was not lost.
+        self.assertIsNotNone(
+            await limiter.aacquire('GET', 'lists', timeout=0.1))
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial=2, target_latency=1)
+        start = time.monotonic()
+        # About one more slot per window of successes.
+        for i in range(2):
+            limiter.record(start, 0.1, False)
+        self.assertEqual(limiter.limit, 2)
+        limiter.record(start, 0.1, False)
+        self.assertEqual(limiter.limit, 3)
+        # Slow calls don't grow the window.
+        for i in range(10):
+            limiter.record(start, 2, False)
+        self.assertEqual(limiter.limit, 3)
+
+    def test_bounds(self):
+        limiter = AdaptiveLimiter(initial=2, min_limit=2, max_limit=3)
+        for i in range(20):
+            limiter.record(time.monotonic(), 0, False)
+        self.assertEqual(limiter.limit, 3)
+        limiter.record(time.monotonic(), 0, True)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_multiplicative_decrease_once_per_burst(self):
+        limiter = AdaptiveLimiter(initial=16)
+        start = time.monotonic()
+        limiter.record(start, 0.1, True)
+        self.assertEqual(limiter.limit, 8)
+        # Calls started before the cut don't cut it again.
+        limiter.record(start, 0.1, True)
+        self.assertEqual(limiter.limit, 8)
+        limiter.record(time.monotonic(), 0.1, True)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.stats(), {
+            'limit': 4, 'in_flight': 0, 'decreases': 2})
+
+    def test_slot_failures(self):
+        limiter = AdaptiveLimiter(initial=8)
+        with self.assertRaises(HTTPError):
+            with limiter.slot():
+                raise HTTPError('url', 404, 'Not Found', None, None)
+        self.assertEqual(limiter.limit, 8)
+        for error in (HTTPError('url', 503, 'Busy', None, None),
+                      MailmanConnectionError('timed out')):
+            with self.assertRaises(type(error)):
+                with limiter.slot():
+                    raise error
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_not_overload(self):
+        limiter = AdaptiveLimiter(initial=8)
+        for error in (DeadlineExceeded('Deadline of 1s exceeded'),
+                      CircuitOpenError('http://localhost:9001/3.1/')):
+            with self.assertRaises(type(error)):
+                with limiter.slot():
+                    raise error
+        self.assertEqual(limiter.limit, 8)
+
+    def test_window_is_enforced(self):
+        transport = FakeTransport(body=b'{}', delay=0.02)
+        client = make_client(transport, single_flight=None)
+        limiter = AdaptiveLimiter(initial=2, max_limit=4, target_latency=5)
+
+        def call(i):
+            return client._connection.call('lists/{}'.format(i))[1]
+
+        results = limiter.map(call, range(40))
+        self.assertEqual(results, [{}] * 40)
+        self.assertEqual(limiter.limit, 4)
+        self.assertLessEqual(transport.max_in_flight, 4)
+        self.assertGreater(transport.max_in_flight, 2)
+
+    def test_shrinking_window(self):
+        limiter = AdaptiveLimiter(initial=4)
+        slots = [limiter.slot() for i in range(4)]
+        for slot in slots:
+            slot.__enter__()
+        limiter.record(time.monotonic(), 0, True)
+        self.assertEqual(limiter.limit, 2)
+        for slot in slots[:3]:
+            slot.__exit__(None, None, None)
+        # A single call may be in progress now.
+        self.assertEqual(limiter.in_flight, 1)
+        with limiter.slot():
+            self.assertEqual(limiter.in_flight, 2)
+        slots[3].__exit__(None, None, None)
+
+    def test_deadline(self):
+        limiter = AdaptiveLimiter(initial=1)
+        client = Client('http://localhost:9001/3.1')
+        with limiter.slot():
+            with client.deadline(0.05):
+                with self.assertRaises(DeadlineExceeded):
+                    with limiter.slot():
+                        pass
+
+
+class TestAdaptiveLimiterAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_amap(self):
+        transport = FakeTransport(body=b'{}', delay=0.02)
+        client = make_async_client(transport, single_flight=None)
+        limiter = AdaptiveLimiter(initial=1, max_limit=3)
+
+        async def call(i):
+            return (await client.connection.call('lists/{}'.format(i)))[1]
+
+        results = await limiter.amap(call, range(20))
+        self.assertEqual(results, [{}] * 20)
+        self.assertEqual(limiter.limit, 3)
+        self.assertLessEqual(transport.max_in_flight, 3)
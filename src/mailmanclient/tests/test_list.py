@@ -267,3 +267,14 @@ class TestMailingList(TestCase):
         unsub_req = self.mlist.unsubscription_requests[0]
         self.assertEqual(unsub_req['token_owner'], 'moderator')
         self.assertEqual(unsub_req['email'], 'aperson@example.com')
+
+    def test_count_members(self):
+        self.assertEqual(self.mlist.count_members(), 0)
+        self.assertEqual(self.mlist.count_members(max_age=60), 0)
+        # The subscription goes through the same client, so the cached
+        # count is dropped.
+        self.mlist.subscribe('aperson@example.com', pre_verified=True,
+                             pre_confirmed=True, pre_approved=True)
+        self.assertEqual(self.mlist.count_members(max_age=60), 1)
+        self.assertEqual(self.mlist.count_roster('owner'), 0)
+        self.assertEqual(self.domain.count_lists(), 1)
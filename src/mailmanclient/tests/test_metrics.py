@@ -0,0 +1,195 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the metrics of the REST calls."""
+
+import asyncio
+import socket
+import unittest
+from urllib.error import HTTPError
+
+from mailmanclient import (
+    Metrics, PrometheusExporter, ResponseCache, RetryPolicy, StatsdExporter)
+from mailmanclient.restbase.metrics import Sample, route_template
+from mailmanclient.tests.utils import (
+    FakeTransport, make_async_client, make_client)
+
+__metaclass__ = type
+__all__ = [
+    'TestExporters',
+    'TestMetrics',
+    'TestRouteTemplate',
+    ]
+
+
+class TestRouteTemplate(unittest.TestCase):
+
+    def test_routes(self):
+        for resource, route in (
+                ('lists', 'lists'),
+                ('lists/ant.example.com', 'lists/{list}'),
+                ('lists/ant.example.com/roster/member?page=2&count=50',
+                 'lists/{list}/roster/{role}'),
+                ('lists/ant@example.com/config/description',
+                 'lists/{list}/config/{attribute}'),
+                ('lists/ant.example.com/held/count',
+                 'lists/{list}/held/count'),
+                ('lists/ant.example.com/requests/12',
+                 'lists/{list}/requests/{request}'),
+                ('lists/find', 'lists/find'),
+                ('lists/ant.example.com/member/anne@example.com',
+                 'lists/{list}/member/{email}'),
+                ('lists/ant.example.com/nonmember/anne@example.com',
+                 'lists/{list}/nonmember/{email}'),
+                ('queues/bad', 'queues/{queue}'),
+                ('queues/bad/1234.pck', 'queues/{queue}/{file}'),
+                ('users/42/addresses', 'users/{user}/addresses'),
+                ('addresses/anne@example.com/preferences',
+                 'addresses/{address}/preferences'),
+                ('domains/example.com/owners', 'domains/{domain}/owners'),
+                ('system/configuration/mailman',
+                 'system/configuration/{section}'),
+                ):
+            self.assertEqual(route_template(resource), route)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_calls(self):
+        metrics = Metrics(buckets=(1, 10))
+        client = make_client(middleware=[metrics])
+        client._connection.call('lists/ant.example.com')
+        client._connection.call(
+            'http://localhost:9001/3.1/lists/bee.example.com')
+        self.assertEqual(metrics.routes(), [('GET', 'lists/{list}')])
+        stats = metrics.get('GET', 'lists/{list}')
+        self.assertEqual(stats.calls, 2)
+        self.assertEqual(stats.statuses, {'2xx': 2})
+        self.assertEqual(stats.buckets, [2, 0, 0])
+        self.assertEqual(stats.response_bytes, 30)
+        self.assertEqual(stats.retries, 0)
+
+    def test_errors(self):
+        metrics = Metrics()
+        client = make_client(FakeTransport(404), middleware=[metrics])
+        with self.assertRaises(HTTPError):
+            client._connection.call('domains/example.com', method='DELETE')
+        stats = metrics.get('DELETE', 'domains/{domain}')
+        self.assertEqual(stats.statuses, {'4xx': 1})
+
+    def test_retries(self):
+        metrics = Metrics()
+        client = make_client(FakeTransport([503, 503, 200]),
+                             retry=RetryPolicy(backoff_factor=0),
+                             middleware=[metrics])
+        client._connection.call('system/versions')
+        stats = metrics.get('GET', 'system/versions')
+        self.assertEqual(stats.retries, 2)
+        self.assertEqual(stats.statuses, {'2xx': 1})
+
+    def test_cache_hits(self):
+        metrics = Metrics()
+        client = make_client(cache=ResponseCache(), middleware=[metrics])
+        client._connection.call('domains')
+        client._connection.call('domains')
+        stats = metrics.get('GET', 'domains')
+        self.assertEqual(stats.cache_hits, 1)
+        # Only the response received from Core is counted.
+        self.assertEqual(stats.response_bytes, 15)
+
+    def test_async(self):
+        metrics = Metrics()
+
+        async def main():
+            client = make_async_client(middleware=[metrics])
+            await client.connection.call('users/42')
+
+        asyncio.run(main())
+        self.assertEqual(metrics.get('GET', 'users/{user}').calls, 1)
+
+    def test_coalesced_calls(self):
+        metrics = Metrics()
+
+        async def main():
+            client = make_async_client(middleware=[metrics])
+            await asyncio.gather(
+                *(client.connection.call('domains') for i in range(3)))
+            return client.connection.single_flight
+
+        single_flight = asyncio.run(main())
+        self.assertEqual(single_flight.coalesced, 2)
+        stats = metrics.get('GET', 'domains')
+        self.assertEqual(stats.calls, 3)
+        # Only the response received from Core is counted.
+        self.assertEqual(stats.response_bytes, 15)
+
+
+class TestExporters(unittest.TestCase):
+
+    def test_prometheus(self):
+        metrics = Metrics(buckets=(0.5,))
+        client = make_client(middleware=[metrics])
+        client._connection.call('lists/ant.example.com')
+        text = PrometheusExporter(metrics).render()
+        labels = 'method="GET",route="lists/{list}"'
+        self.assertIn('# TYPE mailmanclient_calls_total counter\n', text)
+        self.assertIn(
+            'mailmanclient_calls_total{%s,status="2xx"} 1\n' % labels, text)
+        self.assertIn(
+            'mailmanclient_call_duration_seconds_bucket{%s,le="0.5"} 1\n'
+            % labels, text)
+        self.assertIn(
+            'mailmanclient_call_duration_seconds_bucket{%s,le="+Inf"} 1\n'
+            % labels, text)
+        self.assertIn(
+            'mailmanclient_call_duration_seconds_count{%s} 1\n' % labels,
+            text)
+        self.assertIn(
+            'mailmanclient_response_bytes_total{%s} 15\n' % labels, text)
+
+    def test_prometheus_escape(self):
+        metrics = Metrics(route=lambda resource: 'a"b')
+        client = make_client(middleware=[metrics])
+        client._connection.call('domains')
+        text = PrometheusExporter(metrics, prefix='app').render()
+        self.assertIn('app_retries_total{method="GET",route="a\\"b"} 0\n',
+                      text)
+
+    def test_statsd(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(listener.close)
+        listener.bind(('127.0.0.1', 0))
+        listener.settimeout(5)
+        exporter = StatsdExporter('127.0.0.1', listener.getsockname()[1])
+        self.addCleanup(exporter.close)
+        metrics = Metrics(exporters=[exporter])
+        client = make_client(middleware=[metrics])
+        client._connection.call('lists/ant.example.com/roster/member')
+        lines = listener.recv(4096).decode('utf-8').split('\n')
+        name = 'mailmanclient.GET.lists.list.roster.role'
+        self.assertEqual(lines[0], name + '.calls.2xx:1|c')
+        self.assertTrue(lines[1].startswith(name + '.duration:'))
+        self.assertTrue(lines[1].endswith('|ms'))
+        self.assertEqual(lines[2], name + '.response_bytes:15|c')
+
+    def test_statsd_format(self):
+        exporter = StatsdExporter(prefix='app')
+        sample = Sample('GET', 'domains', 'error', 0.25, 0, 3, False)
+        self.assertEqual(exporter.format(sample), [
+            'app.GET.domains.calls.error:1|c',
+            'app.GET.domains.duration:250.000|ms',
+            'app.GET.domains.retries:3|c',
+        ])
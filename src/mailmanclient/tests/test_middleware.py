@@ -0,0 +1,168 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the middleware."""
+
+import unittest
+from urllib.error import HTTPError
+
+from mailmanclient import MailmanConnectionError, Middleware, ResponseCache
+from mailmanclient.tests.utils import (
+    FakeTransport, make_async_client, make_client)
+
+__metaclass__ = type
+__all__ = [
+    'TestAsyncMiddleware',
+    'TestMiddleware',
+    ]
+
+
+class Recorder(Middleware):
+    """Record the hooks called."""
+
+    def __init__(self, name, events):
+        self.name = name
+        self.events = events
+
+    def on_request(self, context):
+        self.events.append((self.name, 'request', context.method))
+
+    def on_response(self, context):
+        self.events.append((self.name, 'response', context.status_code,
+                            context.body_size, context.cached))
+        assert context.elapsed is not None
+
+    def on_error(self, context):
+        self.events.append((self.name, 'error', type(context.error)))
+
+
+class AddHeader(Middleware):
+
+    def on_request(self, context):
+        context.params['headers']['X-Test'] = 'yes'
+
+
+class Replay(Middleware):
+    """Send the call again after a connection error."""
+
+    def wrap(self, context, call_next):
+        try:
+            return call_next(context)
+        except MailmanConnectionError:
+            return call_next(context)
+
+
+class TestMiddleware(unittest.TestCase):
+
+    def test_order(self):
+        events = []
+        client = make_client(middleware=[
+            Recorder('outer', events), Recorder('inner', events)])
+        response, content = client._connection.call('domains')
+        self.assertEqual(content, {'entries': []})
+        self.assertEqual(events, [
+            ('outer', 'request', 'GET'),
+            ('inner', 'request', 'GET'),
+            ('inner', 'response', 200, 15, False),
+            ('outer', 'response', 200, 15, False),
+        ])
+
+    def test_error(self):
+        events = []
+        client = make_client(FakeTransport(status=404, body=b''))
+        client.add_middleware(Recorder('recorder', events))
+        with self.assertRaises(HTTPError):
+            client._connection.call('domains')
+        self.assertEqual(events, [
+            ('recorder', 'request', 'GET'),
+            ('recorder', 'error', HTTPError),
+        ])
+
+    def test_connection_error(self):
+        events = []
+        transport = FakeTransport(error=ConnectionError('refused'))
+        client = make_client(transport,
+                             middleware=[Recorder('recorder', events)])
+        with self.assertRaises(MailmanConnectionError):
+            client._connection.call('domains')
+        self.assertEqual(events[-1],
+                         ('recorder', 'error', MailmanConnectionError))
+
+    def test_change_request(self):
+        transport = FakeTransport()
+        client = make_client(transport, middleware=[AddHeader()])
+        client._connection.call('domains')
+        self.assertEqual(transport.headers[0]['X-Test'], 'yes')
+
+    def test_replay(self):
+        transport = FakeTransport(error=ConnectionError('refused'))
+        client = make_client(transport, middleware=[Replay()])
+        with self.assertRaises(MailmanConnectionError):
+            client._connection.call('domains')
+        self.assertEqual(len(transport.requests), 2)
+
+    def test_cached(self):
+        events = []
+        client = make_client(cache=ResponseCache(),
+                             middleware=[Recorder('recorder', events)])
+        client._connection.call('domains')
+        client._connection.call('domains')
+        self.assertEqual(events[-1], ('recorder', 'response', 200, 15, True))
+
+    def test_failing_hook(self):
+        def hook(params):
+            raise ValueError('broken')
+
+        transport = FakeTransport()
+        client = make_client(transport, request_hooks=[hook])
+        with self.assertWarns(RuntimeWarning):
+            client._connection.call('domains')
+        self.assertEqual(len(transport.requests), 1)
+
+
+class TestAsyncMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    async def test_hooks(self):
+        events = []
+        client = make_async_client(middleware=[
+            Recorder('outer', events), Recorder('inner', events)])
+        response, content = await client.connection.call('domains')
+        self.assertEqual(content, {'entries': []})
+        self.assertEqual(events, [
+            ('outer', 'request', 'GET'),
+            ('inner', 'request', 'GET'),
+            ('inner', 'response', 200, 15, False),
+            ('outer', 'response', 200, 15, False),
+        ])
+
+    async def test_error(self):
+        events = []
+        client = make_async_client(FakeTransport(status=500, body=b''))
+        client.add_middleware(Recorder('recorder', events))
+        with self.assertRaises(HTTPError):
+            await client.connection.call('domains')
+        self.assertEqual(events[-1], ('recorder', 'error', HTTPError))
+
+    async def test_request_hooks(self):
+        def hook(params):
+            params['headers']['X-Hook'] = 'yes'
+            return params
+
+        transport = FakeTransport()
+        client = make_async_client(transport)
+        client.connection.add_hooks([hook])
+        await client.connection.call('domains')
+        self.assertEqual(transport.headers[0]['X-Hook'], 'yes')
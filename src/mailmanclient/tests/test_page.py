@@ -15,17 +15,31 @@
 # along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
 
 """Test Page corner cases."""
+import asyncio
+import threading
+import time
 import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from unittest.mock import Mock
 from urllib.parse import urlsplit, parse_qs
 
+from mailmanclient.asyncobjects.mailinglist import (
+    MailingList as AsyncMailingList, MemberRole)
 from mailmanclient.constants import DEFAULT_PAGE_ITEM_COUNT
 from mailmanclient.restbase.page import Page
+from mailmanclient.restobjects.mailinglist import MailingList
+from mailmanclient.tests.utils import (
+    BASE, FakeTransport, make_async_client, make_client)
 
 __metaclass__ = type
 __all__ = [
+    'TestAsyncPages',
+    'TestFetchAll',
+    'TestCount',
+    'TestIterPages',
     'TestPage',
+    'TestPaginator',
     ]
 
 
@@ -51,3 +65,353 @@ class TestPage(unittest.TestCase):
             "count": [str(DEFAULT_PAGE_ITEM_COUNT)],
             "page": ["1"],
             })
+
+
+class PagedTransport(FakeTransport):
+    """Serve a collection of `size` users, page by page."""
+
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+        # Entries added at the start of the collection after the first page.
+        self.shift = 0
+        self.barrier = None
+        self.requested = {}
+        self.threads = {}
+
+    def answer(self, method, url):
+        if method != 'GET':
+            return 204, b''
+        query = parse_qs(urlsplit(url).query)
+        count, page = int(query['count'][0]), int(query['page'][0])
+        with self._lock:
+            self.requested.setdefault(page, threading.Event()).set()
+            self.threads[page] = threading.current_thread().name
+        if self.barrier is not None and page > 1:
+            self.barrier.wait()
+        start = count * (page - 1) - (self.shift if page > 1 else 0)
+        return 200, {'start': start, 'total_size': self.size, 'entries': [
+            {'self_link': BASE + 'users/{}'.format(nr), 'user_id': nr}
+            for nr in range(start, min(start + count, self.size))]}
+
+    async def arequest(self, method, url, **kw):
+        await asyncio.sleep(0.01)
+        return await super().arequest(method, url, **kw)
+
+    def wait(self, page):
+        with self._lock:
+            event = self.requested.setdefault(page, threading.Event())
+        return event.wait(5)
+
+
+class TestIterPages(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = PagedTransport(7)
+        self.client = make_client(self.transport, single_flight=None)
+
+    def test_all_entries(self):
+        users = list(self.client.iter_users(count=3))
+        self.assertEqual([user.user_id for user in users], list(range(7)))
+        self.assertEqual(len(self.transport.urls), 3)
+
+    def test_next_page_is_prefetched(self):
+        users = self.client.iter_users(count=3)
+        next(users)
+        # The second page is requested while the first one is processed.
+        self.assertTrue(self.transport.wait(2))
+        self.assertEqual(len(list(users)), 6)
+
+    def test_prefetch_threads(self):
+        list(self.client.iter_users(count=3))
+        # The hedged requests have their own threads, a page fetched ahead
+        # must not wait for a copy queued behind it.
+        self.assertTrue(
+            self.transport.threads[2].startswith('mailmanclient-prefetch'))
+        self.assertIsNone(self.client._connection._executor)
+
+    def test_no_prefetch(self):
+        users = self.client.iter_users(count=3, prefetch=0)
+        next(users)
+        self.assertEqual(len(self.transport.urls), 1)
+        self.assertEqual(len(list(users)), 6)
+        self.assertEqual(len(self.transport.urls), 3)
+
+    def test_prefetch_depth(self):
+        self.transport.size = 10
+        users = self.client.iter_users(count=2, prefetch=2)
+        next(users)
+        self.assertTrue(self.transport.wait(3))
+        self.assertEqual(sorted(self.transport.requested), [1, 2, 3])
+        users.close()
+        self.assertNotIn(5, self.transport.requested)
+
+    def test_empty(self):
+        self.transport.size = 0
+        self.assertEqual(list(self.client.iter_members()), [])
+        self.assertEqual(len(self.transport.urls), 1)
+
+    def test_roster_fields(self):
+        mlist = MailingList(self.client._connection, BASE + 'lists/ant',
+                            {'list_id': 'ant.example.com'})
+        self.assertEqual(len(list(mlist.iter_roster(
+            'owner', fields=['email'], count=5))), 7)
+        query = parse_qs(urlsplit(self.transport.urls[0]).query)
+        self.assertEqual(query['fields'], ['email', 'address', 'self_link'])
+        self.assertTrue(self.transport.urls[0].startswith(
+            BASE + 'lists/ant/roster/owner?'))
+
+
+class TestFetchAll(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = PagedTransport(7)
+        self.client = make_client(self.transport, single_flight=None)
+
+    def test_fetch_all(self):
+        page = self.client.get_user_page(count=3)
+        self.assertEqual(page.page_count, 3)
+        users = page.fetch_all(parallel=2)
+        self.assertEqual([user.user_id for user in users], list(range(7)))
+        self.assertEqual(len(self.transport.urls), 3)
+
+    def test_pages_are_fetched_together(self):
+        # Both requests must be in flight at once to cross the barrier.
+        self.transport.barrier = threading.Barrier(2, timeout=5)
+        users = self.client.get_user_page(count=3).fetch_all(parallel=2)
+        self.assertEqual(len(users), 7)
+
+    def test_from_another_page(self):
+        users = self.client.get_user_page(count=3, page=2).fetch_all()
+        self.assertEqual([user.user_id for user in users], list(range(7)))
+        self.assertEqual(len(self.transport.urls), 3)
+
+    def test_duplicates(self):
+        self.transport.shift = 1
+        users = self.client.get_user_page(count=3).fetch_all()
+        self.assertEqual([user.user_id for user in users], list(range(7)))
+
+    def test_empty(self):
+        self.transport.size = 0
+        self.assertEqual(self.client.get_user_page().fetch_all(), [])
+        self.assertEqual(len(self.transport.urls), 1)
+
+    def test_async(self):
+        self.transport.shift = 1
+
+        async def main():
+            client = make_async_client(self.transport)
+            return await client.users(parallel=2, count=3)
+
+        users = asyncio.run(main())
+        self.assertEqual([user.user_id for user in users], list(range(7)))
+        self.assertEqual(len(self.transport.urls), 3)
+
+
+class TestAsyncPages(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = PagedTransport(7)
+
+    def run_with_client(self, test):
+        async def main():
+            client = make_async_client(self.transport)
+            return await test(client)
+        return asyncio.run(main())
+
+    def test_page(self):
+        async def test(client):
+            page = await client.get_user_page(count=3, page=2)
+            self.assertEqual(page.nr, 2)
+            self.assertEqual(page.page_count, 3)
+            self.assertEqual([user.user_id for user in page], [3, 4, 5])
+            self.assertTrue(page.has_previous)
+            self.assertTrue(page.has_next)
+            last = await page.next()
+            self.assertEqual([user.user_id for user in last], [6])
+            self.assertFalse(last.has_next)
+            first = await page.previous()
+            self.assertEqual(first[0].user_id, 0)
+            self.assertIsNone(await first.previous())
+
+        self.run_with_client(test)
+
+    def test_iterate(self):
+        async def test(client):
+            return [user.user_id
+                    async for user in client.iter_users(count=3)]
+
+        self.assertEqual(self.run_with_client(test), list(range(7)))
+        self.assertEqual(len(self.transport.urls), 3)
+
+    def test_prefetch(self):
+        async def test(client):
+            users = client.iter_users(count=3, prefetch=2)
+            await users.__anext__()
+            await asyncio.sleep(0.1)
+            # Both next pages were fetched while the first one is used.
+            self.assertEqual(sorted(self.transport.requested), [1, 2, 3])
+            await users.aclose()
+
+        self.run_with_client(test)
+
+    def test_close_cancels_prefetch(self):
+        async def test(client):
+            users = client.iter_users(count=2, prefetch=2)
+            await users.__anext__()
+            await users.aclose()
+            await asyncio.sleep(0.1)
+
+        self.run_with_client(test)
+        self.assertEqual(sorted(self.transport.requested), [1])
+
+    def test_roster(self):
+        async def test(client):
+            mlist = AsyncMailingList(client.connection, {
+                'fqdn_listname': 'ant@example.com'})
+            return [member async for member in mlist.iter_roster(
+                MemberRole.owner, count=5)]
+
+        self.assertEqual(len(self.run_with_client(test)), 7)
+        self.assertTrue(self.transport.urls[0].startswith(
+            BASE + 'lists/ant@example.com/roster/owner?'))
+
+
+class TestCount(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = PagedTransport(7)
+        self.client = make_client(self.transport, single_flight=None)
+
+    def test_count(self):
+        self.assertEqual(self.client.count_users(), 7)
+        url, = self.transport.urls
+        self.assertEqual(parse_qs(urlsplit(url).query),
+                         {'count': ['1'], 'page': ['1']})
+        # Without max_age, Core is always asked.
+        self.client.count_users()
+        self.assertEqual(len(self.transport.urls), 2)
+
+    def test_max_age(self):
+        self.assertEqual(self.client.count_members(max_age=60), 7)
+        self.transport.size = 8
+        self.assertEqual(self.client.count_members(max_age=60), 7)
+        self.assertEqual(len(self.transport.urls), 1)
+        self.assertEqual(self.client.count_members(max_age=0), 8)
+
+    def test_write_invalidates(self):
+        self.client.count_members(max_age=60)
+        self.client.count_bans(max_age=60)
+        self.transport.size = 8
+        self.client._connection.call('members', {'list_id': 'ant'})
+        self.assertEqual(self.client.count_members(max_age=60), 8)
+        # The bans are not related to the members.
+        self.assertEqual(self.client.count_bans(max_age=60), 7)
+
+    def test_roster(self):
+        mlist = MailingList(self.client._connection, BASE + 'lists/ant',
+                            {'list_id': 'ant.example.com'})
+        self.assertEqual(mlist.count_roster('owner'), 7)
+        self.assertTrue(self.transport.urls[0].startswith(
+            BASE + 'lists/ant/roster/owner?'))
+
+    def test_async(self):
+        async def main():
+            client = make_async_client(self.transport)
+            mlist = AsyncMailingList(client.connection, {
+                'fqdn_listname': 'ant@example.com'})
+            return (await client.count_addresses(),
+                    await mlist.count_roster(MemberRole.member, max_age=60),
+                    await mlist.count_roster('member', max_age=60))
+
+        self.assertEqual(asyncio.run(main()), (7, 7, 7))
+        self.assertEqual(len(self.transport.urls), 2)
+
+
+class TestPaginator(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = PagedTransport(10)
+        self.client = make_client(self.transport, single_flight=None)
+
+    def requests(self, nr):
+        return sum(1 for url in self.transport.urls
+                   if parse_qs(urlsplit(url).query).get('page') == [str(nr)])
+
+    def test_jump_to_page(self):
+        paginator = self.client.get_user_paginator(count=2, prefetch=False)
+        page = paginator.get_page(4)
+        self.assertEqual([user.user_id for user in page], [6, 7])
+        self.assertEqual(len(self.transport.urls), 1)
+        self.assertIs(paginator.get_page(4), page)
+        self.assertEqual(paginator.page_count, 5)
+        self.assertEqual((paginator.hits, paginator.misses), (1, 1))
+
+    def test_lru(self):
+        paginator = self.client.get_user_paginator(
+            count=2, max_pages=2, prefetch=False)
+        for nr in (1, 2, 3, 1, 3):
+            paginator.get_page(nr)
+        # Page 1 was evicted by page 3, then page 2 by page 1.
+        self.assertEqual(self.requests(1), 2)
+        self.assertEqual(self.requests(3), 1)
+        self.assertEqual(len(paginator), 2)
+
+    def test_neighbours_are_prefetched(self):
+        paginator = self.client.get_user_paginator(count=2)
+        paginator.get_page(3)
+        self.assertTrue(self.transport.wait(2))
+        self.assertTrue(self.transport.wait(4))
+        self.assertEqual(paginator.get_page(4)[0].user_id, 6)
+        self.assertEqual(paginator.get_page(2)[0].user_id, 2)
+        self.assertEqual(self.requests(4), 1)
+        self.assertEqual(self.requests(2), 1)
+        # The last page has no next one.
+        paginator.get_page(5)
+        self.assertNotIn(6, self.transport.requested)
+
+    def test_write_invalidates(self):
+        paginator = self.client.get_user_paginator(count=2, prefetch=False)
+        paginator.get_page(1)
+        # Bans are not related to the users.
+        self.client._connection.call('bans', {'email': 'anne@example.com'})
+        paginator.get_page(1)
+        self.assertEqual(self.requests(1), 1)
+        self.client._connection.call('users', {'email': 'anne@example.com'})
+        paginator.get_page(1)
+        self.assertEqual(self.requests(1), 2)
+
+    def test_page_fetched_before_a_write_is_not_served(self):
+        barrier = self.transport.barrier = threading.Barrier(2, timeout=5)
+        paginator = self.client.get_user_paginator(count=2)
+        paginator.get_page(1)
+        # The prefetch of page 2 waits at the barrier.
+        self.assertTrue(self.transport.wait(2))
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(paginator.get_page, 2)
+            while paginator.misses < 2:
+                time.sleep(0.001)
+            self.client._connection.call('users', {'email': 'a@example.com'})
+            self.transport.barrier = None
+            barrier.wait()
+            page = future.result()
+        self.assertEqual([user.user_id for user in page], [2, 3])
+        self.assertEqual(self.requests(2), 2)
+
+    def test_newer_fetch_stays_pending(self):
+        paginator = self.client.get_user_paginator(count=2, prefetch=False)
+        newer = Future()
+        paginator._pending[2] = newer
+        # A fetch started before an invalidation ends.
+        paginator._fetch(2, Future())
+        self.assertIs(paginator._pending[2], newer)
+
+    def test_held_messages(self):
+        mlist = MailingList(self.client._connection, BASE + 'lists/ant',
+                            {'fqdn_listname': 'ant@example.com'})
+        paginator = mlist.get_held_paginator(count=5, prefetch=False)
+        paginator.get_page(1)
+        self.client._connection.call('lists/ant@example.com/held/1',
+                                     {'action': 'accept'})
+        paginator.get_page(1)
+        self.assertEqual(self.requests(1), 2)
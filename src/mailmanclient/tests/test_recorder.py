@@ -0,0 +1,141 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the recording of the REST calls."""
+
+import asyncio
+import threading
+import unittest
+import warnings
+from urllib.error import HTTPError
+
+from mailmanclient import NPlusOneWarning
+from mailmanclient.restobjects.member import Member
+from mailmanclient.tests.utils import (
+    BASE, FakeTransport, make_async_client, make_client)
+
+__metaclass__ = type
+__all__ = [
+    'TestAccessors',
+    'TestCallRecorder',
+    ]
+
+
+def serve(method, url):
+    """Serve a few domains and a member."""
+    path = url[len(BASE):]
+    if path == 'domains':
+        body = {'entries': [
+            {'mail_host': host, 'self_link': BASE + 'domains/' + host}
+            for host in ('b.example.com', 'a.example.com')]}
+    elif path.startswith('domains/'):
+        host = path.split('/')[1]
+        body = {'mail_host': host, 'self_link': url}
+    elif path == 'members/1':
+        body = {'self_link': url, 'email': 'anne@example.com',
+                'address': BASE + 'addresses/anne@example.com',
+                'user': BASE + 'users/1'}
+    elif path.startswith('addresses/'):
+        body = {'email': 'anne@example.com', 'self_link': url}
+    else:
+        return 404, b''
+    return 200, body
+
+
+class TestCallRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.client = make_client(FakeTransport(handler=serve),
+                                  single_flight=None)
+
+    def test_record(self):
+        with self.client.record_calls() as calls:
+            self.client._connection.call('domains/a.example.com')
+        self.assertEqual(len(calls.calls), 1)
+        call = calls.calls[0]
+        self.assertEqual(call.method, 'GET')
+        self.assertEqual(call.route, 'domains/{domain}')
+        self.assertEqual(call.resource, 'domains/a.example.com')
+        self.assertEqual(call.status_code, 200)
+        self.assertEqual(call.call_site.filename, __file__)
+        self.assertEqual(call.call_site.function, 'test_record')
+        # The recorder is removed when the block ends.
+        self.assertEqual(self.client._connection.middleware, [])
+
+    def test_repeats(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with self.client.record_calls(threshold=2) as calls:
+                for host in ('a.example.com', 'b.example.com'):
+                    self.client._connection.call('domains/' + host)
+        self.assertEqual(list(calls.repeated()), [('GET', 'domains/{domain}')])
+        self.assertEqual(len(caught), 1)
+        self.assertIs(caught[0].category, NPlusOneWarning)
+        self.assertIn('GET domains/{domain} called 2 times', str(
+            caught[0].message))
+        with self.assertRaises(AssertionError):
+            calls.assert_no_repeats()
+
+    def test_assert_max_calls(self):
+        with self.client.record_calls(warn=False) as calls:
+            self.client._connection.call('domains/a.example.com')
+            with self.assertRaises(HTTPError):
+                self.client._connection.call('lists')
+        calls.assert_max_calls(2)
+        with self.assertRaises(AssertionError) as context:
+            calls.assert_max_calls(1)
+        self.assertIn('GET lists (404) from', str(context.exception))
+
+    def test_other_threads_are_ignored(self):
+        with self.client.record_calls() as calls:
+            thread = threading.Thread(target=self.client._connection.call,
+                                      args=('domains/a.example.com',))
+            thread.start()
+            thread.join()
+        self.assertEqual(calls.calls, [])
+
+    def test_async(self):
+        async def main():
+            client = make_async_client(FakeTransport(handler=serve))
+            with client.record_calls() as calls:
+                await client.connection.call('domains/a.example.com')
+            return calls
+
+        calls = asyncio.run(main())
+        self.assertEqual([call.route for call in calls.calls],
+                         ['domains/{domain}'])
+
+
+class TestAccessors(unittest.TestCase):
+
+    def setUp(self):
+        self.client = make_client(FakeTransport(handler=serve),
+                                  single_flight=None)
+
+    def test_domains(self):
+        with self.client.record_calls() as calls:
+            hosts = [domain.mail_host for domain in self.client.domains]
+        self.assertEqual(hosts, ['a.example.com', 'b.example.com'])
+        calls.assert_max_calls(1)
+
+    def test_member_address(self):
+        member = Member(self.client._connection, BASE + 'members/1')
+        with self.client.record_calls() as calls:
+            self.assertIs(member.address, member.address)
+            self.assertEqual(member.address.email, 'anne@example.com')
+            self.assertEqual(member.address.email, 'anne@example.com')
+            self.assertIs(member.user, member.user)
+        calls.assert_max_calls(2)
@@ -0,0 +1,148 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the retry policy."""
+
+import unittest
+from unittest.mock import Mock, patch
+from urllib.error import HTTPError
+
+import httpx
+
+from mailmanclient import Client, MailmanConnectionError, RetryPolicy
+from mailmanclient.asynclient import AsyncClient
+from mailmanclient.restbase.retry import parse_retry_after
+
+__metaclass__ = type
+__all__ = [
+    'TestAsyncRetries',
+    'TestRetryPolicy',
+    'TestRetries',
+    ]
+
+
+def make_response(status_code, headers=None):
+    response = Mock(status_code=status_code, content=b'', text='',
+                    headers=headers or {})
+    response.json.side_effect = ValueError
+    return response
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_backoff_is_capped(self):
+        policy = RetryPolicy(max_retries=10, backoff_factor=1, max_backoff=4,
+                             jitter=False)
+        delays = [policy.get_delay('GET', attempt, make_response(503))
+                  for attempt in range(5)]
+        self.assertEqual(delays, [1, 2, 4, 4, 4])
+
+    def test_jitter(self):
+        policy = RetryPolicy(backoff_factor=1)
+        for attempt in range(3):
+            delay = policy.get_delay('GET', attempt, make_response(502))
+            self.assertTrue(0 <= delay <= 2 ** attempt)
+
+    def test_only_idempotent_methods(self):
+        policy = RetryPolicy()
+        for method in ('GET', 'PUT', 'DELETE'):
+            self.assertTrue(policy.is_retryable(method))
+        self.assertFalse(policy.is_retryable('POST'))
+        self.assertFalse(policy.is_retryable('PATCH'))
+        self.assertTrue(RetryPolicy(retry_patch=True).is_retryable('PATCH'))
+
+    def test_only_some_statuses(self):
+        policy = RetryPolicy()
+        self.assertIsNone(policy.get_delay('GET', 0, make_response(500)))
+        self.assertIsNone(policy.get_delay('GET', 0, make_response(404)))
+
+    def test_retry_after(self):
+        policy = RetryPolicy(max_backoff=10)
+        response = make_response(503, {'retry-after': '3'})
+        self.assertEqual(policy.get_delay('GET', 0, response), 3)
+        # Waiting longer than max_backoff ends the retries.
+        response = make_response(503, {'retry-after': '60'})
+        self.assertIsNone(policy.get_delay('GET', 0, response))
+        self.assertEqual(policy.exhausted, 1)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('2'), 2)
+        self.assertEqual(
+            parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+
+@patch('mailmanclient.restbase.connection.time.sleep')
+class TestRetries(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = Mock()
+        self.policy = RetryPolicy(max_retries=2)
+        self.client = Client('http://localhost:9001/3.1',
+                             session_pool=self.pool, retry=self.policy)
+
+    def test_retry_until_success(self, sleep):
+        self.pool.request.side_effect = [
+            make_response(503), make_response(502), make_response(204)]
+        self.client._connection.call('system/versions')
+        self.assertEqual(self.pool.request.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(self.policy.retries, 2)
+        self.assertEqual(self.policy.retried_calls, 1)
+
+    def test_retries_exhausted(self, sleep):
+        self.pool.request.return_value = make_response(503)
+        with self.assertRaises(HTTPError) as cm:
+            self.client._connection.call('system/versions')
+        self.assertEqual(cm.exception.code, 503)
+        self.assertEqual(self.pool.request.call_count, 3)
+        self.assertEqual(self.policy.exhausted, 1)
+
+    def test_connection_error_is_retried(self, sleep):
+        self.pool.request.side_effect = [
+            ConnectionRefusedError(), make_response(204)]
+        self.client._connection.call('system/versions')
+        self.assertEqual(self.pool.request.call_count, 2)
+
+    def test_post_is_not_retried(self, sleep):
+        self.pool.request.side_effect = [ConnectionRefusedError()]
+        with self.assertRaises(MailmanConnectionError):
+            self.client._connection.call('domains', {'mail_host': 'a.org'})
+        self.assertEqual(self.pool.request.call_count, 1)
+        self.assertFalse(sleep.called)
+
+    def test_no_retry_past_deadline(self, sleep):
+        self.pool.request.return_value = make_response(
+            503, {'retry-after': '5'})
+        with self.assertRaises(HTTPError):
+            with self.client.deadline(1):
+                self.client._connection.call('system/versions')
+        self.assertEqual(self.pool.request.call_count, 1)
+
+
+class TestAsyncRetries(unittest.IsolatedAsyncioTestCase):
+
+    async def test_connection_error_is_retried(self):
+        policy = RetryPolicy(max_retries=2, backoff_factor=0)
+        async with httpx.AsyncClient() as conn:
+            # Nothing listens on this port, httpx raises a ConnectError.
+            client = AsyncClient(conn, 'http://127.0.0.1:1/3.1', 'restadmin',
+                                 'restpass', retry=policy)
+            with self.assertRaises(MailmanConnectionError):
+                await client.connection.call('system/versions')
+        self.assertEqual(policy.retries, 2)
+        self.assertEqual(policy.exhausted, 1)
@@ -0,0 +1,155 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the priority scheduler."""
+
+import asyncio
+import threading
+import time
+import unittest
+
+from mailmanclient import PriorityScheduler
+from mailmanclient.restbase.scheduler import (
+    BULK, INTERACTIVE, current_priority, priority)
+from mailmanclient.tests.utils import (
+    FakeTransport, make_async_client, make_client)
+
+__metaclass__ = type
+__all__ = [
+    'TestPriority',
+    'TestScheduledClients',
+    'TestSchedulerOrder',
+    ]
+
+
+class TestPriority(unittest.TestCase):
+
+    def test_context(self):
+        self.assertEqual(current_priority(), INTERACTIVE)
+        with priority(BULK):
+            self.assertEqual(current_priority(), BULK)
+            with priority(INTERACTIVE):
+                self.assertEqual(current_priority(), INTERACTIVE)
+            self.assertEqual(current_priority(), BULK)
+        self.assertEqual(current_priority(), INTERACTIVE)
+
+    def test_unknown_lane(self):
+        with self.assertRaises(ValueError):
+            with priority('urgent'):
+                pass
+
+    def test_timeout(self):
+        scheduler = PriorityScheduler(max_in_flight=1)
+        self.assertTrue(scheduler.acquire(INTERACTIVE))
+        self.assertFalse(scheduler.acquire(INTERACTIVE, timeout=0.05))
+        scheduler.release(INTERACTIVE)
+        self.assertEqual(scheduler.stats(), {
+            'interactive_in_flight': 0, 'interactive_waiting': 0,
+            'bulk_in_flight': 0, 'bulk_waiting': 0})
+
+    def test_bulk_leaves_a_slot(self):
+        scheduler = PriorityScheduler(max_in_flight=3)
+        self.assertTrue(scheduler.acquire(BULK))
+        self.assertTrue(scheduler.acquire(BULK))
+        self.assertFalse(scheduler.acquire(BULK, timeout=0.05))
+        self.assertTrue(scheduler.acquire(INTERACTIVE, timeout=0.05))
+
+
+class TestSchedulerOrder(unittest.IsolatedAsyncioTestCase):
+
+    async def _run(self, scheduler, lanes):
+        """Queue calls behind a call in progress, return their order."""
+        order = []
+
+        async def call(name, lane):
+            self.assertTrue(await scheduler.aacquire(lane))
+            order.append(name)
+            await asyncio.sleep(0)
+            scheduler.release(lane)
+
+        self.assertTrue(await scheduler.aacquire(INTERACTIVE))
+        tasks = []
+        for i, lane in enumerate(lanes):
+            tasks.append(asyncio.ensure_future(
+                call('{}{}'.format(lane[0], i), lane)))
+            await asyncio.sleep(0)
+        scheduler.release(INTERACTIVE)
+        await asyncio.gather(*tasks)
+        return order
+
+    async def test_interactive_first(self):
+        scheduler = PriorityScheduler(max_in_flight=1, bulk_every=4)
+        order = await self._run(
+            scheduler, [BULK, BULK, INTERACTIVE, INTERACTIVE])
+        self.assertEqual(order, ['i2', 'i3', 'b0', 'b1'])
+        self.assertEqual(scheduler.dispatched, {INTERACTIVE: 3, BULK: 2})
+
+    async def test_bulk_is_not_starved(self):
+        scheduler = PriorityScheduler(max_in_flight=1, bulk_every=2)
+        order = await self._run(scheduler, [BULK] + [INTERACTIVE] * 5)
+        self.assertEqual(order, ['i1', 'i2', 'b0', 'i3', 'i4', 'i5'])
+
+    async def test_cancelled_waiter(self):
+        scheduler = PriorityScheduler(max_in_flight=1)
+        self.assertTrue(await scheduler.aacquire(BULK))
+        task = asyncio.ensure_future(scheduler.aacquire(INTERACTIVE))
+        await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        scheduler.release(BULK)
+        self.assertTrue(await scheduler.aacquire(INTERACTIVE, timeout=0.1))
+
+
+class TestScheduledClients(unittest.TestCase):
+
+    def test_interactive_call_jumps_the_queue(self):
+        lanes = []
+
+        def answer(method, url):
+            lanes.append((url.rsplit('/', 1)[-1], current_priority()))
+            return 200, b'{}'
+
+        scheduler = PriorityScheduler(max_in_flight=1)
+        client = make_client(FakeTransport(handler=answer, delay=0.05),
+                             scheduler=scheduler, single_flight=None)
+
+        def bulk_call(path):
+            with client.priority('bulk'):
+                client._connection.call(path)
+
+        for i in range(4):
+            threading.Thread(target=bulk_call,
+                             args=('bulk{}'.format(i),)).start()
+            time.sleep(0.01)
+        client._connection.call('interactive')
+        # Only the bulk call in progress was sent before.
+        self.assertEqual(lanes[:2], [
+            ('bulk0', BULK), ('interactive', INTERACTIVE)])
+        while scheduler.stats()['bulk_waiting']:
+            time.sleep(0.05)
+
+    def test_async_lanes(self):
+        scheduler = PriorityScheduler()
+
+        async def main():
+            client = make_async_client(scheduler=scheduler)
+            with client.priority('bulk'):
+                await client.connection.call('lists')
+            await client.connection.call('domains')
+
+        asyncio.run(main())
+        self.assertEqual(scheduler.dispatched, {INTERACTIVE: 1, BULK: 1})
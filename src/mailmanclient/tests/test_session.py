@@ -0,0 +1,93 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the pooled HTTP sessions."""
+
+import threading
+import unittest
+
+from mailmanclient import Client, SessionPool
+
+__metaclass__ = type
+__all__ = [
+    'TestSessionPool',
+    ]
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self._pool = SessionPool()
+        self._client = Client(
+            'http://localhost:9001/3.1', 'restadmin', 'restpass',
+            session_pool=self._pool)
+
+    def tearDown(self):
+        self._pool.close()
+
+    def _pooled_connections(self):
+        pools = self._pool._adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def test_connection_is_reused(self):
+        for i in range(3):
+            self._client.system
+        # All the calls went through a single kept-alive connection.
+        self.assertEqual(self._pooled_connections(), 1)
+
+    def test_session_per_thread(self):
+        sessions = []
+        thread = threading.Thread(
+            target=lambda: sessions.append(self._pool.session))
+        thread.start()
+        thread.join()
+        self.assertIs(self._pool.session, self._pool.session)
+        self.assertIsNot(sessions[0], self._pool.session)
+
+    def test_sessions_of_dead_threads_are_released(self):
+        threads = [threading.Thread(target=lambda: self._pool.session)
+                   for i in range(3)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        # Each new session drops the ones of the finished threads.
+        self.assertEqual(len(self._pool._sessions), 1)
+        self._pool.evict_idle()
+        self.assertEqual(self._pool._sessions, {})
+        # The shared connections are still usable.
+        self.assertIn('api_version', self._client.system)
+
+    def test_evict_idle(self):
+        self._client.system
+        self.assertFalse(self._pool.evict_idle())
+        self._pool.idle_timeout = 0
+        self.assertTrue(self._pool.evict_idle())
+        self.assertEqual(self._pooled_connections(), 0)
+        # The pool is still usable after the eviction.
+        self.assertIn('api_version', self._client.system)
+
+    def test_shared_pool_is_not_closed_by_client(self):
+        self._client.close()
+        self.assertFalse(self._pool.closed)
+
+    def test_client_closes_own_pool(self):
+        with Client('http://localhost:9001/3.1', 'restadmin',
+                    'restpass') as client:
+            client.system
+            pool = client._connection.session_pool
+        self.assertTrue(pool.closed)
+        with self.assertRaises(RuntimeError):
+            pool.request(method='GET', url='http://localhost:9001/3.1')
@@ -0,0 +1,245 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the coalescing of concurrent identical requests."""
+
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+from mailmanclient import Client, DeadlineExceeded, Middleware, SingleFlight
+from mailmanclient.restbase.deadline import current_deadline, deadline
+from mailmanclient.restbase.singleflight import AsyncSingleFlight
+
+__metaclass__ = type
+__all__ = [
+    'TestAsyncSingleFlight',
+    'TestCoalescedClient',
+    'TestSingleFlight',
+    ]
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _slow(self, result):
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _run(self, result, callers=3):
+        with ThreadPoolExecutor(callers) as executor:
+            first = executor.submit(self.flight.do, 'key', self._slow, result)
+            self.started.wait(5)
+            others = [executor.submit(self.flight.do, 'key', self._slow, None)
+                      for i in range(callers - 1)]
+            while self.flight.coalesced < callers - 1:
+                time.sleep(0.001)
+            self.release.set()
+        return [first] + others
+
+    def test_concurrent_calls_are_shared(self):
+        futures = self._run(42)
+        self.assertEqual([future.result() for future in futures], [42] * 3)
+        self.assertEqual(self.flight.flights, 1)
+        self.assertEqual(self.flight.coalesced, 2)
+        self.assertEqual(len(self.flight), 0)
+
+    def test_errors_are_shared(self):
+        futures = self._run(ValueError('boom'))
+        for future in futures:
+            self.assertIsInstance(future.exception(), ValueError)
+
+    def test_sequential_calls_are_not_shared(self):
+        self.release.set()
+        self.flight.do('key', self._slow, 1)
+        self.flight.do('key', self._slow, 2)
+        self.assertEqual(self.flight.flights, 2)
+        self.assertEqual(self.flight.coalesced, 0)
+
+    def test_timeout(self):
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(self.flight.do, 'key', self._slow, 1)
+            self.started.wait(5)
+            with self.assertRaises(TimeoutError):
+                self.flight.do('key', self._slow, 1, timeout=0.01)
+            self.release.set()
+
+    def test_leader_deadline_is_not_shared(self):
+        def lead():
+            with deadline(0.01):
+                return self.flight.do('key', self._slow, ValueError('late'))
+
+        with ThreadPoolExecutor(2) as executor:
+            leader = executor.submit(lead)
+            self.started.wait(5)
+            follower = executor.submit(self.flight.do, 'key', self._slow, 42)
+            while self.flight.coalesced < 1:
+                time.sleep(0.001)
+            time.sleep(0.02)
+            self.release.set()
+        self.assertIsInstance(leader.exception(), ValueError)
+        # The follower made the call again, under its own deadline.
+        self.assertEqual(follower.result(), 42)
+        self.assertEqual(self.flight.flights, 2)
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.flight = AsyncSingleFlight()
+        self.release = asyncio.Event()
+
+    async def _slow(self):
+        await self.release.wait()
+        return current_deadline()
+
+    async def test_leader_deadline_is_not_shared(self):
+        async def lead():
+            with deadline(0.01):
+                return await self.flight.do('key', self._slow, timeout=0.01)
+
+        leader = asyncio.ensure_future(lead())
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(self.flight.do('key', self._slow))
+        with self.assertRaises(asyncio.TimeoutError):
+            await leader
+        self.release.set()
+        # The call ran without the deadline of the leader.
+        self.assertIsNone(await follower)
+        self.assertEqual(self.flight.flights, 1)
+        self.assertEqual(self.flight.coalesced, 1)
+
+    async def test_cancelled_call_is_not_joined(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.flight.do('key', self._slow, timeout=0.01)
+        self.release.set()
+        self.assertIsNone(await self.flight.do('key', self._slow))
+        self.assertEqual(self.flight.flights, 2)
+
+
+class TestCoalescedClient(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.pool = Mock()
+        self.pool.request.side_effect = self._request
+        self.client = Client('http://localhost:9001/3.1',
+                             session_pool=self.pool)
+        self.flight = self.client._connection.single_flight
+
+    def _request(self, **params):
+        self.release.wait(5)
+        response = Mock(status_code=200, content=b'{"a": 1}')
+        response.json.side_effect = lambda: {'a': 1}
+        return response
+
+    def _call_concurrently(self, path, data=None, callers=4):
+        with ThreadPoolExecutor(callers) as executor:
+            futures = [executor.submit(self.client._connection.call,
+                                       path, data)
+                       for i in range(callers)]
+            while self.pool.request.call_count < 1:
+                time.sleep(0.001)
+            if data is None:
+                while self.flight.coalesced < callers - 1:
+                    time.sleep(0.001)
+            self.release.set()
+        return [future.result()[1] for future in futures]
+
+    def test_concurrent_gets_are_coalesced(self):
+        contents = self._call_concurrently('system/versions')
+        self.assertEqual(self.pool.request.call_count, 1)
+        self.assertEqual(self.flight.coalesced, 3)
+        # Each caller decodes its own content.
+        self.assertEqual(contents, [{'a': 1}] * 4)
+        self.assertEqual(len({id(content) for content in contents}), 4)
+
+    def test_coalesced_contexts(self):
+        contexts = []
+
+        class Record(Middleware):
+            def on_response(self, context):
+                contexts.append(context)
+
+        self.client.add_middleware(Record())
+        self._call_concurrently('system/versions')
+        leaders = [context for context in contexts if not context.coalesced]
+        self.assertEqual(len(leaders), 1)
+        self.assertGreater(leaders[0].network_time, 0)
+        # The followers have the times of the request which was sent.
+        for context in contexts:
+            self.assertEqual(context.network_time, leaders[0].network_time)
+            self.assertEqual(context.queue_time, leaders[0].queue_time)
+
+    def test_posts_are_not_coalesced(self):
+        self._call_concurrently('domains', {'mail_host': 'example.org'})
+        self.assertEqual(self.pool.request.call_count, 4)
+        self.assertEqual(self.flight.coalesced, 0)
+
+    def test_gets_sent_before_a_write_are_not_joined(self):
+        def request(**params):
+            if params['method'] == 'GET':
+                return self._request(**params)
+            return Mock(status_code=204, content=b'')
+
+        self.pool.request.side_effect = request
+        connection = self.client._connection
+        with ThreadPoolExecutor(2) as executor:
+            leader = executor.submit(connection.call, 'lists/ant.example.com')
+            while self.pool.request.call_count < 1:
+                time.sleep(0.001)
+            connection.call('lists/ant.example.com', {'description': 'x'},
+                            'PATCH')
+            # The follower must see the write, it sends its own request.
+            follower = executor.submit(connection.call,
+                                       'lists/ant.example.com')
+            while (self.pool.request.call_count < 3
+                   and self.flight.coalesced < 1):
+                time.sleep(0.001)
+            self.release.set()
+            leader.result()
+            follower.result()
+        self.assertEqual(self.flight.coalesced, 0)
+        methods = [call[1]['method']
+                   for call in self.pool.request.call_args_list]
+        self.assertEqual(methods, ['GET', 'PATCH', 'GET'])
+
+    def test_disabled(self):
+        client = Client('http://localhost:9001/3.1', session_pool=self.pool,
+                        single_flight=None)
+        self.release.set()
+        client._connection.call('system/versions')
+        self.assertIsNone(client._connection.single_flight)
+
+    def test_waiting_follows_deadline(self):
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(self.client._connection.call, 'system/versions')
+            while self.pool.request.call_count < 1:
+                time.sleep(0.001)
+            with self.assertRaises(DeadlineExceeded):
+                with self.client.deadline(0.05):
+                    self.client._connection.call('system/versions')
+            self.release.set()
@@ -0,0 +1,103 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the log of the slow REST calls."""
+
+import asyncio
+import threading
+import time
+import unittest
+
+from mailmanclient import PriorityScheduler, SlowCallLog
+from mailmanclient.tests.utils import (
+    FakeTransport, make_async_client, make_client)
+
+__metaclass__ = type
+__all__ = [
+    'TestSlowCallLog',
+    ]
+
+
+class TestSlowCallLog(unittest.TestCase):
+
+    def test_fast_calls_are_ignored(self):
+        slow_calls = SlowCallLog(threshold=10)
+        client = make_client(single_flight=None, middleware=[slow_calls])
+        client._connection.call('domains')
+        self.assertEqual(slow_calls.get_calls(), [])
+
+    def test_slow_call(self):
+        slow_calls = SlowCallLog(threshold=0.01)
+        client = make_client(FakeTransport(delay=0.05), single_flight=None,
+                             middleware=[slow_calls])
+        with self.assertLogs('mailmanclient.restbase.slowlog') as logs:
+            client._connection.call('lists/ant.example.com/roster/member',
+                                    {'role': 'member'})
+        call, = slow_calls.get_calls()
+        self.assertEqual(call.method, 'POST')
+        self.assertEqual(call.route, 'lists/{list}/roster/{role}')
+        self.assertEqual(call.status_code, 200)
+        self.assertEqual(call.request_bytes, len('role=member'))
+        self.assertEqual(call.response_bytes, 15)
+        self.assertGreaterEqual(call.network_time, 0.05)
+        self.assertLess(call.queue_time, 0.05)
+        self.assertEqual(call.call_site.filename, __file__)
+        self.assertEqual(call.call_site.function, 'test_slow_call')
+        record, = logs.records
+        self.assertEqual(record.levelname, 'WARNING')
+        self.assertEqual(record.route, 'lists/{list}/roster/{role}')
+        self.assertEqual(record.response_bytes, 15)
+        self.assertIn('Slow REST call: POST lists/ant.example.com/roster/'
+                      'member (200)', record.getMessage())
+
+    def test_queue_time(self):
+        slow_calls = SlowCallLog(threshold=0.01, logger=None)
+        client = make_client(
+            FakeTransport(delay=0.1), single_flight=None,
+            middleware=[slow_calls],
+            scheduler=PriorityScheduler(max_in_flight=1))
+        thread = threading.Thread(target=client._connection.call,
+                                  args=('domains',))
+        thread.start()
+        time.sleep(0.02)
+        client._connection.call('lists')
+        thread.join()
+        waited = [call for call in slow_calls.get_calls()
+                  if call.resource == 'lists'][0]
+        self.assertGreaterEqual(waited.queue_time, 0.05)
+
+    def test_ring_buffer(self):
+        slow_calls = SlowCallLog(threshold=0, maxlen=2, logger=None)
+        client = make_client(single_flight=None, middleware=[slow_calls])
+        for path in ('domains', 'lists', 'users'):
+            client._connection.call(path)
+        self.assertEqual([call.resource for call in slow_calls.get_calls()],
+                         ['lists', 'users'])
+        slow_calls.clear()
+        self.assertEqual(slow_calls.get_calls(), [])
+
+    def test_async(self):
+        slow_calls = SlowCallLog(threshold=0.01, logger=None)
+
+        async def main():
+            client = make_async_client(FakeTransport(delay=0.05),
+                                       middleware=[slow_calls])
+            await client.connection.call('users')
+
+        asyncio.run(main())
+        call, = slow_calls.get_calls()
+        self.assertEqual(call.route, 'users')
+        self.assertGreaterEqual(call.network_time, 0.05)
@@ -0,0 +1,202 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the streaming of collections."""
+
+import json
+import unittest
+from unittest.mock import Mock
+from urllib.error import HTTPError
+
+import httpx
+
+from mailmanclient import Client
+from mailmanclient.asynclient import AsyncClient
+from mailmanclient.restbase.stream import aiter_entries, iter_entries
+from mailmanclient.tests.utils import FakeTransport, make_async_client
+
+__metaclass__ = type
+__all__ = [
+    'TestAsyncStream',
+    'TestIterEntries',
+    'TestStream',
+    'TestStreamRoster',
+    ]
+
+
+def split(content, size):
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+class TestIterEntries(unittest.TestCase):
+
+    document = {
+        'start': 0,
+        'total_size': 3,
+        'entries': [
+            {'email': 'anne@example.com', 'bounce_score': 12345,
+             'display_name': 'Anné ♥ [x] {y}', 'moderation': None},
+            {'email': 'bart@example.com', 'roles': ['member', 'owner'],
+             'escaped': '"\\\\"quoted\\\\""', 'verified': True},
+            {'email': 'cris@example.com', 'score': -1.5e3},
+            ],
+        'http_etag': '"abc"',
+        }
+
+    def test_any_chunk_size(self):
+        content = json.dumps(self.document, ensure_ascii=False,
+                             indent=2).encode('utf-8')
+        for size in (1, 2, 3, 7, 64, len(content)):
+            with self.subTest(size=size):
+                meta = {}
+                entries = list(iter_entries(split(content, size), meta=meta))
+                self.assertEqual(entries, self.document['entries'])
+                self.assertEqual(
+                    meta, {'start': 0, 'total_size': 3, 'http_etag': '"abc"'})
+
+    def test_empty_collection(self):
+        content = b'{"start": 0, "total_size": 0, "http_etag": "\\"x\\""}'
+        self.assertEqual(list(iter_entries(split(content, 5))), [])
+        self.assertEqual(list(iter_entries([b'{"entries": [ ]}'])), [])
+        self.assertEqual(list(iter_entries([b'{}'])), [])
+
+    def test_truncated(self):
+        content = json.dumps(self.document).encode('utf-8')
+        with self.assertRaises(ValueError):
+            list(iter_entries(split(content[:-20], 10)))
+        # A number cut at the end of the stream.
+        with self.assertRaises(ValueError):
+            list(iter_entries([b'{"entries": [1']))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iter_entries([b'[1, 2]']))
+
+
+class TestStream(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = Mock()
+        self.client = Client('http://localhost:9001/3.1',
+                             session_pool=self.pool)
+
+    def _response(self, status_code=200, content=b''):
+        response = Mock(status_code=status_code, content=content,
+                        encoding=None)
+        response.iter_content.side_effect = lambda size: split(content, size)
+        return response
+
+    def test_stream_users(self):
+        content = json.dumps({'entries': [
+            {'self_link': 'http://localhost:9001/3.1/users/{}'.format(i),
+             'user_id': i} for i in range(10)]}).encode('utf-8')
+        response = self._response(content=content)
+        self.pool.request.return_value = response
+        users = self.client.stream_users()
+        # Nothing is sent until the iteration starts.
+        self.assertFalse(self.pool.request.called)
+        self.assertEqual([user.user_id for user in users], list(range(10)))
+        self.assertTrue(self.pool.request.call_args[1]['stream'])
+        response.close.assert_called_once_with()
+
+    def test_error(self):
+        self.pool.request.return_value = self._response(
+            404, b'{"description": "Not found"}')
+        with self.assertRaises(HTTPError) as cm:
+            list(self.client.stream_members())
+        self.assertEqual(cm.exception.code, 404)
+
+
+class TestAsyncStream(unittest.IsolatedAsyncioTestCase):
+
+    content = json.dumps({
+        'start': 0,
+        'total_size': 10,
+        'entries': [{'user_id': i} for i in range(10)],
+        }).encode('utf-8')
+
+    async def test_aiter_entries(self):
+        async def chunks():
+            for chunk in split(self.content, 7):
+                yield chunk
+
+        meta = {}
+        entries = [entry async for entry in aiter_entries(chunks(), meta=meta)]
+        self.assertEqual(entries, [{'user_id': i} for i in range(10)])
+        self.assertEqual(meta, {'start': 0, 'total_size': 10})
+
+    async def test_stream(self):
+        def handler(request):
+            return httpx.Response(200, content=self.content)
+
+        async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)) as conn:
+            client = AsyncClient(conn, 'http://localhost:9001/3.1',
+                                 'restadmin', 'restpass')
+            meta = {}
+            entries = [entry async for entry in client.connection.stream(
+                'users', meta, chunk_size=16)]
+        self.assertEqual(entries, [{'user_id': i} for i in range(10)])
+        self.assertEqual(meta['total_size'], 10)
+
+    async def test_error(self):
+        def handler(request):
+            return httpx.Response(404, json={'description': 'Not found'})
+
+        async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)) as conn:
+            client = AsyncClient(conn, 'http://localhost:9001/3.1',
+                                 'restadmin', 'restpass')
+            with self.assertRaises(HTTPError) as cm:
+                async for entry in client.connection.stream('users'):
+                    pass
+        self.assertEqual(cm.exception.code, 404)
+
+    async def test_transport(self):
+        client = make_async_client(FakeTransport(body=self.content))
+        entries = [entry async for entry in client.connection.stream('users')]
+        self.assertEqual(len(entries), 10)
+
+
+class TestStreamRoster(unittest.TestCase):
+
+    def setUp(self):
+        self._client = Client(
+            'http://localhost:9001/3.1', 'restadmin', 'restpass')
+        self.domain = self._client.create_domain('example.org')
+        self.mlist = self.domain.create_list('ant')
+        for name in ('anne', 'bart', 'cris'):
+            self.mlist.subscribe('{}@example.org'.format(name),
+                                 pre_verified=True, pre_confirmed=True,
+                                 pre_approved=True)
+
+    def tearDown(self):
+        self.domain.delete()
+
+    def test_stream_roster(self):
+        members = self.mlist.stream_roster('member', fields=['email'])
+        self.assertEqual(
+            sorted(member.email for member in members),
+            [member.email for member in self.mlist.get_roster('member')])
+
+    def test_stream_members(self):
+        self.assertEqual(len(list(self._client.stream_members())), 3)
+
+    def test_stream_rest_list(self):
+        user = self._client.get_user('anne@example.org')
+        self.assertEqual(
+            [address.email for address in user.addresses.stream()],
+            ['anne@example.org'])
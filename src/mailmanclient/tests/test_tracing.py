@@ -0,0 +1,141 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the tracing of the client operations."""
+
+import asyncio
+import io
+import json
+import unittest
+from urllib.error import HTTPError
+
+from mailmanclient import InMemoryExporter, JSONLinesExporter, Tracer
+from mailmanclient.restbase.tracing import current_span
+from mailmanclient.tests.utils import (
+    FakeTransport, make_async_client, make_client)
+
+__metaclass__ = type
+__all__ = [
+    'TestAsyncTracing',
+    'TestTracing',
+    ]
+
+
+LIST = {
+    'self_link': 'http://localhost:9001/3.1/lists/ant.example.com',
+    'list_id': 'ant.example.com',
+    'fqdn_listname': 'ant@example.com',
+}
+
+
+def serve(method, url):
+    """Answer the calls made by the tests."""
+    if url.endswith('lists/ant.example.com'):
+        return 200, LIST
+    if url.endswith('members/find'):
+        return 200, {'entries': [{'role': 'moderator'}]}
+    return 404, b''
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemoryExporter()
+        self.transport = FakeTransport(handler=serve)
+        self.client = make_client(self.transport,
+                                  tracer=Tracer(self.exporter))
+
+    def test_spans(self):
+        mlist = self.client.get_list('ant.example.com')
+        self.assertTrue(mlist.is_owner_or_mod('anne@example.com'))
+        names = [(span.name, span.parent_id is None)
+                 for span in self.exporter.spans]
+        self.assertEqual(names, [
+            ('GET lists/{list}', False),
+            ('Client.get_list', True),
+            ('POST members/find', False),
+            ('MailingList.is_owner_or_mod', True),
+        ])
+        call, get_list = self.exporter.spans[:2]
+        self.assertEqual(call.parent_id, get_list.span_id)
+        self.assertEqual(call.trace_id, get_list.trace_id)
+        self.assertEqual(call.attributes['http.status_code'], 200)
+        self.assertEqual(self.exporter.children(get_list), [call])
+        self.assertIsNone(current_span())
+
+    def test_helpers_are_not_traced(self):
+        with self.client.deadline(5):
+            self.client.get_list('ant.example.com')
+        self.client.get_user_paginator()
+        self.client.close()
+        self.assertEqual([span.name for span in self.exporter.spans],
+                         ['GET lists/{list}', 'Client.get_list'])
+
+    def test_no_email_in_span_names(self):
+        mlist = self.client.get_list('ant.example.com')
+        with self.assertRaises(ValueError):
+            mlist.unsubscribe('anne@example.com')
+        call = self.exporter.spans[-2]
+        self.assertEqual(call.name, 'DELETE lists/{list}/member/{email}')
+
+    def test_request_id(self):
+        self.client.get_list('ant.example.com')
+        call = self.exporter.spans[0]
+        self.assertEqual(self.transport.headers[0]['X-Request-ID'],
+                         call.request_id)
+
+    def test_error(self):
+        with self.assertRaises(HTTPError):
+            self.client.get_list('bee.example.com')
+        call, get_list = self.exporter.spans
+        self.assertIsInstance(call.error, HTTPError)
+        self.assertEqual(call.attributes['http.status_code'], 404)
+        self.assertIsInstance(get_list.error, HTTPError)
+
+    def test_no_tracer(self):
+        client = make_client(self.transport)
+        client.get_list('ant.example.com')
+        self.assertNotIn('X-Request-ID', self.transport.headers[0])
+
+    def test_json_lines(self):
+        output = io.StringIO()
+        client = make_client(self.transport,
+                             tracer=Tracer(JSONLinesExporter(output)))
+        client.get_list('ant.example.com')
+        spans = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([span['name'] for span in spans],
+                         ['GET lists/{list}', 'Client.get_list'])
+        self.assertEqual(spans[0]['parent_id'], spans[1]['span_id'])
+        self.assertEqual(spans[0]['attributes']['http.method'], 'GET')
+
+
+class TestAsyncTracing(unittest.TestCase):
+
+    def test_spans(self):
+        exporter = InMemoryExporter()
+
+        async def main():
+            client = make_async_client(FakeTransport(handler=serve),
+                                       tracer=Tracer(exporter))
+            await client.connection.call('lists/ant.example.com')
+            with self.assertRaises(HTTPError):
+                await client.domains()
+
+        asyncio.run(main())
+        self.assertEqual([span.name for span in exporter.spans], [
+            'GET lists/{list}', 'GET domains', 'AsyncClient.domains'])
+        self.assertEqual(exporter.spans[1].parent_id,
+                         exporter.spans[2].span_id)
@@ -0,0 +1,183 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test the transports."""
+
+import asyncio
+import json
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler
+from urllib.error import HTTPError
+
+from mailmanclient import (
+    ASGITransport, Client, MailmanConnectionError, UnixSocketTransport,
+    WSGITransport)
+from mailmanclient.asynclient import AsyncClient
+
+__metaclass__ = type
+__all__ = [
+    'TestASGITransport',
+    'TestUnixSocketTransport',
+    'TestWSGITransport',
+    ]
+
+
+def echo(method, path, query, authorization, body):
+    status = 404 if path.endswith('/missing') else 200
+    content = json.dumps({
+        'method': method,
+        'path': path,
+        'query': query,
+        'authorization': authorization,
+        'body': body.decode('utf-8'),
+        }).encode('utf-8')
+    return status, content
+
+
+def wsgi_app(environ, start_response):
+    length = int(environ.get('CONTENT_LENGTH') or 0)
+    status, content = echo(
+        environ['REQUEST_METHOD'], environ['PATH_INFO'],
+        environ['QUERY_STRING'], environ.get('HTTP_AUTHORIZATION'),
+        environ['wsgi.input'].read(length))
+    start_response('{} Whatever'.format(status),
+                   [('Content-Type', 'application/json')])
+    return [content]
+
+
+async def asgi_app(scope, receive, send):
+    message = await receive()
+    headers = dict(scope['headers'])
+    authorization = headers.get(b'authorization')
+    status, content = echo(
+        scope['method'], scope['path'], scope['query_string'].decode(),
+        authorization and authorization.decode(), message['body'])
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': content})
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def _echo(self):
+        path, _, query = self.path.partition('?')
+        length = int(self.headers.get('Content-Length') or 0)
+        status, content = echo(
+            self.command, path, query, self.headers.get('Authorization'),
+            self.rfile.read(length))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = _echo
+
+    def log_message(self, *args):
+        pass
+
+
+class TestWSGITransport(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client('http://localhost/3.1', 'restadmin', 'restpass',
+                             transport=WSGITransport(wsgi_app))
+
+    def test_get(self):
+        response, content = self.client._connection.call('lists?count=2')
+        self.assertEqual(content['method'], 'GET')
+        self.assertEqual(content['path'], '/3.1/lists')
+        self.assertEqual(content['query'], 'count=2')
+        self.assertEqual(content['authorization'],
+                         'Basic cmVzdGFkbWluOnJlc3RwYXNz')
+        self.assertEqual(response.headers['content-type'], 'application/json')
+
+    def test_post(self):
+        response, content = self.client._connection.call(
+            'domains', {'mail_host': 'example.org'})
+        self.assertEqual(content['method'], 'POST')
+        self.assertEqual(content['body'], 'mail_host=example.org')
+
+    def test_error(self):
+        with self.assertRaises(HTTPError) as cm:
+            self.client._connection.call('missing')
+        self.assertEqual(cm.exception.code, 404)
+
+
+class TestASGITransport(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_client(self):
+        client = AsyncClient(None, 'http://localhost/3.1', 'restadmin',
+                             'restpass', transport=ASGITransport(asgi_app))
+        response, content = await client.connection.call(
+            'domains', {'mail_host': 'example.org'})
+        self.assertEqual(content['path'], '/3.1/domains')
+        self.assertEqual(content['body'], 'mail_host=example.org')
+
+    def test_sync_client(self):
+        client = Client('http://localhost/3.1',
+                        transport=ASGITransport(asgi_app))
+        response, content = client._connection.call('system/versions')
+        self.assertEqual(content['path'], '/3.1/system/versions')
+        self.assertIsNone(content['authorization'])
+
+
+class TestUnixSocketTransport(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        self.socket_path = os.path.join(tempdir, 'rest.sock')
+        server = socketserver.ThreadingUnixStreamServer(
+            self.socket_path, EchoHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.transport = UnixSocketTransport(self.socket_path)
+        self.addCleanup(self.transport.close)
+        self.client = Client('http://localhost/3.1', 'restadmin', 'restpass',
+                             transport=self.transport)
+
+    def test_requests(self):
+        for i in range(3):
+            response, content = self.client._connection.call(
+                'lists/ant.example.com')
+            self.assertEqual(content['path'], '/3.1/lists/ant.example.com')
+        response, content = self.client._connection.call(
+            'domains', {'mail_host': 'example.org'})
+        self.assertEqual(content['body'], 'mail_host=example.org')
+
+    def test_async_client(self):
+        client = AsyncClient(None, 'http://localhost/3.1', 'restadmin',
+                             'restpass', transport=self.transport)
+        response, content = asyncio.run(
+            client.connection.call('system/versions'))
+        self.assertEqual(content['path'], '/3.1/system/versions')
+
+    def test_no_server(self):
+        transport = UnixSocketTransport(self.socket_path + '.missing')
+        client = Client('http://localhost/3.1', transport=transport)
+        with self.assertRaises(MailmanConnectionError):
+            client._connection.call('system/versions')
+        transport.close()
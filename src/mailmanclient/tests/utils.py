@@ -0,0 +1,168 @@
+# Copyright (C) 2023 by the Free Software Foundation, Inc.
+#
+# This file is part of mailmanclient.
+#
+# mailmanclient is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, version 3 of the License.
+#
+# mailmanclient is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with mailmanclient.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Helpers shared by the tests which don't need a running Core."""
+
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+from mailmanclient import Client, Transport
+from mailmanclient.asynclient import AsyncClient
+from mailmanclient.restbase.transport import _build_response
+
+__metaclass__ = type
+__all__ = [
+    'BASE',
+    'FakeTransport',
+    'make_async_client',
+    'make_client',
+    ]
+
+
+BASE = 'http://localhost:9001/3.1/'
+
+
+class FakeTransport(Transport):
+    """Answer the requests without any server, recording them.
+
+    :param status: The status code of the responses, or a list of status
+        codes answered in turn, the last one being repeated.
+    :param body: The body of the responses, as bytes or as an object
+        encoded to JSON.
+    :param handler: If given, ``handler(method, url)`` returns the status
+        code and the body of the response instead, or raises an exception.
+    :param error: If given, the exception raised instead of answering.
+    :param delay: The number of seconds taken to answer, or a function
+        returning it for the url of the request.
+    """
+
+    def __init__(self, status=200, body=b'{"entries": []}', handler=None,
+                 error=None, delay=0):
+        self.statuses = list(status) if isinstance(status, list) else [status]
+        self.body = body
+        self.handler = handler
+        self.error = error
+        self.delay = delay
+        #: The ``(method, url, kw)`` tuple of each request.
+        self.requests = []
+        #: The responses closed by the client.
+        self.closed = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def calls(self):
+        """The number of requests received."""
+        return len(self.requests)
+
+    @property
+    def urls(self):
+        """The url of each request."""
+        return [url for method, url, kw in self.requests]
+
+    @property
+    def headers(self):
+        """The headers of each request."""
+        return [kw.get('headers') for method, url, kw in self.requests]
+
+    @property
+    def hosts(self):
+        """The host of each request."""
+        return [urlparse(url).hostname for method, url, kw in self.requests]
+
+    def request(self, method, url, **kw):
+        delay = self._enter(method, url, kw)
+        try:
+            time.sleep(delay)
+            return self._respond(method, url)
+        finally:
+            self._exit()
+
+    async def arequest(self, method, url, **kw):
+        delay = self._enter(method, url, kw)
+        try:
+            await asyncio.sleep(delay)
+            return self._respond(method, url)
+        finally:
+            self._exit()
+
+    def answer(self, method, url):
+        """Return the status code and the body of the response to a request.
+
+        Subclasses may override it, it is called in the thread or the task
+        of the request.
+        """
+        if self.error is not None:
+            raise self.error
+        if self.handler is not None:
+            return self.handler(method, url)
+        with self._lock:
+            status = self.statuses[0]
+            if len(self.statuses) > 1:
+                self.statuses.pop(0)
+        return status, self.body
+
+    def _enter(self, method, url, kw):
+        with self._lock:
+            self.requests.append((method, url, kw))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return self.delay(url) if callable(self.delay) else self.delay
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _respond(self, method, url):
+        status, body = self.answer(method, url)
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        response = _build_response(url, status, {}, body)
+        close = response.close
+
+        def record_close():
+            self.closed.append(response)
+            close()
+
+        response.close = record_close
+        return response
+
+
+def make_client(transport=None, baseurl=BASE, **kw):
+    """Return a :class:`Client` sending its requests to `transport`.
+
+    :param transport: A :class:`FakeTransport` by default.
+    :param baseurl: The url of the API, or a list of them.
+    """
+    if transport is None:
+        transport = FakeTransport()
+    return Client(baseurl, 'restadmin', 'restpass', transport=transport, **kw)
+
+
+def make_async_client(transport=None, baseurl=BASE, **kw):
+    """Return an :class:`AsyncClient` sending its requests to `transport`.
+
+    :param transport: A :class:`FakeTransport` by default.
+    :param baseurl: The url of the API, or a list of them.
+    """
+    if transport is None:
+        transport = FakeTransport()
+    return AsyncClient(None, baseurl, 'restadmin', 'restpass',
+                       transport=transport, **kw)